@@ -0,0 +1,57 @@
+"""
+วัดหน่วยความจำสูงสุด (tracemalloc) และเวลาตอนโหลด vault จำลองขนาดใหญ่
+เทียบการอ่านไฟล์ทั้งก้อนเป็น bytes ก่อนถอดรหัส กับ read_payload (mmap + ถอดรหัสลง buffer เดียว)
+รัน: python benchmarks/bench_load_memory.py [จำนวน entry]
+ใช้ backend แบบโฟลเดอร์ชั่วคราว จึงไม่แตะ vault จริง
+"""
+import sys
+import time
+import tracemalloc
+
+from synthetic import synthetic_vault
+from utils.compression import DEFAULT_COMPRESSION, decompress_bytes
+from utils.engines import create_storage
+from utils.stream import NONCE_PREFIX_SIZE, SEGMENT_SIZE, decrypt_segments
+from utils.vault_format import read_prefix
+
+def measure(label: str, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:>9.0f} ms {peak / 2 ** 20:>9.1f} MiB")
+    return result
+
+def main(count: int):
+    storage = create_storage('tempdir', 'json')
+    session = storage.new_session('benchmark')
+    data = synthetic_vault(count)
+    for compression in (None, DEFAULT_COMPRESSION):
+        storage.compression = compression
+        storage.save_data(data, session)
+        size = storage.filename.stat().st_size
+        print(f"\n{count} entries, {storage.serializer.name}, compression={compression}, file {size / 2 ** 20:.1f} MiB")
+        print(f"{'':<28} {'time':>12} {'peak':>13}")
+
+        def read_all():
+            with open(storage.filename, 'rb') as f:
+                prefix = read_prefix(f)
+                sealed = f.read()
+            payload = decrypt_segments(sealed, session, prefix.nonce[:NONCE_PREFIX_SIZE], prefix.aad, SEGMENT_SIZE)
+            if compression:
+                payload = decompress_bytes(payload, compression)
+            return payload
+
+        baseline = measure("read file + decrypt", read_all)
+        payload = measure("mmap read_payload", lambda: storage.read_payload(session))
+        assert baseline == payload
+        del baseline, payload
+        result = measure("mmap read + parse", lambda: storage.read_snapshot(session))
+        assert result == data
+        del result
+    storage.delete_all_data()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
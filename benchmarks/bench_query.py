@@ -0,0 +1,65 @@
+"""
+คำค้นแบบมีโครงสร้าง (folder:/user:/url:/notes:/-ยกเว้น): กรองทีละ entry ทุกรายการ เทียบกับแผนของ SearchIndex
+(ตัวกรองที่เลือกเฉพาะที่สุดใช้ posting ก่อน ตัวถัดไปตรวจเฉพาะผู้สมัครที่เหลือ) — ผลลัพธ์ต้องตรงกัน
+รัน: python benchmarks/bench_query.py [จำนวน ...]
+"""
+import sys
+import time
+
+from synthetic import SIZES, synthetic_vault
+from utils.entries import EntryIndex
+from utils.search_index import FIELDS, SearchIndex, _domain, entry_fields, normalize
+from utils.search_query import structured
+
+def queries(data: dict) -> list:
+    """คำค้นที่อ้างอิงรายการจริงใน vault (เลือกเฉพาะมาก -> กว้าง)"""
+    entry = data['folders']['โฟลเดอร์ 3'][7]
+    user = entry['username'].split('@')[0]
+    site = _domain(entry['url'])
+    return [
+        f"user:{user}",
+        f"url:{site} -notes:zz",
+        f"folder:3 user:{user[:3]}",
+        f"title:{entry['title'][:4]} url:{site[:4]}",
+        f"notes:{entry['notes'][:5]} folder:โฟลเดอร์",
+        "-notes:a user:ab",
+    ]
+
+def brute(data: dict, term: str) -> list:
+    clauses = structured(term)
+    found = []
+    for folder, entries in data['folders'].items():
+        for entry in entries:
+            fields = entry_fields(entry)
+            for clause in clauses:
+                if clause.field == 'folder':
+                    hit = normalize(clause.value) in normalize(folder)
+                elif clause.field == 'text':
+                    hit = normalize(clause.value) in fields[0] or normalize(clause.value) in fields[1]
+                elif clause.field == 'domain':
+                    hit = normalize(_domain(clause.value) or clause.value) in fields[2]
+                else:
+                    hit = normalize(clause.value) in fields[FIELDS.index(clause.field)]
+                if hit == clause.negated:
+                    break
+            else:
+                found.append(entry['id'])
+    return found
+
+def main(sizes):
+    print(f"{'entries':>8} {'brute ms':>9} {'plan ms':>8} {'hits':>6}  query")
+    for count in sizes:
+        data = synthetic_vault(count)
+        index = EntryIndex(data, SearchIndex()).search
+        for term in queries(data):
+            start = time.perf_counter()
+            expected = brute(data, term)
+            scan = time.perf_counter() - start
+            start = time.perf_counter()
+            ids = index.search(term)
+            planned = time.perf_counter() - start
+            assert sorted(ids) == sorted(expected), term
+            print(f"{count:>8} {scan * 1000:>9.1f} {planned * 1000:>8.2f} {len(ids):>6}  {term}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
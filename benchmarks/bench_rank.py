@@ -0,0 +1,69 @@
+"""
+ค้นหาทุกโฟลเดอร์แบบจัดอันดับ: ให้คะแนนทีละ entry ใน Python แล้ว sort ทั้งหมด เทียบกับ SearchIndex.rank
+(ผู้สมัครจาก posting + นับ trigram ทั้งชุดด้วย set/Counter + top-K ด้วย heap) — คะแนนของ top-K ต้องตรงกัน
+รัน: python benchmarks/bench_rank.py [จำนวน ...]
+"""
+import sys
+import time
+
+from synthetic import SIZES, synthetic_vault
+from utils.entries import EntryIndex
+from utils.search_index import (MIN_SIMILARITY, NOTES, RANK_LIMIT, RANK_WEIGHTS, SearchIndex,
+                                entry_fields, field_trigrams, normalize, trigrams)
+from utils.thai_text import split_words
+
+QUERIES = ("f", "fa", "face", "facebok", "example", "บัญชี", "login", "zzzq", "บัญชีธนาคาร")
+
+def term_score(fields: tuple, query: str) -> float:
+    """คะแนนของคำค้นหนึ่งคำตามนิยามใน SearchIndex"""
+    grams = trigrams("\x02" + query)
+    best = 0.0
+    for field, weight in RANK_WEIGHTS.items():
+        text = fields[field]
+        if field == NOTES:
+            if len(query) < 3:
+                continue
+            similarity = 0.0
+        elif grams:
+            count = len(grams & field_trigrams(text))
+            similarity = count / len(grams) if count >= max(1, -(-len(grams) * MIN_SIMILARITY // 1)) else 0.0
+        else:
+            # ขึ้นต้นฟิลด์หรือขึ้นต้นคำ
+            similarity = 1.0 if any(gram.startswith("\x02" + query) for gram in field_trigrams(text)) else 0.0
+        score = weight * (similarity + (query in text))
+        best = max(best, score)
+    return best
+
+def score_entry(fields: tuple, query: str) -> float:
+    """คะแนนของ entry เดียว: ทั้งวลี + แต่ละคำ (ตัดคำภาษาไทยเหมือน SearchIndex.rank)"""
+    words = [word for word in split_words(query) if len(word) > 1]
+    score = term_score(fields, query)
+    if len(words) > 1:
+        score += sum(term_score(fields, word) for word in words)
+    return score
+
+def naive_rank(fields: list, query: str) -> list:
+    scores = [(score_entry(entry, query), -i) for i, entry in enumerate(fields)]
+    return [score for score, _ in sorted((s for s in scores if s[0] > 0), reverse=True)[:RANK_LIMIT]]
+
+def main(sizes):
+    print(f"{'entries':>8} {'query':>10} {'naive ms':>9} {'rank ms':>8} {'hits':>5}")
+    for count in sizes:
+        data = synthetic_vault(count)
+        index = EntryIndex(data, SearchIndex()).search
+        entries = [entry for folder in data['folders'].values() for entry in folder]
+        fields = [entry_fields(entry) for entry in entries]
+        by_id = {entry['id']: entry_fields(entry) for entry in entries}
+        for term in QUERIES:
+            query = normalize(term)
+            start = time.perf_counter()
+            expected = naive_rank(fields, query)
+            naive = time.perf_counter() - start
+            start = time.perf_counter()
+            ids = index.rank(term)
+            ranked = time.perf_counter() - start
+            assert [round(score_entry(by_id[i], query), 9) for i in ids] == [round(s, 9) for s in expected], term
+            print(f"{count:>8} {term:>10} {naive * 1000:>9.1f} {ranked * 1000:>8.2f} {len(ids):>5}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,49 @@
+"""
+ค้นหาแบบเดิม (ไล่ .lower() ทุกรายการ) เทียบกับ SearchIndex: เวลาสร้าง index และเวลาต่อการพิมพ์หนึ่งครั้ง
+คำค้นจำลองการพิมพ์ทีละตัวอักษร ทั้งในโฟลเดอร์เดียวและทุกโฟลเดอร์ — ผลลัพธ์ต้องตรงกัน
+รัน: python benchmarks/bench_search.py [จำนวน ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from synthetic import SIZES, synthetic_vault
+from utils.search_index import SearchIndex
+from utils.entries import EntryIndex
+
+QUERIES = ("f", "fa", "fac", "face", "faceb", "bo", "example", "บัญ", "บัญชี x", "zzzq")
+
+def scan(data: dict, term: str, folder: str = None) -> list:
+    """วิธีเดิมใน load_passwords"""
+    names = [folder] if folder else list(data['folders'])
+    return [entry['id'] for name in names for entry in data['folders'][name]
+            if term.lower() in entry['title'].lower() or term.lower() in entry['username'].lower()]
+
+def per_query(func, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for term in QUERIES:
+            func(term)
+    return (time.perf_counter() - start) / (repeat * len(QUERIES))
+
+def main(sizes):
+    print(f"{'entries':>8} {'build ms':>9} {'index MiB':>9} {'scope':>7} {'scan ms':>8} {'index ms':>9}")
+    for count in sizes:
+        data = synthetic_vault(count)
+        folder = next(iter(data['folders']))
+        tracemalloc.start()
+        start = time.perf_counter()
+        index = EntryIndex(data, SearchIndex()).search
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        for scope in (folder, None):
+            for term in QUERIES:
+                assert index.search(term, scope) == scan(data, term, scope), term
+            old = per_query(lambda term: scan(data, term, scope))
+            new = per_query(lambda term: index.search(term, scope))
+            print(f"{count:>8} {build * 1000:>9.0f} {memory / 2**20:>9.1f} {'folder' if scope else 'all':>7} "
+                  f"{old * 1000:>8.2f} {new * 1000:>9.3f}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,35 @@
+"""
+เปรียบเทียบรูปแบบ payload (utils/serializers.py): เวลา encode/decode และขนาด บน vault จำลอง 1k/10k/100k รายการ
+รัน: python benchmarks/bench_serializers.py [จำนวน ...]
+"""
+import sys
+import time
+import zlib
+
+from synthetic import SIZES, synthetic_vault
+from utils.serializers import SERIALIZERS
+
+def best_of(func, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(sizes):
+    print(f"{'entries':>8} {'format':>8} {'encode ms':>10} {'decode ms':>10} {'size KiB':>9} {'zlib KiB':>9}")
+    for count in sizes:
+        data = synthetic_vault(count)
+        for name, serializer in SERIALIZERS.items():
+            payload = serializer.dumps(data)
+            assert serializer.loads(payload) == data, name
+            encode = best_of(lambda: serializer.dumps(data))
+            decode = best_of(lambda: serializer.loads(payload))
+            packed = len(zlib.compress(payload, 6))
+            print(f"{count:>8} {name:>8} {encode * 1000:>10.1f} {decode * 1000:>10.1f} "
+                  f"{len(payload) / 1024:>9.0f} {packed / 1024:>9.0f}")
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,38 @@
+import os
+import sys
+import random
+import string
+
+# ให้สคริปต์ใน benchmarks/ import โมดูลของโปรแกรมได้เมื่อรันจากที่ใดก็ได้
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.entries import new_entry_id
+
+SIZES = (1000, 10000, 100000)
+
+def _word(rng: random.Random, low: int, high: int) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+def synthetic_vault(count: int, folders: int = 20, seed: int = 1) -> dict:
+    """vault จำลองที่มี entry count รายการกระจายในหลายโฟลเดอร์ (ชื่อภาษาไทยปนอังกฤษ ~1/4)"""
+    rng = random.Random(seed)
+    data = {
+        'master_hash': 'x' * 64,
+        'telegram_bot': '',
+        'telegram_chat': '',
+        'folders': {f"โฟลเดอร์ {i}": [] for i in range(folders)},
+    }
+    names = list(data['folders'])
+    for i in range(count):
+        site = _word(rng, 4, 10)
+        data['folders'][names[i % folders]].append({
+            'id': new_entry_id(),
+            'title': f"บัญชี {site}" if i % 4 == 0 else site.capitalize(),
+            'username': f"{_word(rng, 5, 9)}@example.com",
+            'password': ''.join(rng.choice(string.ascii_letters + string.digits + '!@#$%') for _ in range(16)),
+            'url': f"https://www.{site}.com/login",
+            'notes': _word(rng, 0, 40),
+        })
+    return data
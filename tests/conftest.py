@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+# ให้ไฟล์ทดสอบ import โมดูลของโปรแกรมได้เมื่อรัน pytest จากที่ใดก็ได้
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.kdf import ScryptKdf
+from utils.storage import DataStorage
+from utils.vault_service import DEFAULT_FOLDER, VaultService
+
+PASSWORD = "correct horse"
+
+@pytest.fixture
+def vault_root(tmp_path):
+    """โฟลเดอร์ข้อมูลชั่วคราวที่บันทึก KDF ค่าต่ำสุดไว้ใน metadata (ไม่ต้อง calibrate ทุกการทดสอบ)"""
+    DataStorage(root=tmp_path).save_metadata({'kdf': ScryptKdf(ScryptKdf.MIN_LOG_N).params()})
+    return tmp_path
+
+@pytest.fixture
+def vault(vault_root):
+    """vault แบบ JSON ที่สร้างใหม่และปลดล็อกแล้ว"""
+    service = VaultService(DataStorage(root=vault_root))
+    service.create_vault(PASSWORD)
+    yield service
+    service.close()
+
+def make_entry(title: str, notes: str = "") -> dict:
+    return {'title': title, 'username': f"{title.lower()}@example.com", 'password': "pw-" + title,
+            'url': f"https://{title.lower()}.example.com", 'notes': notes}
+
+def reopen(storage_cls, root, password: str = PASSWORD) -> VaultService:
+    """เปิด vault จากดิสก์ใหม่ด้วย storage ตัวใหม่ (เหมือนเปิดโปรแกรมใหม่)"""
+    service = VaultService(storage_cls(root=root))
+    assert service.unlock(password)
+    return service
+
+def folder_titles(service: VaultService) -> dict:
+    service.ensure_all_folders_loaded()
+    return {name: [entry['title'] for entry in entries] for name, entries in service.data['folders'].items()}
@@ -0,0 +1,59 @@
+import random
+
+from utils.entries import EntryIndex, ensure_entry_ids, new_entry_id
+
+def check(index: EntryIndex, model: dict):
+    """ข้อมูลและ index ต้องตรงกับ model (โฟลเดอร์ -> list ของ id ตามลำดับ)"""
+    folders = index.data['folders']
+    assert {name: [entry['id'] for entry in entries] for name, entries in folders.items()} == model
+    assert len(index) == sum(map(len, model.values()))
+    for name, ids in model.items():
+        for position, entry_id in enumerate(ids):
+            assert index.folder_of(entry_id) == name
+            assert index._position(name, entry_id) == position
+
+def test_random_operations_keep_order_and_positions():
+    rng = random.Random(7)
+    data = {'folders': {'a': [], 'b': []}}
+    index = EntryIndex(data)
+    model = {'a': [], 'b': []}
+    for step in range(3000):
+        action = rng.random()
+        ids = [entry_id for ids in model.values() for entry_id in ids]
+        if action < 0.4 or not ids:
+            folder = rng.choice('ab')
+            entry = {'id': new_entry_id(), 'title': str(step)}
+            index.add(folder, entry)
+            model[folder].append(entry['id'])
+        elif action < 0.65:
+            chosen = rng.sample(ids, min(len(ids), rng.choice((1, 1, 2, 5, 40))))
+            index.remove(chosen + ['missing'])
+            for ids_in_folder in model.values():
+                ids_in_folder[:] = [entry_id for entry_id in ids_in_folder if entry_id not in chosen]
+        elif action < 0.8:
+            entry_id = rng.choice(ids)
+            folder = 'b' if index.folder_of(entry_id) == 'a' else 'a'
+            index.move([entry_id], folder)
+            model['a' if folder == 'b' else 'b'].remove(entry_id)
+            model[folder].append(entry_id)
+        else:
+            entry_id = rng.choice(ids)
+            index.replace(entry_id, {'title': 'edited'})
+            folder = index.folder_of(entry_id)
+            assert data['folders'][folder][model[folder].index(entry_id)] == {'id': entry_id, 'title': 'edited'}
+        if step % 97 == 0:
+            check(index, model)
+    check(index, model)
+
+def test_remove_returns_entries_in_request_order():
+    data = {'folders': {'a': [{'id': str(i)} for i in range(5)]}}
+    index = EntryIndex(data)
+    assert [entry['id'] for entry in index.remove(['3', '1', 'x'])] == ['3', '1']
+    assert [entry['id'] for entry in data['folders']['a']] == ['0', '2', '4']
+
+def test_ensure_entry_ids_fills_missing_and_duplicates():
+    data = {'folders': {'a': [{'title': 'x'}, {'id': 'd'}], 'b': [{'id': 'd'}]}}
+    assert ensure_entry_ids(data)
+    ids = [entry['id'] for entries in data['folders'].values() for entry in entries]
+    assert len(set(ids)) == 3 and ids[1] == 'd'
+    assert not ensure_entry_ids(data)
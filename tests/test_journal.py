@@ -0,0 +1,103 @@
+import pytest
+
+from conftest import DEFAULT_FOLDER, folder_titles, make_entry, reopen
+from utils.journal import Journal, apply_ops
+from utils.storage import DataStorage
+
+def test_id_ops_replay_from_journal(vault, vault_root):
+    first = vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    second = vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    third = vault.add_entry(DEFAULT_FOLDER, make_entry("Gamma"))
+    vault.add_folder("งาน")
+    vault.update_entry(first['id'], dict(first, title="Alpha 2"))
+    vault.move_entries([second['id']], "งาน")
+    vault.delete_entries([third['id']])
+    assert vault.storage.flush()
+    # การแก้ไขทั้งหมดอยู่ใน journal ยังไม่ถูกรวมเป็น snapshot
+    assert vault.storage.journal.size() > 0
+
+    reopened = reopen(DataStorage, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha 2"], "งาน": ["Beta"]}
+    assert reopened.entry_index.folder_of(second['id']) == "งาน"
+    reopened.close()
+
+def test_legacy_index_ops_replay():
+    data = {'folders': {'a': [{'title': 't0'}, {'title': 't1'}, {'title': 't2'}]}}
+    apply_ops(data, [
+        {'op': 'update_entry', 'folder': 'a', 'index': 0, 'entry': {'title': 'new'}},
+        {'op': 'delete_entries', 'folder': 'a', 'indices': [1, 2]},
+        {'op': 'add_entry', 'folder': 'a', 'entry': {'title': 'added'}},
+    ])
+    assert [entry['title'] for entry in data['folders']['a']] == ['new', 'added']
+
+def test_legacy_then_id_ops_replay():
+    data = {'folders': {'a': [{'id': 'x', 'title': 'x'}, {'id': 'y', 'title': 'y'}]}}
+    apply_ops(data, [
+        {'op': 'delete_entries', 'folder': 'a', 'indices': [0]},
+        {'op': 'add_folder', 'folder': 'b'},
+        {'op': 'move_entries', 'ids': ['y'], 'to': 'b'},
+        {'op': 'update_entry', 'id': 'y', 'entry': {'id': 'y', 'title': 'y2'}},
+    ])
+    assert data['folders'] == {'a': [], 'b': [{'id': 'y', 'title': 'y2'}]}
+
+def test_crash_between_snapshot_and_trim(vault, vault_root, monkeypatch):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert vault.storage.flush()
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    assert vault.storage.flush()
+
+    # snapshot ใหม่ถูกเขียนแล้ว แต่โปรแกรมหยุดก่อนตัด journal
+    def crash(upto_seq):
+        raise RuntimeError("crash before trim")
+    monkeypatch.setattr(vault.storage.journal, 'trim', crash)
+    with pytest.raises(RuntimeError):
+        vault.storage.save_data(vault.full_data(), vault.session)
+    monkeypatch.undo()
+
+    # record ที่ snapshot รวมไว้แล้วต้องไม่ถูกใช้ซ้ำ
+    reopened = reopen(DataStorage, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha", "Beta"]}
+    reopened.add_entry(DEFAULT_FOLDER, make_entry("Gamma"))
+    reopened.close()
+    assert folder_titles(reopen(DataStorage, vault_root)) == {DEFAULT_FOLDER: ["Alpha", "Beta", "Gamma"]}
+
+def test_torn_tail_record_is_dropped(vault, vault_root):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert vault.storage.flush()
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    assert vault.storage.flush()
+    path = vault.storage.journal.path
+    # record สุดท้ายเขียนไม่ครบ (เครื่องดับระหว่างเขียน)
+    path.write_bytes(path.read_bytes()[:-5])
+
+    reopened = reopen(DataStorage, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha"]}
+    reopened.add_entry(DEFAULT_FOLDER, make_entry("Gamma"))
+    reopened.close()
+    assert folder_titles(reopen(DataStorage, vault_root)) == {DEFAULT_FOLDER: ["Alpha", "Gamma"]}
+
+def test_journal_rejects_records_from_other_journal(tmp_path, vault):
+    journal = Journal(tmp_path / "other.journal")
+    journal.start(b"\x01" * 16)
+    journal.append(vault.session, [{'op': 'add_folder', 'folder': 'x'}])
+    assert journal.replay(vault.session, b"\x02" * 16, 0) == []
+    assert journal.replay(vault.session, b"\x01" * 16, 0) == [{'op': 'add_folder', 'folder': 'x'}]
+
+def test_close_without_changes_does_not_rewrite_vault(vault, vault_root):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert vault.close()
+    reopened = reopen(DataStorage, vault_root)
+    assert reopened.storage.flush()
+    before = reopened.storage.filename.read_bytes()
+    assert reopened.close()
+    assert reopened.storage.filename.read_bytes() == before
+
+def test_close_compacts_large_journal(vault, vault_root, monkeypatch):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert vault.storage.flush()
+    assert vault.storage.journal.size() > 0
+    before = vault.storage.filename.read_bytes()
+    monkeypatch.setattr(vault.storage, 'needs_compaction', lambda: True)
+    assert vault.close()
+    assert vault.storage.filename.read_bytes() != before
+    assert folder_titles(reopen(DataStorage, vault_root)) == {DEFAULT_FOLDER: ["Alpha"]}
@@ -0,0 +1,30 @@
+import tracemalloc
+
+import pytest
+
+from utils.compression import DEFAULT_COMPRESSION
+
+ENTRIES = 20000
+
+def large_vault() -> dict:
+    entries = [{'id': f"{i:08x}", 'title': f"บัญชี {i}", 'username': f"user{i}@example.com",
+                'password': f"pw-{i * 7919:012d}", 'url': f"https://site{i % 500}.example.com",
+                'notes': "หมายเหตุ " * (i % 7)} for i in range(ENTRIES)]
+    return {'folders': {'ทั่วไป': entries[:ENTRIES // 2], 'งาน': entries[ENTRIES // 2:]}}
+
+@pytest.mark.parametrize("compression", [None, DEFAULT_COMPRESSION], ids=["plain", "compressed"])
+def test_read_payload_peak_stays_near_payload_size(vault, compression):
+    storage = vault.storage
+    storage.compression = compression
+    data = large_vault()
+    storage.save_data(data, vault.session)
+
+    tracemalloc.start()
+    try:
+        payload = storage.read_payload(vault.session)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert storage.parse_payload(payload, storage.serializer.name) == data
+    assert peak < 1.5 * len(payload)
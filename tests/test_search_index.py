@@ -0,0 +1,157 @@
+import random
+
+import pytest
+
+from conftest import DEFAULT_FOLDER, make_entry
+from utils.entries import EntryIndex, new_entry_id
+from utils.search_index import _INDEXED, NOTES, SearchIndex, entry_fields, normalize
+
+WORDS = ("Bank", "บัญชี", "ธนาคาร", "Mail", "GitHub", "กสิกร", "Shop", "ร้านค้า", "VPN", "น้ำ")
+
+def random_entry(rng: random.Random) -> dict:
+    title = " ".join(rng.sample(WORDS, rng.choice((1, 2))))
+    return {'id': new_entry_id(), 'title': title, 'username': f"{rng.choice(WORDS).lower()}{rng.randrange(50)}@mail.com",
+            'url': f"https://{rng.choice(('bank', 'shop', 'github'))}.example.com",
+            'notes': rng.choice(("", "PIN " + str(rng.randrange(10000)), "บัญชีออมทรัพย์"))}
+
+def naive_search(data: dict, term: str, folder: str) -> list:
+    """การค้นหาแบบเดิม: ไล่ทุกรายการในโฟลเดอร์ตามลำดับ หาคำค้นในชื่อหรือชื่อผู้ใช้"""
+    query = normalize(term)
+    return [entry['id'] for entry in data['folders'][folder]
+            if query in normalize(entry.get('title', '')) or query in normalize(entry.get('username', ''))]
+
+def postings(index: SearchIndex) -> dict:
+    """trigram posting ของทุกฟิลด์ในรูป id ของ entry (เทียบ index สองชุดที่หมายเลขเอกสารต่างกันได้)"""
+    ids = {doc: record[0] for doc, record in index._records.items()}
+    return {field: {gram: {ids[doc] for doc in docs} for gram, docs in index._trigrams[field].items()}
+            for field in _INDEXED}
+
+def check(index: SearchIndex, data: dict):
+    """index ต้องตรงกับข้อมูล และตรงกับ index ที่สร้างใหม่จากข้อมูลเดียวกัน"""
+    fresh = SearchIndex()
+    for folder, entries in data['folders'].items():
+        fresh.load_folder(folder, entries)
+    assert len(index) == sum(map(len, data['folders'].values()))
+    for folder, entries in data['folders'].items():
+        assert index.search("", folder) == [entry['id'] for entry in entries]
+        for entry in entries:
+            assert index.folder_of(entry['id']) == folder
+            assert index._records[index._docs[entry['id']]][2] == entry_fields(entry)
+    assert postings(index) == postings(fresh)
+    for field in _INDEXED:
+        assert index._prefixes[field] == fresh._prefixes[field]
+        for prefix, grams in index._prefixes[field].items():
+            assert all(gram.startswith(prefix) and gram in index._trigrams[field] for gram in grams)
+
+def test_random_operations_keep_index_consistent():
+    rng = random.Random(11)
+    search = SearchIndex()
+    data = {'folders': {'a': [], 'b': []}}
+    index = EntryIndex(data, search)
+    for step in range(1500):
+        action = rng.random()
+        ids = list(index._entries)
+        folders = list(data['folders'])
+        if action < 0.4 or not ids:
+            index.add(rng.choice(folders), random_entry(rng))
+        elif action < 0.55:
+            index.remove(rng.sample(ids, min(len(ids), rng.choice((1, 2, 7)))))
+        elif action < 0.7:
+            entry_id = rng.choice(ids)
+            index.replace(entry_id, dict(random_entry(rng), id=entry_id))
+        elif action < 0.8:
+            index.move(rng.sample(ids, min(len(ids), 3)), rng.choice(folders))
+        elif action < 0.87:
+            folder = rng.choice(folders)
+            index.rename_folder(folder, next(name for name in 'abc' if name not in folders))
+        else:
+            # พักโฟลเดอร์แล้วโหลดกลับ (notes ถูกทิ้งระหว่างพัก และกลับมาหลังโหลด)
+            folder = rng.choice(folders)
+            entries = list(data['folders'][folder])
+            index.unload_folder(folder)
+            assert all(not search._records[search._docs[entry['id']]][2][NOTES] for entry in entries)
+            index.load_folder(folder, entries)
+        if step % 50 == 0:
+            check(search, data)
+    check(search, data)
+
+def test_search_order_matches_substring_scan():
+    rng = random.Random(3)
+    search = SearchIndex()
+    data = {'folders': {'a': [], 'b': []}}
+    index = EntryIndex(data, search)
+    for _ in range(400):
+        index.add(rng.choice('ab'), random_entry(rng))
+    # แก้ไขและย้ายบางรายการ ลำดับในโฟลเดอร์ต้องยังตรงกับ list
+    for entry_id in rng.sample(list(index._entries), 60):
+        index.replace(entry_id, dict(random_entry(rng), id=entry_id))
+    index.move(rng.sample(list(index._entries), 40), 'a')
+
+    terms = ["", "b", "BA", "bank", "Bank Mail", "ank", "บัญ", "ธนาคาร", "บัญชี ธนาคาร", "น้ำ", "@mail",
+             "vpn1", "github", "zzz", "กสิกร", "1@"]
+    terms += [word[start:start + size] for word in WORDS for start in range(2) for size in (1, 2, 4)]
+    for term in terms:
+        for folder in data['folders']:
+            assert search.search(term, folder) == naive_search(data, term, folder), (term, folder)
+        # ค้นหาทุกโฟลเดอร์ได้ผลเดียวกัน (ไม่สนลำดับระหว่างโฟลเดอร์)
+        expected = {entry_id for folder in data['folders'] for entry_id in naive_search(data, term, folder)}
+        assert set(search.search(term)) == expected
+
+def test_search_ignores_notes_but_rank_uses_them():
+    search = SearchIndex()
+    entry = {'id': "x", 'title': "Bank", 'username': "alice", 'notes': "PIN 4321"}
+    search.add("a", entry)
+    assert search.search("4321") == []
+    assert search.rank("4321") == ["x"]
+    search.add("a", dict(entry, notes="PIN 9999"))
+    assert search.rank("4321") == []
+    assert search.rank("9999") == ["x"]
+
+class Boom(Exception):
+    pass
+
+def index_snapshot(search: SearchIndex) -> dict:
+    return {record[0]: (record[1], record[2]) for record in search._records.values()}
+
+@pytest.mark.parametrize("lean", [False, True], ids=["loaded", "memory-lean"])
+def test_rollback_restores_search_index(vault, lean):
+    alpha = vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha", notes="note alpha"))
+    vault.add_folder("งาน")
+    beta = vault.add_entry("งาน", make_entry("Beta", notes="note beta"))
+    if lean:
+        vault.set_memory_lean(True, keep={DEFAULT_FOLDER})
+        assert vault.folder_cache.is_sealed("งาน")
+    search = vault.search_index
+    before = index_snapshot(search)
+    assert before[beta['id']][1][NOTES] == ("" if lean else "note beta")
+    orders = {folder: search.search("", folder) for folder in vault.data['folders']}
+    grams = postings(search)
+
+    with pytest.raises(Boom):
+        with vault.transaction():
+            vault.update_entry(alpha['id'], dict(alpha, title="Changed", notes="secret"))
+            vault.move_entries([beta['id']], DEFAULT_FOLDER)
+            vault.add_entry("งาน", make_entry("Gamma"))
+            vault.rename_folder("งาน", "ที่ทำงาน")
+            raise Boom()
+
+    assert {folder: search.search("", folder) for folder in vault.data['folders']} == orders
+    assert postings(search) == grams
+    after = index_snapshot(search)
+    if lean:
+        # โฟลเดอร์ที่ถูกถอดรหัสระหว่าง transaction ยังคงถูกโหลดหลัง rollback (notes กลับเข้า index)
+        assert after[beta['id']][1] == entry_fields(beta)
+        after[beta['id']] = before[beta['id']]
+    assert after == before
+    assert search.rank("changed") == []
+    assert search.rank("beta") == [beta['id']]
+
+def test_rank_prefers_title_and_tolerates_typos():
+    search = SearchIndex()
+    search.load_folder("a", [
+        {'id': "notes", 'title': "Other", 'notes': "github token"},
+        {'id': "user", 'title': "Mail", 'username': "github-bot"},
+        {'id': "title", 'title': "GitHub"},
+    ])
+    assert search.rank("github") == ["title", "user", "notes"]
+    assert search.rank("githb")[0] == "title"
@@ -0,0 +1,72 @@
+import pytest
+
+from utils.search_query import Clause, free_text, has_folder_filter, parse_query, structured
+
+def text(value, negated=False):
+    return Clause('text', value, negated)
+
+@pytest.mark.parametrize("query, clauses", [
+    ("", []),
+    (None, []),
+    ("bank", [text("bank")]),
+    ("bank account", [text("bank"), text("account")]),
+    # ชื่อฟิลด์ที่ไม่รู้จักเป็นข้อความธรรมดาทั้งคำ
+    ("https://github.com/login", [text("https://github.com/login")]),
+    ("-https://x.com", [text("https://x.com", True)]),
+    ("foo:bar", [text("foo:bar")]),
+    ("c:\\temp", [text("c:\\temp")]),
+    # ชื่อฟิลด์ที่ไม่มีค่าตามหลัง
+    ("in:", [text("in:")]),
+    ("url:", [text("url:")]),
+    ("-title:", [text("title:", True)]),
+    # - ตัวเดียวถูกข้าม
+    ("-", []),
+    ("a - b", [text("a"), text("b")]),
+    ("user:alice -", [Clause('username', "alice", False)]),
+    # เครื่องหมายคำพูดที่ไม่ปิดใช้ข้อความถึงท้ายคำค้น
+    ('"bank of', [text("bank of")]),
+    ('title:"bank of', [Clause('title', "bank of", False)]),
+    ('-"old', [text("old", True)]),
+    ('"', []),
+    ('""', []),
+    ('note:a"b', [Clause('notes', 'a"b', False)]),
+    # ชื่อฟิลด์และชื่อแทน (ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+    ("in:work", [Clause('folder', "work", False)]),
+    ('IN:"my work"', [Clause('folder', "my work", False)]),
+    ("folder:work", [Clause('folder', "work", False)]),
+    ("Name:Bank", [Clause('title', "Bank", False)]),
+    ("site:github.com", [Clause('domain', "github.com", False)]),
+    ("user:alice -notes:old \"bank of\" x", [Clause('username', "alice", False), Clause('notes', "old", True),
+                                           text("bank of"), text("x")]),
+])
+def test_parse_query(query, clauses):
+    assert parse_query(query) == clauses
+
+@pytest.mark.parametrize("query, is_structured", [
+    ("", False),
+    ("bank account", False),
+    ("https://github.com/login", False),
+    ("-", False),
+    ("a - b", False),
+    ("in:", False),
+    ("-bank", True),
+    ('"bank of', True),
+    ('""', True),
+    ("in:work", True),
+    ("site:github.com", True),
+])
+def test_structured(query, is_structured):
+    assert (structured(query) is not None) == is_structured
+
+@pytest.mark.parametrize("query, expected", [
+    ("in:work", True),
+    ("folder:work bank", True),
+    ("-in:work", False),
+    ("in:", False),
+    ("title:work", False),
+])
+def test_has_folder_filter(query, expected):
+    assert has_folder_filter(query) == expected
+
+def test_free_text_skips_filters_and_exclusions():
+    assert free_text(parse_query('user:alice bank -old "of america"')) == "bank of america"
@@ -0,0 +1,39 @@
+import pytest
+
+from utils.serializers import PMBIN_MAGIC, SERIALIZERS, get_serializer
+
+# payload รูปแบบ PMB1 (รุ่นก่อน) ที่บันทึกไว้ เพื่อให้แน่ใจว่ายังอ่านไฟล์เดิมได้
+PMB1_PAYLOAD = bytes.fromhex(
+    "504d4231260000007b226d61737465725f68617368223a2268222c226c6f67696e5f617474656d707473223a327d05000200"
+    "696405007469746c650800757365726e616d6505006e6f74657301006e020004000000000100000200000300000300000000"
+    "010000040001020000000900e0b887e0b8b2e0b899020000000000010007000000010000000500000001000000000000000100"
+    "000001000000010000001400000061e0b89ae0b8b1e0b88de0b88ae0b8b5756278350c00e0b8a7e0b988e0b8b2e0b887000000"
+    "000000000000000000")
+PMB1_DATA = {'master_hash': 'h', 'login_attempts': 2, 'folders': {
+    'งาน': [{'id': 'a', 'title': 'บัญชี', 'username': 'u', 'notes': ''}, {'id': 'b', 'title': 'x', 'n': 5}],
+    'ว่าง': []}}
+
+SAMPLES = [
+    {'folders': {}},
+    PMB1_DATA,
+    # ทุก entry รูปทรงเดียวกัน (ทางลัดของ pmbin) และค่าว่าง
+    {'master_hash': 'h', 'folders': {'a': [{'title': str(i), 'notes': ''} for i in range(50)], 'b': [{'x': ''}]}},
+    # ค่าที่มี \x00 อยู่ในตัวและค่าที่ไม่ใช่ข้อความ
+    {'folders': {'a': [{'title': 'a\x00b', 'tags': ['x', None]}, {'title': '\x00'}, {'n': 1.5, 't': 'ไทย'}]}},
+]
+
+@pytest.mark.parametrize("name", sorted(SERIALIZERS))
+@pytest.mark.parametrize("data", SAMPLES)
+def test_round_trip(name, data):
+    serializer = get_serializer(name)
+    payload = serializer.dumps(data)
+    assert serializer.loads(payload) == data
+    assert serializer.loads(bytearray(payload)) == data
+
+def test_pmbin_reads_previous_version():
+    assert PMB1_PAYLOAD[:4] != PMBIN_MAGIC
+    assert get_serializer('pmbin').loads(PMB1_PAYLOAD) == PMB1_DATA
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        get_serializer('xml')
@@ -0,0 +1,257 @@
+import pytest
+
+from conftest import DEFAULT_FOLDER, PASSWORD, folder_titles, make_entry, reopen
+from utils.memory_storage import MemoryStorage
+from utils.sharded_storage import ShardedStorage
+from utils.sqlite_storage import SqliteStorage
+from utils.storage import DataStorage
+from utils.vault_service import VaultService
+from utils.writer import BackgroundWriter
+
+ENGINES = [DataStorage, SqliteStorage, ShardedStorage]
+
+class RecordingStorage:
+    """storage ปลอมสำหรับ BackgroundWriter: จดทุกการเขียนตามลำดับ"""
+
+    def __init__(self, failures: int = 0):
+        self.writes = []
+        # จำนวนครั้งที่ append_changes จะล้มเหลวก่อนกลับมาเขียนได้
+        self.failures = failures
+
+    def save_data(self, data, session):
+        self.writes.append(('snapshot', data))
+
+    def append_changes(self, ops, session):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.writes.append(('ops', list(ops)))
+        return True
+
+def test_writer_coalesces_ops_into_one_record():
+    storage = RecordingStorage()
+    writer = BackgroundWriter(storage, debounce=60, max_delay=60)
+    session = object()
+    for i in range(3):
+        writer.queue_ops(session, [{'op': 'add_folder', 'folder': str(i)}])
+    assert writer.flush()
+    assert storage.writes == [('ops', [{'op': 'add_folder', 'folder': str(i)} for i in range(3)])]
+
+def test_writer_snapshot_replaces_pending_snapshot_but_keeps_ops():
+    storage = RecordingStorage()
+    writer = BackgroundWriter(storage, debounce=60, max_delay=60)
+    session = object()
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'a'}])
+    writer.queue_snapshot(session, {'version': 1})
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'b'}])
+    writer.queue_snapshot(session, {'version': 2})
+    assert writer.flush()
+    assert storage.writes == [
+        ('ops', [{'op': 'add_folder', 'folder': 'a'}, {'op': 'add_folder', 'folder': 'b'}]),
+        ('snapshot', {'version': 2}),
+    ]
+
+def test_writer_flush_reports_errors_and_retries_failed_ops():
+    storage = RecordingStorage(failures=1)
+    writer = BackgroundWriter(storage, debounce=60, max_delay=60)
+    session = object()
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'a'}])
+    assert not writer.flush()
+    assert writer.snapshot_required
+    # op ที่ล้มเหลวไม่หาย: ถูกเขียนก่อน op ใหม่เมื่อเขียนได้อีกครั้ง
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'b'}])
+    assert writer.flush()
+    assert storage.writes == [('ops', [{'op': 'add_folder', 'folder': 'a'}]),
+                              ('ops', [{'op': 'add_folder', 'folder': 'b'}])]
+    assert not writer.snapshot_required
+
+def test_writer_failed_item_does_not_drop_rest_of_batch():
+    storage = RecordingStorage(failures=1)
+    writer = BackgroundWriter(storage, debounce=60, max_delay=60)
+    session = object()
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'a'}])
+    writer.queue_snapshot(session, {'version': 1})
+    writer.queue_ops(session, [{'op': 'add_folder', 'folder': 'b'}])
+    assert not writer.flush()
+    # snapshot รวม op ที่ล้มเหลวไว้แล้ว จึงไม่ต้องลองใหม่ และ op หลัง snapshot ยังถูกเขียน
+    assert storage.writes == [('snapshot', {'version': 1}), ('ops', [{'op': 'add_folder', 'folder': 'b'}])]
+    assert not writer.snapshot_required
+    assert writer.flush()
+
+def test_failed_journal_append_is_recovered_by_snapshot(vault, vault_root, monkeypatch):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert vault.storage.flush()
+    append = vault.storage.journal.append
+
+    def fail_once(session, ops):
+        monkeypatch.setattr(vault.storage.journal, 'append', append)
+        raise OSError("disk full")
+    monkeypatch.setattr(vault.storage.journal, 'append', fail_once)
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    assert not vault.storage.flush()
+    # journal บนดิสก์ตามหลัง: การแก้ไขถัดไปต้องเขียน snapshot ทั้งก้อน
+    assert vault.storage.needs_compaction()
+    assert not vault.storage.queue_changes([{'op': 'add_folder', 'folder': 'x'}], vault.session)
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Gamma"))
+    assert vault.storage.flush()
+    assert not vault.storage.needs_compaction()
+    assert vault.close()
+    assert folder_titles(reopen(DataStorage, vault_root)) == {DEFAULT_FOLDER: ["Alpha", "Beta", "Gamma"]}
+
+def test_close_writes_snapshot_after_failed_append(vault, vault_root, monkeypatch):
+    def fail(session, ops):
+        raise OSError("disk full")
+    monkeypatch.setattr(vault.storage.journal, 'append', fail)
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert not vault.storage.flush()
+    assert vault.close()
+    monkeypatch.undo()
+    assert folder_titles(reopen(DataStorage, vault_root)) == {DEFAULT_FOLDER: ["Alpha"]}
+
+def test_previous_snapshot_plus_journal_after_lost_main_file(vault, vault_root):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    vault.save()
+    assert vault.storage.flush()
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    vault.save()
+    assert vault.storage.flush()
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Gamma"))
+    assert vault.storage.flush()
+
+    # ไฟล์หลักหาย: .prev + record ที่ยังเก็บไว้ใน journal ต้องได้ข้อมูลครบ
+    vault.storage.filename.unlink()
+    reopened = reopen(DataStorage, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha", "Beta", "Gamma"]}
+    reopened.close()
+
+def test_corrupt_main_file_falls_back_to_previous(vault, vault_root):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    vault.save()
+    assert vault.storage.flush()
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    vault.save()
+    assert vault.storage.flush()
+
+    path = vault.storage.filename
+    blob = bytearray(path.read_bytes())
+    blob[-20] ^= 0xFF
+    path.write_bytes(bytes(blob))
+    reopened = reopen(DataStorage, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha", "Beta"]}
+    reopened.close()
+
+def test_no_temporary_files_left_after_save(vault, vault_root):
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    vault.save()
+    assert vault.storage.flush()
+    assert not list(vault_root.glob("*.tmp"))
+
+@pytest.mark.parametrize("storage_cls", ENGINES, ids=lambda cls: cls.ENGINE)
+def test_engine_round_trip(vault_root, storage_cls):
+    service = VaultService(storage_cls(root=vault_root))
+    service.create_vault(PASSWORD)
+    alpha = service.add_entry(DEFAULT_FOLDER, make_entry("Alpha", "บันทึก"))
+    beta = service.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    service.add_folder("งาน")
+    service.add_entry("งาน", make_entry("Gamma"))
+    service.update_entry(alpha['id'], dict(alpha, title="Alpha 2"))
+    service.move_entries([beta['id']], "งาน")
+    service.rename_folder("งาน", "ที่ทำงาน")
+    service.update_settings("bot", "chat")
+    assert service.close()
+
+    reopened = reopen(storage_cls, vault_root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha 2"], "ที่ทำงาน": ["Gamma", "Beta"]}
+    entry = reopened.entry_index.get(alpha['id'])[1]
+    assert entry['notes'] == "บันทึก" and entry['password'] == "pw-Alpha"
+    assert reopened.data['telegram_bot'] == "bot"
+    reopened.close()
+
+def test_memory_storage_round_trip():
+    storage = MemoryStorage()
+    service = VaultService(storage)
+    service.create_vault(PASSWORD)
+    service.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    assert service.close()
+
+    reopened = VaultService(storage)
+    assert not reopened.unlock(PASSWORD + "x")
+    assert reopened.unlock(PASSWORD)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha"]}
+
+@pytest.mark.parametrize("storage_cls", ENGINES, ids=lambda cls: cls.ENGINE)
+def test_wrong_password_does_not_unlock(vault_root, storage_cls):
+    service = VaultService(storage_cls(root=vault_root))
+    service.create_vault(PASSWORD)
+    assert service.close()
+    assert not VaultService(storage_cls(root=vault_root)).unlock(PASSWORD + "x")
+
+def test_sqlite_unlock_decrypts_no_entry_rows(vault_root, monkeypatch):
+    service = VaultService(SqliteStorage(root=vault_root))
+    service.create_vault(PASSWORD)
+    service.add_folder("งาน")
+    for i in range(5):
+        service.add_entry(DEFAULT_FOLDER, make_entry(f"Home{i}"))
+        service.add_entry("งาน", make_entry(f"Work{i}"))
+    assert service.close()
+
+    opened = []
+    open_row = SqliteStorage._open
+
+    def counting_open(session, kind, key, nonce, value):
+        opened.append(kind)
+        return open_row(session, kind, key, nonce, value)
+    monkeypatch.setattr(SqliteStorage, '_open', staticmethod(counting_open))
+
+    reopened = reopen(SqliteStorage, vault_root)
+    assert 'entry' not in opened
+    assert reopened.lazy_folders == {DEFAULT_FOLDER, "งาน"}
+    # เปิดโฟลเดอร์หนึ่ง: ถอดรหัสเฉพาะแถวของโฟลเดอร์นั้น
+    assert [entry['title'] for entry in reopened.entries("งาน")] == [f"Work{i}" for i in range(5)]
+    assert opened.count('entry') == 5
+    # การแก้ไขและการปิดเขียนเฉพาะแถวที่เปลี่ยน ไม่ถอดรหัสแถวใดเพิ่ม
+    reopened.add_entry("งาน", make_entry("Work5"))
+    assert reopened.close()
+    assert opened.count('entry') == 5
+    assert folder_titles(reopen(SqliteStorage, vault_root)) == {
+        DEFAULT_FOLDER: [f"Home{i}" for i in range(5)], "งาน": [f"Work{i}" for i in range(6)]}
+
+@pytest.mark.parametrize("storage_cls", ENGINES, ids=lambda cls: cls.ENGINE)
+def test_entry_count_of_unloaded_and_sealed_folders(vault_root, storage_cls):
+    service = VaultService(storage_cls(root=vault_root))
+    service.create_vault(PASSWORD)
+    service.add_folder("งาน")
+    for i in range(3):
+        service.add_entry("งาน", make_entry(f"Work{i}"))
+    assert service.close()
+
+    reopened = reopen(storage_cls, vault_root)
+    lazy = "งาน" in reopened.lazy_folders
+    assert reopened.entry_count("งาน") == 3
+    # นับได้โดยไม่ต้องถอดรหัสโฟลเดอร์
+    assert ("งาน" in reopened.lazy_folders) == lazy
+    reopened.entries("งาน")
+    reopened.set_memory_lean(True, keep={DEFAULT_FOLDER})
+    assert reopened.folder_cache.is_sealed("งาน")
+    assert reopened.data['folders']["งาน"] == []
+    assert reopened.entry_count("งาน") == 3
+    assert reopened.folder_cache.is_sealed("งาน")
+    reopened.close()
+
+def test_sealed_folder_notes_leave_search_index(vault):
+    vault.add_folder("งาน")
+    vault.add_entry("งาน", make_entry("Bank", notes="PIN 4321"))
+    vault.add_entry(DEFAULT_FOLDER, make_entry("Home", notes="PIN 1111"))
+    vault.set_memory_lean(True, keep={DEFAULT_FOLDER})
+    assert vault.folder_cache.is_sealed("งาน")
+
+    index = vault.search_index
+    assert not any("4321" in field for _, _, fields in index._records.values() for field in fields)
+    # ชื่อยังค้นหาได้ แต่ notes ของโฟลเดอร์ที่ถูกพักไม่พบจนกว่าจะโหลด
+    assert index.search("bank") and index.rank("bank")
+    assert [index.folder_of(entry_id) for entry_id in index.rank("4321")] == []
+    assert [index.folder_of(entry_id) for entry_id in index.rank("1111")] == [DEFAULT_FOLDER]
+
+    vault.ensure_folder_loaded("งาน", keep={"งาน"})
+    assert [index.folder_of(entry_id) for entry_id in index.rank("4321")] == ["งาน"]
+    vault.close()
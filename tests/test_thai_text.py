@@ -0,0 +1,88 @@
+import pytest
+
+from utils import thai_text
+from utils.thai_text import _maximal_matching, normalize_thai, segment, split_words, word_spans
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    """แทนที่ตัวตัดคำของ pythainlp (None = ไม่ได้ติดตั้ง) และล้าง cache ของ segment ก่อน/หลังทดสอบ"""
+    def use(function):
+        monkeypatch.setattr(thai_text, '_word_tokenize', function)
+        segment.cache_clear()
+    yield use
+    segment.cache_clear()
+
+@pytest.mark.parametrize("typed, canonical", [
+    # วรรณยุกต์พิมพ์ก่อนสระบน: ก + ่ + ี
+    ("\u0e01\u0e48\u0e35", "กี่"),
+    ("\u0e17\u0e48\u0e35", "ที่"),
+    # ํ + า แทน ำ (มีวรรณยุกต์คั่นได้ทั้งสองลำดับ)
+    ("\u0e19\u0e49\u0e4d\u0e32", "น้ำ"),
+    ("\u0e19\u0e4d\u0e49\u0e32", "น้ำ"),
+    ("\u0e01\u0e4d\u0e32", "กำ"),
+    # เ + เ แทน แ และเครื่องหมายซ้ำ
+    ("\u0e40\u0e40\u0e01", "แก"),
+    ("\u0e01\u0e35\u0e48\u0e48", "กี่"),
+    # NFC และข้อความที่ไม่มีอักษรไทย
+    ("cafe\u0301", "caf\u00e9"),
+])
+def test_normalize_thai(typed, canonical):
+    assert typed != canonical
+    assert normalize_thai(typed) == canonical
+    assert normalize_thai(canonical) == canonical
+
+@pytest.mark.parametrize("run, words", [
+    ("บัญชีธนาคาร", ("บัญชี", "ธนาคาร")),
+    ("บัญชีกสิกรไทย", ("บัญชี", "กสิกรไทย")),
+    ("รหัสผ่านอีเมล", ("รหัสผ่าน", "อีเมล")),
+    # คำที่ไม่รู้จักติดกันรวมเป็นคำเดียว และไม่ตัดกลางพยางค์
+    ("บัญชีสมหญิง", ("บัญชี", "สมหญิง")),
+    ("กขค", ("กขค",)),
+    ("", ()),
+])
+def test_maximal_matching(run, words):
+    assert _maximal_matching(run) == words
+
+def test_segment_without_pythainlp(tokenizer):
+    tokenizer(None)
+    assert segment("บัญชีธนาคาร") == ("บัญชี", "ธนาคาร")
+
+def test_segment_with_pythainlp(tokenizer):
+    calls = []
+    def word_tokenize(text, keep_whitespace=True):
+        calls.append(text)
+        return ["บัญ", "ชีธนาคาร"]
+    tokenizer(word_tokenize)
+    assert segment("บัญชีธนาคาร") == ("บัญ", "ชีธนาคาร")
+    assert segment("บัญชีธนาคาร") == ("บัญ", "ชีธนาคาร")
+    # ผลถูก cache ไว้
+    assert calls == ["บัญชีธนาคาร"]
+
+@pytest.mark.parametrize("word_tokenize", [
+    lambda text, keep_whitespace=True: ["บัญชี"],
+    lambda text, keep_whitespace=True: 1 / 0,
+], ids=["mismatch", "error"])
+def test_segment_falls_back_when_pythainlp_fails(tokenizer, word_tokenize):
+    tokenizer(word_tokenize)
+    assert segment("บัญชีธนาคาร") == ("บัญชี", "ธนาคาร")
+
+def test_segment_with_installed_pythainlp(tokenizer):
+    tokenize = pytest.importorskip("pythainlp.tokenize")
+    tokenizer(tokenize.word_tokenize)
+    assert segment("บัญชีธนาคาร") == ("บัญชี", "ธนาคาร")
+
+@pytest.mark.parametrize("text, words", [
+    ("", []),
+    ("GitHub  login", ["GitHub", "login"]),
+    ("บัญชีธนาคาร", ["บัญชี", "ธนาคาร"]),
+    ("บัญชีธนาคาร กสิกร", ["บัญชี", "ธนาคาร", "กสิกร"]),
+    # ส่วนที่ไม่ใช่อักษรไทยในคำเดียวกันแยกเป็นคำของตัวเอง
+    ("บัญชีKBank", ["บัญชี", "KBank"]),
+    ("(บัญชี)", ["(", "บัญชี", ")"]),
+])
+def test_word_spans(tokenizer, text, words):
+    tokenizer(None)
+    spans = word_spans(text)
+    assert [text[start:end] for start, end in spans] == words
+    assert split_words(text) == words
+    assert all(start < end for start, end in spans)
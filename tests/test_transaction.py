@@ -0,0 +1,100 @@
+import copy
+
+import pytest
+
+from conftest import DEFAULT_FOLDER, folder_titles, make_entry, reopen
+from utils.sharded_storage import ShardedStorage
+from utils.storage import DataStorage
+from utils.vault_service import VaultService
+
+FOLDERS = (DEFAULT_FOLDER, "งาน", "ที่ทำงาน", "ใหม่")
+
+class Boom(Exception):
+    pass
+
+def index_state(service: VaultService) -> tuple:
+    """id -> โฟลเดอร์ ตาม entry_index และผลค้นหาของแต่ละโฟลเดอร์ใน search index (ทุก entry มี example.com)"""
+    search = service.search_index
+    return ({entry_id: service.entry_index.folder_of(entry_id) for entry_id in service.entry_index._entries},
+            len(search), {folder: search.search("example.com", folder) for folder in FOLDERS})
+
+@pytest.fixture
+def filled(vault):
+    alpha = vault.add_entry(DEFAULT_FOLDER, make_entry("Alpha"))
+    beta = vault.add_entry(DEFAULT_FOLDER, make_entry("Beta"))
+    vault.add_folder("งาน")
+    gamma = vault.add_entry("งาน", make_entry("Gamma"))
+    assert vault.storage.flush()
+    return vault, alpha, beta, gamma
+
+def test_rollback_restores_data_and_indexes(filled):
+    vault, alpha, beta, gamma = filled
+    before = copy.deepcopy(vault.data)
+    indexes = index_state(vault)
+    with pytest.raises(Boom):
+        with vault.transaction():
+            vault.update_entry(alpha['id'], dict(alpha, title="Changed"))
+            vault.move_entries([beta['id']], "งาน")
+            vault.delete_entries([gamma['id']])
+            vault.add_entry(DEFAULT_FOLDER, make_entry("Delta"))
+            vault.add_folder("ใหม่")
+            vault.rename_folder("งาน", "ที่ทำงาน")
+            raise Boom()
+    assert not vault.in_transaction
+    assert vault.data == before
+    assert index_state(vault) == indexes
+    assert [entry['title'] for _, entry in vault.search_all("delta")] == []
+    assert [entry['title'] for _, entry in vault.search_all("gamma")] == ["Gamma"]
+
+    # ไม่มีอะไรจาก transaction ที่ถูกยกเลิกถูกบันทึก
+    vault.close()
+    reopened = reopen(DataStorage, vault.storage.root)
+    assert folder_titles(reopened) == {DEFAULT_FOLDER: ["Alpha", "Beta"], "งาน": ["Gamma"]}
+    reopened.close()
+
+def test_commit_saves_once(filled, monkeypatch):
+    vault, alpha, beta, gamma = filled
+    calls = []
+    monkeypatch.setattr(vault.storage, 'queue_changes', lambda ops, session: calls.append(list(ops)) or True)
+    monkeypatch.setattr(vault.storage, 'queue_snapshot', lambda data, session: calls.append('snapshot'))
+    with vault.transaction():
+        vault.update_entry(alpha['id'], dict(alpha, title="Alpha 2"))
+        vault.move_entries([beta['id']], "งาน")
+        assert calls == []
+    assert [[op['op'] for op in ops] for ops in calls] == [['update_entry', 'move_entries']]
+
+def test_nested_transaction_joins_outer(filled):
+    vault, alpha, beta, gamma = filled
+    before = copy.deepcopy(vault.data)
+    with pytest.raises(Boom):
+        with vault.transaction():
+            vault.retitle_entries([alpha['id'], beta['id']], "Same")
+            # retitle_entries เปิด transaction ซ้อน — ต้องไม่ commit แยกเมื่อจบ
+            assert vault.in_transaction
+            raise Boom()
+    assert vault.data == before
+
+def test_settings_and_engine_switch_refused_inside_transaction(vault):
+    with vault.transaction():
+        with pytest.raises(RuntimeError):
+            vault.update_settings("bot", "chat")
+        with pytest.raises(RuntimeError):
+            vault.switch_storage('sqlite')
+
+def test_rollback_keeps_folders_loaded_during_transaction(vault_root):
+    service = VaultService(ShardedStorage(root=vault_root))
+    service.create_vault("pw")
+    service.add_folder("งาน")
+    service.add_entry("งาน", make_entry("Gamma"))
+    assert service.close()
+
+    service = reopen(ShardedStorage, vault_root, "pw")
+    assert "งาน" in service.lazy_folders
+    with pytest.raises(Boom):
+        with service.transaction():
+            service.add_entry("งาน", make_entry("Delta"))
+            raise Boom()
+    # โฟลเดอร์ที่ถอดรหัสระหว่าง transaction กลับเป็นค่าตอนโหลดและยังโหลดอยู่
+    assert "งาน" not in service.lazy_folders
+    assert [entry['title'] for entry in service.entries("งาน")] == ["Gamma"]
+    service.close()
@@ -1,11 +1,15 @@
 from pathlib import Path
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                                QLineEdit, QPushButton, QTextEdit, QMessageBox,
-                               QFileDialog, QApplication, QComboBox, QStyle)
-from PySide6.QtCore import Qt, QTimer
+                               QFileDialog, QApplication, QComboBox, QStyle,
+                               QProgressBar, QCheckBox)
+from PySide6.QtCore import Qt, QTimer, QThreadPool
 from PySide6.QtGui import QFont, QIcon
 from utils.telegram import TelegramNotifier
 from utils.crypto import CryptoManager
+from utils.entries import new_entry_id
+from utils.engines import ENGINE_LABELS
+from ui.workers import UnlockWorker
 import csv
 import chardet
 
@@ -130,12 +134,17 @@ class LoginDialog(QDialog):
         super().showEvent(event)
         self.center_on_screen()
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, storage=None, prepare=None):
         super().__init__(parent)
         self.setWindowTitle("เข้าสู่ระบบ")
         self.setModal(True)
         self.setMinimumWidth(400)
         self.attempts = 0
+        # ถ้ามี storage จะปลดล็อกใน worker thread แล้วเก็บผลไว้ที่ unlock_result
+        self.storage = storage
+        self.prepare = prepare
+        self.worker = None
+        self.unlock_result = None
         self.set_window_icon()
         self.setup_ui()
         self.apply_style()
@@ -179,6 +188,23 @@ class LoginDialog(QDialog):
         self.login_btn.clicked.connect(self.login)
         layout.addWidget(self.login_btn)
         
+        self.progress_label = QLabel("")
+        self.progress_label.setAlignment(Qt.AlignCenter)
+        self.progress_label.setStyleSheet("color: #666;")
+        self.progress_label.hide()
+        layout.addWidget(self.progress_label)
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+        layout.addWidget(self.progress_bar)
+        
+        self.cancel_btn = QPushButton("ยกเลิก")
+        self.cancel_btn.setMinimumHeight(40)
+        self.cancel_btn.clicked.connect(self.cancel_unlock)
+        self.cancel_btn.hide()
+        layout.addWidget(self.cancel_btn)
+        
         self.setLayout(layout)
     
     def apply_style(self):
@@ -212,8 +238,66 @@ class LoginDialog(QDialog):
     
     def login(self):
         self.entered_password = self.password_input.text()
-        if self.entered_password:
+        if not self.entered_password or self.worker is not None:
+            return
+        if self.storage is None:
             self.accept()
+            return
+        
+        self.set_unlocking(True)
+        self.worker = UnlockWorker(self.storage, self.entered_password, self.prepare)
+        self.worker.signals.progress.connect(self.on_unlock_progress)
+        self.worker.signals.finished.connect(self.on_unlock_finished)
+        self.worker.signals.cancelled.connect(self.on_unlock_cancelled)
+        QThreadPool.globalInstance().start(self.worker)
+    
+    def set_unlocking(self, unlocking: bool):
+        self.password_input.setEnabled(not unlocking)
+        self.login_btn.setVisible(not unlocking)
+        self.progress_label.setVisible(unlocking)
+        self.progress_bar.setVisible(unlocking)
+        self.cancel_btn.setVisible(unlocking)
+        self.cancel_btn.setEnabled(True)
+        if unlocking:
+            self.progress_bar.setValue(0)
+    
+    def on_unlock_progress(self, percent, text):
+        self.progress_bar.setValue(percent)
+        if self.cancel_btn.isEnabled():
+            # กดยกเลิกแล้ว: คงข้อความว่ากำลังรอขั้นตอนปัจจุบัน
+            self.progress_label.setText(text)
+    
+    def on_unlock_finished(self, result):
+        if self.worker is None:
+            # ผลที่ส่งมาก่อนหน้าต่างถูกปิด (reject) — ไม่มีผู้ใช้แล้ว
+            if result:
+                result.session.wipe()
+            return
+        # result เป็น None เมื่อรหัสผ่านผิด — ให้ผู้เรียกจัดการ (นับครั้ง/ล็อกระบบ) เหมือนเดิม
+        self.worker = None
+        self.unlock_result = result
+        self.accept()
+    
+    def cancel_unlock(self):
+        if self.worker is not None:
+            self.cancel_btn.setEnabled(False)
+            # ยกเลิกได้ระหว่างขั้นตอนเท่านั้น — การตรวจรหัสผ่าน (KDF) ที่เริ่มแล้วหยุดกลางทางไม่ได้
+            self.progress_label.setText("กำลังยกเลิก... รอให้ขั้นตอนปัจจุบัน (เช่น การตรวจรหัสผ่าน) เสร็จก่อน")
+            self.worker.cancel()
+    
+    def on_unlock_cancelled(self):
+        if self.worker is None:
+            return
+        self.worker = None
+        self.set_unlocking(False)
+        self.password_input.setFocus()
+    
+    def reject(self):
+        # ปิดหน้าต่างระหว่างปลดล็อก: สั่งยกเลิก worker (ผลที่ได้ภายหลังจะถูกทิ้งและล้าง session)
+        if self.worker is not None:
+            self.worker.abandon()
+            self.worker = None
+        super().reject()
 
 class PasswordEntryDialog(QDialog):
     """หน้าต่างเพิ่ม/แก้ไขรหัสผ่าน"""
@@ -345,6 +429,8 @@ class PasswordEntryDialog(QDialog):
             return
         
         self.result = {
+            # แก้ไขแล้วยังใช้ id เดิม
+            'id': (self.entry_data or {}).get('id') or new_entry_id(),
             'title': self.title_input.text(),
             'username': self.username_input.text(),
             'password': self.password_input.text(),
@@ -596,22 +682,11 @@ class PasswordDetailDialog(QDialog):
         
             # ส่งกลับไปยัง MainWindow และบันทึก
             main_window = self.parent()
-            if main_window:
+            vault = getattr(main_window, 'vault', None)
+            if vault is not None:
                 try:
-                    # อัปเดตในข้อมูลหลัก
-                    if hasattr(main_window, 'current_folder') and main_window.current_folder:
-                        folder_data = main_window.data['folders'].get(main_window.current_folder, [])
-                    
-                        # ค้นหา entry เดิมและแทนที่
-                        for i in range(len(folder_data)):
-                            if (folder_data[i].get('title') == entry.get('title') and 
-                                folder_data[i].get('username') == entry.get('username')):
-                                folder_data[i] = updated_data
-                                break
-                    
-                        # บันทึกลงไฟล์
-                        main_window.save_data()
-                    
+                    # อัปเดตในข้อมูลหลักและบันทึก (อ้างอิงด้วย id จึงไม่สับสนกับบัญชีที่ชื่อซ้ำกัน)
+                    if vault.update_entry(entry.get('id'), updated_data) is not None:
                         # Reload MainWindow เพื่อแสดงข้อมูลใหม่
                         main_window.load_passwords()
                 except Exception as e:
@@ -630,11 +705,9 @@ class PasswordDetailDialog(QDialog):
         )
         if reply == QMessageBox.Yes:
             main = self.parent()
-            if main and hasattr(main, 'data') and main.current_folder:
-                folder_data = main.data['folders'][main.current_folder]
-                if entry in folder_data:
-                    folder_data.remove(entry)
-                    main.save_data()
+            vault = getattr(main, 'vault', None)
+            if vault is not None and vault.entry_index is not None and entry.get('id') in vault.entry_index:
+                vault.delete_entries([entry['id']])
 
             self.password_entries.pop(self.current_index)
             if not self.password_entries:
@@ -669,6 +742,8 @@ class SettingsDialog(QDialog):
         self.result_bot = self.bot_id
         self.result_chat = self.chat_id
         self.new_master_password = None
+        self.result_engine = getattr(storage, 'ENGINE', None)
+        self.result_memory_lean = bool(getattr(getattr(parent, 'vault', None), 'folder_cache', None))
 
         self.set_window_icon()
         self.setup_ui()
@@ -736,6 +811,34 @@ class SettingsDialog(QDialog):
         self.confirm_password_input.setPlaceholderText("ยืนยันรหัสผ่านหลักใหม่")
         layout.addWidget(self.confirm_password_input)
 
+        # Storage engine
+        title3 = QLabel("🗄️ รูปแบบการจัดเก็บ")
+        title3.setFont(QFont("Arial", 16, QFont.Bold))
+        title3.setStyleSheet("margin-top: 20px;")
+        layout.addWidget(title3)
+
+        self.engine_combo = QComboBox()
+        for engine, label in ENGINE_LABELS.items():
+            self.engine_combo.addItem(label, engine)
+        current = self.engine_combo.findData(self.result_engine)
+        if current >= 0:
+            self.engine_combo.setCurrentIndex(current)
+        else:
+            # storage ที่ไม่ใช่ไฟล์ (เช่นในหน่วยความจำ) ย้ายรูปแบบไม่ได้
+            self.engine_combo.setEnabled(False)
+        layout.addWidget(self.engine_combo)
+
+        self.memory_lean_check = QCheckBox("โหมดประหยัดหน่วยความจำ (ถอดรหัสเฉพาะโฟลเดอร์ที่ใช้ล่าสุด)")
+        self.memory_lean_check.setChecked(self.result_memory_lean)
+        layout.addWidget(self.memory_lean_check)
+        cache = getattr(getattr(self.parent_window, 'vault', None), 'folder_cache', None)
+        if cache:
+            stats = cache.stats()
+            cache_info = QLabel(f"cache: hit {stats['hits']} / miss {stats['misses']} — "
+                                f"ถอดรหัสอยู่ {stats['resident_entries']} รายการ, พักไว้ {stats['sealed_folders']} โฟลเดอร์")
+            cache_info.setStyleSheet("color: #666; font-size: 11px;")
+            layout.addWidget(cache_info)
+
         # Buttons: Backup, Test, Save, Cancel
         btn_layout = QHBoxLayout()
 
@@ -813,6 +916,8 @@ class SettingsDialog(QDialog):
     def save_settings(self):
         self.result_bot = self.bot_input.text().strip()
         self.result_chat = self.chat_input.text().strip()
+        self.result_engine = self.engine_combo.currentData()
+        self.result_memory_lean = self.memory_lean_check.isChecked()
         self.new_master_password = None
 
         current_pwd = self.current_password_input.text()
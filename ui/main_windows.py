@@ -4,34 +4,24 @@ from collections import defaultdict
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                                QLabel, QLineEdit, QPushButton, QListWidget, 
                                QMessageBox, QInputDialog, QFrame, QApplication,
-                               QMenu, QListWidgetItem, QDialog, QStyle)
-from PySide6.QtCore import Qt
+                               QMenu, QListWidgetItem, QDialog, QStyle,
+                               QAbstractItemView)
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QFont, QIcon
-from utils.storage import DataStorage
-from utils.crypto import CryptoManager
-from utils.telegram import TelegramNotifier
+from utils.search_query import has_folder_filter
+from utils.vault_service import VaultService
 from ui.dialogs import (SetupDialog, LoginDialog, PasswordEntryDialog, 
                         PasswordDetailDialog, SettingsDialog, ImportCSVDialog,
                         RenameFolderDialog)
-from PySide6.QtCore import QDateTime
-import platform
-import tempfile
-from datetime import datetime
+from ui.workers import SearchScheduler
 
 class PasswordManager(QMainWindow):
-    """หน้าต่างหลักของโปรแกรม"""
+    """หน้าต่างหลักของโปรแกรม — แสดงผลและรับคำสั่งจากผู้ใช้ ข้อมูลทั้งหมดอยู่ใน VaultService"""
     
-    def __init__(self):
+    def __init__(self, storage=None):
         super().__init__()
-        self.storage = DataStorage()
-        self.master_password = None
-        self.data = {
-            'master_hash': None,
-            'telegram_bot': '',
-            'telegram_chat': '',
-            'folders': {},
-            'login_attempts': 0
-        }
+        # storage: backend ที่จะใช้ (ดู utils/engines.py) — ไม่ระบุ = ตามการตั้งค่า (ปกติคือไฟล์ในโฟลเดอร์ข้อมูล)
+        self.vault = VaultService(storage)
         self.current_folder = None
         
         self.set_window_icon()
@@ -97,127 +87,36 @@ class PasswordManager(QMainWindow):
     
     def init_login(self):
         """เริ่มต้นการ login"""
-        loaded_data = self.try_load_existing_data()
-
-        if loaded_data is not None:
-            try:
-                meta = self.storage.load_metadata()
-                if meta:
-                    self.data['telegram_bot'] = meta.get('telegram_bot', '')
-                    self.data['telegram_chat'] = meta.get('telegram_chat', '')
-            except Exception:
-                pass
-        
-        if loaded_data is None:
+        vault = self.vault
+        if not vault.has_vault():
             dialog = SetupDialog(self)
             if dialog.exec():
-                self.master_password = dialog.master_password
-                self.data['master_hash'] = CryptoManager.hash_password(self.master_password)
-                self.data['folders'] = {'ทั่วไป': []}
-                self.save_data()
+                vault.create_vault(dialog.master_password)
                 self.init_ui()
                 self.center_on_screen()
                 self.show()
             else:
                 sys.exit()
+            return
+
+        vault.load_public_settings()
+        # ปลดล็อก (KDF -> ตรวจค่าตรวจกุญแจ -> ถอดรหัส -> parse) ใน worker thread ของ LoginDialog
+        # รหัสผ่านผิดจะถูกปฏิเสธหลัง KDF โดยไม่ถอดรหัส payload
+        login_dialog = LoginDialog(self, vault.storage, prepare=vault.prepare_data)
+        if not login_dialog.exec():
+            sys.exit()
+        result = login_dialog.unlock_result
+        if result and vault.accept_unlock(login_dialog.entered_password, result.session, result.data, result.prepared):
+            self.init_ui()
+            self.center_on_screen()
+            self.show()
+            # แสดงหน้าต่างก่อน แล้วค่อยบันทึก (ย้ายรูปแบบไฟล์/รีเซ็ตตัวนับ) หลัง event loop ว่าง
+            QTimer.singleShot(0, vault.save_after_unlock)
         else:
-            login_dialog = LoginDialog(self)
-            if login_dialog.exec():
-                entered_password = login_dialog.entered_password
-                loaded = self.storage.load_data(entered_password)
-                
-                if loaded and loaded.get('master_hash') == CryptoManager.hash_password(entered_password):
-                    self.master_password = entered_password
-                    self.data = loaded
-                    self.data['login_attempts'] = 0
-                    self.save_data()
-                    self.init_ui()
-                    self.center_on_screen()
-                    self.show()
-                else:
-                    self.handle_failed_login()
-            else:
-                sys.exit()
-    
-    def try_load_existing_data(self):
-        """ลองโหลดข้อมูลที่มีอยู่"""
-        if not self.storage.filename.exists():
-            return None
-        return True
+            self.handle_failed_login()
     
     def handle_failed_login(self):
-        attempts = (self.data.get('login_attempts', 0) + 1)
-        self.data['login_attempts'] = attempts
-
-        bot = self.data.get('telegram_bot', '')
-        chat = self.data.get('telegram_chat', '')
-
-        if bot and chat:
-            msg = f"พยายามเข้าสู่ระบบล้มเหลว \nเวลา: {QDateTime.currentDateTime().toString('dd/MM/yyyy hh:mm')}\nเครื่อง: {platform.node()}"
-            try:
-                TelegramNotifier.send_message(bot, chat, msg)
-            except Exception:
-                # ไม่แสดง logging ตามที่ร้องขอ — เงียบไว้
-                pass
-
-        if attempts >= 3:
-            if bot and chat:
-                try:
-                    tmp_dir = Path(tempfile.gettempdir())
-                    csv_name = f"backup_before_delete_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                    csv_path = tmp_dir / csv_name
-
-                    # ถ้า self.data ว่าง ให้ลองโหลดสำรองจาก storage (ถ้ามี)
-                    data_to_export = self.data
-                    try:
-                        if not data_to_export.get('folders'):
-                            if hasattr(self.storage, "decrypt_backup_with_master"):
-                                backup = self.storage.decrypt_backup_with_master() or {}
-                            elif hasattr(self.storage, "load_plaintext_backup"):
-                                backup = self.storage.load_plaintext_backup() or {}
-                            else:
-                                backup = {}
-                            if backup and backup.get('folders'):
-                                data_to_export = backup
-                    except Exception:
-                        # เงียบไว้ตามคำขอ (ไม่ใช้ logging)
-                        pass
-                except Exception:
-                    pass
-
-            # ลบข้อมูลทั้งหมดแล้วลบ metadata/ไฟล์ที่เกี่ยวข้อง (รวม secure_data.meta หากมี)
-            try:
-                # ลบไฟล์ข้อมูลหลัก
-                try:
-                    self.storage.delete_all_data()
-                except Exception:
-                    pass
-
-                # พยายามลบไฟล์ metadata / key / backup ทุกชนิดที่อาจถูกสร้าง
-                try:
-                    candidates = [
-                        self.storage.filename.with_suffix('.meta'),
-                        self.storage.filename.with_suffix('.meta.json'),
-                        self.storage.filename.with_suffix('.meta.bin'),
-                        self.storage.filename.with_suffix('.mkey.bin'),
-                        self.storage.filename.with_suffix('.backup.enc'),
-                        self.storage.filename.with_suffix('.backup.bin'),
-                        # ถ้ามีไฟล์ชื่อ secure_data.meta อยู่โดยตรง ในโฟลเดอร์เดียวกัน ให้ลบทิ้งด้วย
-                        Path(self.storage.filename.parent) / 'secure_data.meta'
-                    ]
-                    for p in candidates:
-                        try:
-                            if p.exists():
-                                p.unlink(missing_ok=True)
-                        except Exception:
-                            # เงียบ — ล้างพยายามต่อไป
-                            pass
-                except Exception:
-                    pass
-
-            except Exception:
-                pass
-
+        if self.vault.record_failed_login():
             QMessageBox.critical(None, "ล็อคระบบ", "ลบข้อมูลทั้งหมดแล้ว")
             sys.exit()
         else:
@@ -293,6 +192,8 @@ class PasswordManager(QMainWindow):
                 background-color: #3498db;
             }
         """)
+        # เลือกหลายโฟลเดอร์ได้ (Ctrl/Shift) สำหรับลบ/ย้ายรายการทีละหลายโฟลเดอร์
+        self.folder_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.folder_list.itemClicked.connect(self.select_folder)
         self.folder_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.folder_list.customContextMenuRequested.connect(self.show_folder_context_menu)
@@ -355,6 +256,11 @@ class PasswordManager(QMainWindow):
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 ค้นหา...")
+        self.search_input.setToolTip(
+            "ค้นหาชื่อหรือชื่อผู้ใช้ หรือกรองตามฟิลด์:\n"
+            "  folder:งาน  user:alice  url:github.com  title:ธนาคาร  notes:pin\n"
+            "  -notes:เก่า  (ไม่เอารายการที่ตรง)   \"คำที่มี ช่องว่าง\"  (ทั้งวลี)"
+        )
         self.search_input.setFixedWidth(300)
         self.search_input.setStyleSheet("""
             QLineEdit {
@@ -368,9 +274,24 @@ class PasswordManager(QMainWindow):
                 border-color: #3498db;
             }
         """)
+        # ค้นหาขณะพิมพ์ใน worker thread (รอหยุดพิมพ์ก่อน และแสดงเฉพาะผลของคำค้นล่าสุด)
+        self.search_scheduler = SearchScheduler(self.find_passwords, self)
+        self.search_scheduler.results.connect(self.show_search_results)
         self.search_input.textChanged.connect(self.search_passwords)
         header_layout.addWidget(self.search_input)
         
+        # ค้นหาทุกโฟลเดอร์ เรียงตามความใกล้เคียง (แทนการกรองเฉพาะโฟลเดอร์ที่เลือก)
+        self.global_search_btn = QPushButton("🌐 ทุกโฟลเดอร์")
+        self.global_search_btn.setCheckable(True)
+        self.global_search_btn.setToolTip("ค้นหาทุกโฟลเดอร์ทั้งชื่อ เว็บไซต์ ชื่อผู้ใช้ และหมายเหตุ (พิมพ์ผิดเล็กน้อยก็พบ)")
+        self.global_search_btn.setStyleSheet(self.get_button_style("#7f8c8d") + """
+            QPushButton:checked {
+                background-color: #3498db;
+            }
+        """)
+        self.global_search_btn.toggled.connect(self.search_passwords)
+        header_layout.addWidget(self.global_search_btn)
+        
         self.add_password_btn = QPushButton("+ เพิ่มรหัสผ่าน")
         self.add_password_btn.setStyleSheet("""
             QPushButton {
@@ -417,6 +338,8 @@ class PasswordManager(QMainWindow):
                 font-weight: bold;
             }
         """)
+        # เลือกหลายรายการได้ (Ctrl/Shift) — ย้าย/ลบ/เปลี่ยนชื่อกลุ่มทำครั้งเดียวทั้งชุด
+        self.password_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.password_list.itemDoubleClicked.connect(self.view_password_details)
         self.password_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.password_list.customContextMenuRequested.connect(self.show_password_context_menu)
@@ -436,6 +359,11 @@ class PasswordManager(QMainWindow):
         self.delete_btn.setStyleSheet(self.get_button_style("#e74c3c"))
         btn_bar.addWidget(self.delete_btn)
         
+        self.move_btn = QPushButton("📂 ย้าย")
+        self.move_btn.clicked.connect(self.move_selected_passwords)
+        self.move_btn.setStyleSheet(self.get_button_style("#8e44ad"))
+        btn_bar.addWidget(self.move_btn)
+        
         btn_bar.addStretch()
         
         content_layout.addLayout(btn_bar)
@@ -485,6 +413,9 @@ class PasswordManager(QMainWindow):
             return
         
         folder_name = item.text().replace("📁 ", "")
+        selected = self.selected_folder_names()
+        if folder_name not in selected:
+            selected = [folder_name]
         
         menu = QMenu()
         menu.setStyleSheet("""
@@ -503,15 +434,27 @@ class PasswordManager(QMainWindow):
             }
         """)
         
-        rename_action = menu.addAction("✏️ เปลี่ยนชื่อ")
-        delete_action = menu.addAction("🗑️ ลบ")
+        rename_action = None
+        if len(selected) == 1:
+            rename_action = menu.addAction("✏️ เปลี่ยนชื่อ")
+            delete_action = menu.addAction("🗑️ ลบ")
+        else:
+            delete_action = menu.addAction(f"🗑️ ลบ {len(selected)} โฟลเดอร์")
+        move_action = menu.addAction("📂 ย้ายรายการทั้งหมดไปยัง...")
         
         action = menu.exec(self.folder_list.mapToGlobal(position))
         
+        if action is None:
+            return
         if action == rename_action:
             self.rename_folder(folder_name)
         elif action == delete_action:
-            self.delete_folder(folder_name)
+            if len(selected) == 1:
+                self.delete_folder(folder_name)
+            else:
+                self.delete_selected_folders(selected)
+        elif action == move_action:
+            self.move_folder_contents(selected)
     
     def show_password_context_menu(self, position):
         """แสดงเมนูคลิกขวาสำหรับรหัสผ่าน"""
@@ -536,23 +479,38 @@ class PasswordManager(QMainWindow):
             }
         """)
         
-        view_action = menu.addAction("👁 ดูรายละเอียด")
-        edit_action = menu.addAction("✏️ แก้ไข")
-        delete_action = menu.addAction("🗑️ ลบ")
+        # คลิกขวานอกรายการที่เลือกไว้ = ทำกับรายการนั้นรายการเดียว
+        if not item.isSelected():
+            self.password_list.setCurrentItem(item)
+        count = len(self.password_list.selectedItems())
+        
+        view_action = edit_action = None
+        if count == 1:
+            view_action = menu.addAction("👁 ดูรายละเอียด")
+            edit_action = menu.addAction("✏️ แก้ไข")
+        move_action = menu.addAction("📂 ย้ายไปโฟลเดอร์...")
+        retitle_action = menu.addAction("🏷️ เปลี่ยนชื่อกลุ่ม...")
+        delete_action = menu.addAction("🗑️ ลบ" if count == 1 else f"🗑️ ลบ {count} กลุ่มที่เลือก")
         
         action = menu.exec(self.password_list.mapToGlobal(position))
         
+        if action is None:
+            return
         if action == view_action:
             self.view_password_details(item)
         elif action == edit_action:
             self.edit_password()
+        elif action == move_action:
+            self.move_selected_passwords()
+        elif action == retitle_action:
+            self.retitle_selected_passwords()
         elif action == delete_action:
             self.delete_password()
     
     def load_folders(self):
         """โหลดรายการโฟลเดอร์"""
         self.folder_list.clear()
-        for folder_name in self.data['folders'].keys():
+        for folder_name in self.vault.folder_names():
             self.folder_list.addItem(f"📁 {folder_name}")
         
         if self.folder_list.count() > 0:
@@ -574,24 +532,9 @@ class PasswordManager(QMainWindow):
             grouped[pwd['title']].append(pwd)
         return grouped
     
-    def load_passwords(self, search_term=""):
-        """โหลดรายการรหัสผ่าน"""
-        self.password_list.clear()
-        
-        if not self.current_folder:
-            return
-        
-        passwords = self.data['folders'].get(self.current_folder, [])
-        
-        # Filter by search term
-        if search_term:
-            passwords = [pwd for pwd in passwords if 
-                        search_term.lower() in pwd['title'].lower() or 
-                        search_term.lower() in pwd['username'].lower()]
-        
-        # Group by title
-        grouped = self.group_passwords_by_title(passwords)
-        
+    def password_rows(self, grouped):
+        """ข้อความและข้อมูลของแต่ละแถวในรายการรหัสผ่าน (ไม่แตะ widget จึงเรียกจาก worker thread ได้)"""
+        rows = []
         for title, entries in grouped.items():
             if len(entries) == 1:
                 pwd = entries[0]
@@ -600,27 +543,99 @@ class PasswordManager(QMainWindow):
                     display_text += f"\n   🌐 {pwd['url']}"
             else:
                 display_text = f"🔐 {title}\n   👥 {len(entries)} บัญชี"
-            
+            rows.append((display_text, {'title': title, 'entries': entries}))
+        return rows
+    
+    def show_password_rows(self, rows):
+        """แทนที่รายการรหัสผ่านบนหน้าจอ (ปิดการวาดระหว่างเพิ่มรายการ)"""
+        self.password_list.setUpdatesEnabled(False)
+        self.password_list.clear()
+        for display_text, data in rows:
             item = QListWidgetItem(display_text)
-            item.setData(Qt.UserRole, {'title': title, 'entries': entries})
+            item.setData(Qt.UserRole, data)
             self.password_list.addItem(item)
+        self.password_list.setUpdatesEnabled(True)
+    
+    def ranked_rows(self, results):
+        """แถวของผลค้นหาทุกโฟลเดอร์: หนึ่งแถวต่อรายการตามลำดับคะแนน พร้อมชื่อโฟลเดอร์"""
+        rows = []
+        for folder_name, pwd in results:
+            display_text = f"🔐 {pwd['title']}\n   👤 {pwd['username']}\n   📁 {folder_name}"
+            rows.append((display_text, {'title': pwd['title'], 'entries': [pwd]}))
+        return rows
+    
+    def global_search_active(self, search_term) -> bool:
+        """ค้นหาทุกโฟลเดอร์: เปิดปุ่มไว้ หรือคำค้นระบุ folder: เอง"""
+        return bool(search_term) and (self.global_search_btn.isChecked() or has_folder_filter(search_term))
+    
+    def load_passwords(self, search_term=""):
+        """โหลดรายการรหัสผ่าน"""
+        # ผลค้นหาที่ค้างอยู่เก่ากว่าข้อมูลที่กำลังจะแสดง
+        self.search_scheduler.cancel()
+        
+        if self.global_search_active(search_term):
+            keep = {self.current_folder} if self.current_folder else ()
+            self.show_password_rows(self.ranked_rows(self.vault.search_ranked(search_term, keep=keep)))
+            return
+        
+        if not self.current_folder:
+            self.password_list.clear()
+            return
+        
+        # โฟลเดอร์ที่แสดงอยู่ไม่ถูกพัก (รายการบนหน้าจออ้างอิง entry ของโฟลเดอร์นี้)
+        passwords = self.vault.search(self.current_folder, search_term, keep={self.current_folder})
+        
+        # Group by title
+        grouped = self.group_passwords_by_title(passwords)
+        self.show_password_rows(self.password_rows(grouped))
     
     def search_passwords(self):
-        """ค้นหารหัสผ่าน"""
+        """ค้นหารหัสผ่าน (เริ่มหลังหยุดพิมพ์ และทำใน worker thread)"""
         search_term = self.search_input.text()
-        self.load_passwords(search_term)
+        if self.global_search_active(search_term):
+            # โฟลเดอร์ที่ยังไม่เคยเปิดต้องถอดรหัสใน GUI thread ก่อน (เข้า index) — worker ใช้ index อย่างเดียว
+            self.vault.ensure_all_folders_loaded(keep={self.current_folder} if self.current_folder else ())
+            self.search_scheduler.schedule((None, search_term))
+            return
+        if not self.current_folder:
+            return
+        # ถอดรหัสโฟลเดอร์ใน GUI thread ก่อน — worker อ่านข้อมูลอย่างเดียว
+        self.vault.entries(self.current_folder, keep={self.current_folder})
+        self.search_scheduler.schedule((self.current_folder, search_term))
+    
+    def find_passwords(self, query, cancelled):
+        """ค้นหาและจัดกลุ่ม (รันใน worker thread) คืนค่า None ถ้ามีคำค้นใหม่กว่าแล้ว"""
+        folder_name, search_term = query
+        if folder_name is None:
+            # ทุกโฟลเดอร์: จัดอันดับใน worker ได้ id แล้วให้ GUI thread อ่าน entry (อาจต้องถอดรหัสโฟลเดอร์ที่ถูกพัก)
+            entry_ids = self.vault.find_ranked(search_term)
+            return None if cancelled() else (None, entry_ids)
+        passwords = self.vault.find(folder_name, search_term, cancelled)
+        if passwords is None or cancelled():
+            return None
+        rows = self.password_rows(self.group_passwords_by_title(passwords))
+        return None if cancelled() else (folder_name, rows)
+    
+    def show_search_results(self, result):
+        # (โฟลเดอร์, แถว) หรือ (None, id ของผลค้นหาทุกโฟลเดอร์)
+        folder_name, found = result
+        if folder_name is None:
+            if self.global_search_active(self.search_input.text()):
+                keep = {self.current_folder} if self.current_folder else ()
+                self.show_password_rows(self.ranked_rows(self.vault.resolve(found, keep)))
+        elif folder_name == self.current_folder:
+            self.show_password_rows(found)
     
     def add_folder(self):
         """เพิ่มโฟลเดอร์ใหม่"""
         folder_name, ok = QInputDialog.getText(self, "เพิ่มโฟลเดอร์", "ชื่อโฟลเดอร์:")
         
         if ok and folder_name:
-            if folder_name in self.data['folders']:
-                QMessageBox.warning(self, "คำเตือน", "มีโฟลเดอร์นี้อยู่แล้ว")
+            try:
+                self.vault.add_folder(folder_name)
+            except ValueError as e:
+                QMessageBox.warning(self, "คำเตือน", str(e))
                 return
-            
-            self.data['folders'][folder_name] = []
-            self.save_data()
             self.load_folders()
             QMessageBox.information(self, "สำเร็จ", f"เพิ่มโฟลเดอร์ '{folder_name}' แล้ว")
             self.maybe_prompt_backup("เพิ่มโฟลเดอร์")
@@ -630,21 +645,16 @@ class PasswordManager(QMainWindow):
         dialog = RenameFolderDialog(self, folder_name)
         if dialog.exec():
             new_name = dialog.new_folder_name
-            
-            if new_name == folder_name:
-                return
-            
-            if new_name in self.data['folders']:
-                QMessageBox.warning(self, "คำเตือน", "มีโฟลเดอร์ชื่อนี้อยู่แล้ว")
+            try:
+                if not self.vault.rename_folder(folder_name, new_name):
+                    return
+            except ValueError as e:
+                QMessageBox.warning(self, "คำเตือน", str(e))
                 return
             
-            self.data['folders'][new_name] = self.data['folders'][folder_name]
-            del self.data['folders'][folder_name]
-            
             if self.current_folder == folder_name:
                 self.current_folder = new_name
             
-            self.save_data()
             self.load_folders()
             QMessageBox.information(self, "สำเร็จ", f"เปลี่ยนชื่อเป็น '{new_name}' แล้ว")
             self.maybe_prompt_backup("เปลี่ยนชื่อโฟลเดอร์")
@@ -652,11 +662,11 @@ class PasswordManager(QMainWindow):
     def delete_folder(self, folder_name):
         """ลบโฟลเดอร์"""
         self.maybe_prompt_backup("ลบโฟลเดอร์")
-        if len(self.data['folders']) == 1:
+        if len(self.vault.folder_names()) == 1:
             QMessageBox.warning(self, "คำเตือน", "ต้องมีอย่างน้อย 1 โฟลเดอร์")
             return
         
-        passwords_count = len(self.data['folders'][folder_name])
+        passwords_count = self.vault.entry_count(folder_name)
         reply = QMessageBox.question(
             self,
             "ยืนยันการลบ",
@@ -665,11 +675,54 @@ class PasswordManager(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            del self.data['folders'][folder_name]
-            self.save_data()
+            self.vault.delete_folder(folder_name)
             self.load_folders()
             QMessageBox.information(self, "สำเร็จ", f"ลบโฟลเดอร์ '{folder_name}' แล้ว")
     
+    def selected_folder_names(self):
+        """ชื่อโฟลเดอร์ที่เลือกอยู่ในแถบด้านข้าง (ตามลำดับที่แสดง)"""
+        return [item.text().replace("📁 ", "") for item in self.folder_list.selectedItems()]
+    
+    def ask_target_folder(self, exclude=()):
+        """ถามโฟลเดอร์ปลายทาง คืนค่า None ถ้ายกเลิกหรือไม่มีโฟลเดอร์ให้เลือก"""
+        names = [name for name in self.vault.folder_names() if name not in exclude]
+        if not names:
+            QMessageBox.warning(self, "คำเตือน", "ไม่มีโฟลเดอร์ปลายทางให้เลือก")
+            return None
+        target, ok = QInputDialog.getItem(self, "ย้ายไปโฟลเดอร์", "โฟลเดอร์ปลายทาง:", names, 0, False)
+        return target if ok and target else None
+    
+    def delete_selected_folders(self, folder_names):
+        """ลบหลายโฟลเดอร์พร้อมกัน (ยืนยันครั้งเดียว บันทึกครั้งเดียว)"""
+        self.maybe_prompt_backup("ลบโฟลเดอร์")
+        count = sum(self.vault.entry_count(name) for name in folder_names)
+        reply = QMessageBox.question(
+            self,
+            "ยืนยันการลบ",
+            f"ต้องการลบ {len(folder_names)} โฟลเดอร์ใช่หรือไม่?\n"
+            + "\n".join(f"📁 {name}" for name in folder_names)
+            + f"\n(มีรหัสผ่าน {count} รายการ)",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            deleted = self.vault.delete_folders(folder_names)
+        except ValueError as e:
+            QMessageBox.warning(self, "คำเตือน", str(e))
+            return
+        self.load_folders()
+        QMessageBox.information(self, "สำเร็จ", f"ลบ {len(deleted)} โฟลเดอร์แล้ว")
+    
+    def move_folder_contents(self, folder_names):
+        """ย้ายทุกรายการในโฟลเดอร์ที่เลือกไปยังโฟลเดอร์อื่น (บันทึกครั้งเดียว)"""
+        target = self.ask_target_folder(exclude=folder_names)
+        if target is None:
+            return
+        moved = self.vault.move_folder_contents(folder_names, target, keep={self.current_folder})
+        self.load_passwords(self.search_input.text())
+        QMessageBox.information(self, "สำเร็จ", f"ย้าย {len(moved)} รายการไปยัง '{target}' แล้ว")
+    
     def add_password(self):
         """เพิ่มรหัสผ่านใหม่"""
         if not self.current_folder:
@@ -678,8 +731,7 @@ class PasswordManager(QMainWindow):
         
         dialog = PasswordEntryDialog(self, folder_name=self.current_folder)
         if dialog.exec():
-            self.data['folders'][self.current_folder].append(dialog.result)
-            self.save_data()
+            self.vault.add_entry(self.current_folder, dialog.result)
             self.load_passwords()
             QMessageBox.information(self, "สำเร็จ", "เพิ่มรหัสผ่านแล้ว")
             self.maybe_prompt_backup("เพิ่มรหัสผ่าน")
@@ -715,13 +767,10 @@ class PasswordManager(QMainWindow):
         if len(entries) == 1:
             # Edit single entry
             password_entry = entries[0]
-            passwords = self.data['folders'][self.current_folder]
-            idx = passwords.index(password_entry)
             
             dialog = PasswordEntryDialog(self, password_entry, self.current_folder)
             if dialog.exec():
-                self.data['folders'][self.current_folder][idx] = dialog.result
-                self.save_data()
+                self.vault.update_entry(password_entry['id'], dialog.result)
                 self.load_passwords()
                 QMessageBox.information(self, "สำเร็จ", "แก้ไขรหัสผ่านแล้ว")
                 self.maybe_prompt_backup("แก้ไขรหัสผ่าน")
@@ -730,34 +779,70 @@ class PasswordManager(QMainWindow):
             dialog = PasswordDetailDialog(self, entries)
             dialog.exec()
     
+    def selected_entries(self):
+        """รายการทั้งหมดในกลุ่มที่เลือกอยู่ (เลือกได้หลายกลุ่ม)"""
+        entries = []
+        for item in self.password_list.selectedItems():
+            entries.extend(item.data(Qt.UserRole)['entries'])
+        return entries
+    
     def delete_password(self):
-        """ลบรหัสผ่าน"""
+        """ลบรหัสผ่านในกลุ่มที่เลือก (หลายกลุ่มได้ ยืนยันครั้งเดียว บันทึกครั้งเดียว)"""
         self.maybe_prompt_backup("ลบรหัสผ่าน")
-        data = self.get_selected_password_data()
-        if not data:
+        items = self.password_list.selectedItems()
+        if not items:
             QMessageBox.warning(self, "คำเตือน", "กรุณาเลือกรหัสผ่านที่ต้องการลบ")
             return
         
-        title = data['title']
-        entries = data['entries']
+        entries = self.selected_entries()
+        if len(items) == 1:
+            question = f"คุณต้องการลบ '{items[0].data(Qt.UserRole)['title']}' ({len(entries)} รายการ) ใช่หรือไม่?"
+        else:
+            question = f"คุณต้องการลบ {len(items)} กลุ่มที่เลือก ({len(entries)} รายการ) ใช่หรือไม่?"
         
         reply = QMessageBox.question(
             self,
             "ยืนยันการลบ",
-            f"คุณต้องการลบ '{title}' ({len(entries)} รายการ) ใช่หรือไม่?",
+            question,
             QMessageBox.Yes | QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
-            passwords = self.data['folders'][self.current_folder]
-            for entry in entries:
-                if entry in passwords:
-                    passwords.remove(entry)
-            
-            self.save_data()
-            self.load_passwords()
+            self.vault.delete_entries([entry['id'] for entry in entries])
+            self.load_passwords(self.search_input.text())
             QMessageBox.information(self, "สำเร็จ", "ลบรหัสผ่านแล้ว")
     
+    def move_selected_passwords(self):
+        """ย้ายรหัสผ่านในกลุ่มที่เลือกไปยังโฟลเดอร์อื่น"""
+        entries = self.selected_entries()
+        if not entries:
+            QMessageBox.warning(self, "คำเตือน", "กรุณาเลือกรหัสผ่านที่ต้องการย้าย")
+            return
+        target = self.ask_target_folder(exclude={self.current_folder})
+        if target is None:
+            return
+        moved = self.move_entries([entry['id'] for entry in entries], target)
+        self.load_passwords(self.search_input.text())
+        QMessageBox.information(self, "สำเร็จ", f"ย้าย {len(moved)} รายการไปยัง '{target}' แล้ว")
+    
+    def retitle_selected_passwords(self):
+        """เปลี่ยนชื่อกลุ่ม (title) ของรหัสผ่านที่เลือกทั้งหมด — ใช้รวมหลายกลุ่มเป็นกลุ่มเดียว"""
+        items = self.password_list.selectedItems()
+        if not items:
+            QMessageBox.warning(self, "คำเตือน", "กรุณาเลือกรหัสผ่านที่ต้องการเปลี่ยนชื่อ")
+            return
+        title, ok = QInputDialog.getText(self, "เปลี่ยนชื่อกลุ่ม", "ชื่อใหม่:", text=items[0].data(Qt.UserRole)['title'])
+        title = title.strip()
+        if not ok or not title:
+            return
+        changed = self.vault.retitle_entries([entry['id'] for entry in self.selected_entries()], title)
+        self.load_passwords(self.search_input.text())
+        QMessageBox.information(self, "สำเร็จ", f"เปลี่ยนชื่อ {len(changed)} รายการเป็น '{title}' แล้ว")
+    
+    def move_entries(self, ids, folder_name: str):
+        """ย้ายรหัสผ่านตาม id ไปยังโฟลเดอร์อื่น"""
+        return self.vault.move_entries(ids, folder_name, keep={self.current_folder})
+    
     def import_csv(self):
         """นำเข้าข้อมูลจาก CSV และสร้างโฟลเดอร์อัตโนมัติ"""
         dialog = ImportCSVDialog(self)
@@ -767,42 +852,7 @@ class PasswordManager(QMainWindow):
                 QMessageBox.warning(self, "ไม่มีข้อมูล", "ไม่พบข้อมูลที่จะนำเข้า")
                 return
 
-            count = 0
-            folders_created = set()
-            
-            for item in imported_data:
-                try:
-                    # ดึงชื่อโฟลเดอร์จาก CSV
-                    folder_name = item.get('folder', '').strip()
-                    
-                    # ถ้าไม่มีชื่อโฟลเดอร์ ให้ใช้ "Imported"
-                    if not folder_name:
-                        folder_name = "Imported"
-                    
-                    # สร้างโฟลเดอร์ถ้ายังไม่มี
-                    if folder_name not in self.data['folders']:
-                        self.data['folders'][folder_name] = []
-                        folders_created.add(folder_name)
-                    
-                    # สร้างข้อมูลรหัสผ่าน
-                    password_entry = {
-                        'title': item.get('title', '').strip(),
-                        'username': item.get('username', '').strip(),
-                        'password': item.get('password', '').strip(),
-                        'url': item.get('url', '').strip(),
-                        'notes': item.get('notes', '').strip()
-                    }
-                    
-                    # เพิ่มเข้าไปในโฟลเดอร์
-                    self.data['folders'][folder_name].append(password_entry)
-                    count += 1
-                    
-                except Exception as e:
-                    # ข้ามรายการที่มีปัญหา
-                    continue
-            
-            # บันทึกข้อมูล
-            self.save_data()
+            count, folders_created = self.vault.import_entries(imported_data)
             
             # โหลดโฟลเดอร์ใหม่
             self.load_folders()
@@ -817,37 +867,36 @@ class PasswordManager(QMainWindow):
     
     def open_settings(self):
         """เปิดหน้าตั้งค่า"""
+        vault = self.vault
         dialog = SettingsDialog(
             self,
-            self.data.get('telegram_bot', ''),
-            self.data.get('telegram_chat', ''),
-            self.master_password,
-            self.storage
+            vault.data.get('telegram_bot', ''),
+            vault.data.get('telegram_chat', ''),
+            vault.master_password,
+            vault.storage
         )
         
         if dialog.exec():
-            # เก็บค่าใหม่จาก dialog (เหมือนเดิม)
-            self.data['telegram_bot'] = dialog.result_bot
-            self.data['telegram_chat'] = dialog.result_chat
-            
+            try:
+                vault.update_settings(
+                    dialog.result_bot,
+                    dialog.result_chat,
+                    new_password=dialog.new_master_password,
+                    memory_lean=dialog.result_memory_lean,
+                    keep={self.current_folder} if self.current_folder else ()
+                )
+            except ValueError as e:
+                QMessageBox.warning(self, "คำเตือน", str(e))
+                return
             if dialog.new_master_password:
-                old_password = self.master_password
-                new_password = dialog.new_master_password
-                self.master_password = new_password
-                self.data['master_hash'] = CryptoManager.hash_password(new_password)
                 QMessageBox.information(self, "สำเร็จ", "เปลี่ยนรหัสผ่านหลักแล้ว")
-            
-            self.save_data()
 
-            # บันทึก metadata (ไม่เข้ารหัส) ถ้ามีเมทอด
-            try:
-                if hasattr(self.storage, "save_metadata"):
-                    self.storage.save_metadata({
-                        'telegram_bot': self.data.get('telegram_bot', ''),
-                        'telegram_chat': self.data.get('telegram_chat', '')
-                    })
-            except Exception:
-                pass
+            if (dialog.result_engine and dialog.result_engine != vault.storage.ENGINE
+                    and vault.can_switch_storage()):
+                if vault.switch_storage(dialog.result_engine):
+                    QMessageBox.information(self, "สำเร็จ", "ย้ายข้อมูลไปยังรูปแบบการจัดเก็บใหม่แล้ว")
+                else:
+                    QMessageBox.warning(self, "ย้ายข้อมูลไม่สำเร็จ", "ยังใช้รูปแบบการจัดเก็บเดิม — ข้อมูลไม่เปลี่ยนแปลง")
 
             QMessageBox.information(self, "สำเร็จ", "บันทึกการตั้งค่าแล้ว")
 
@@ -876,84 +925,20 @@ class PasswordManager(QMainWindow):
             pass  # เงียบตามคำขอ
 
     def backup_now(self):
-        """
-        สร้าง CSV ชั่วคราวจากข้อมูล (หรือจาก backup ที่ถอดได้) และส่งไฟล์ไปที่ Telegram
-        แจ้งผลสำเร็จ/ล้มเหลวให้ผู้ใช้ทราบ
-        """
-        bot = self.data.get('telegram_bot', '') or ''
-        chat = self.data.get('telegram_chat', '') or ''
-
-        if not bot or not chat:
-            QMessageBox.warning(self, "ไม่สามารถสำรอง", "ยังไม่ได้ตั้งค่า Telegram (bot token / chat id)")
-            return
-
+        """ส่งไฟล์สำรองไปที่ Telegram แล้วแจ้งผลสำเร็จ/ล้มเหลวให้ผู้ใช้ทราบ"""
         try:
-            tmp_dir = Path(tempfile.gettempdir())
-            csv_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            csv_path = tmp_dir / csv_name
-
-            # เลือกข้อมูลที่จะ export: ถ้า self.data ไม่มี folders ให้ลองโหลด backup ที่ถอดได้
-            data_to_export = self.data
-            if not data_to_export.get('folders'):
-                try:
-                    backup = {}
-                    if hasattr(self.storage, "decrypt_backup_with_master"):
-                        backup = self.storage.decrypt_backup_with_master() or {}
-                    elif hasattr(self.storage, "load_plaintext_backup"):
-                        backup = self.storage.load_plaintext_backup() or {}
-                    if backup and backup.get('folders'):
-                        data_to_export = backup
-                except Exception:
-                    pass
-
-            # สร้างไฟล์ CSV
-            try:
-                self.storage.export_data_to_csv(data_to_export, csv_path)
-            except Exception:
-                pass
-
-            # ตรวจสอบไฟล์
-            if not csv_path.exists() or csv_path.stat().st_size == 0:
-                try:
-                    csv_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
-                QMessageBox.warning(self, "สำรองไม่สำเร็จ", "ไม่สามารถสร้างไฟล์สำรองได้ (ไฟล์ว่างหรือไม่ถูกสร้าง)")
-                return
-
-            # ส่งไฟล์ผ่าน Telegram
-            try:
-                sent = False
-                if hasattr(TelegramNotifier, "send_file"):
-                    sent = TelegramNotifier.send_file(bot, chat, str(csv_path), "Password Manager backup")
-                if sent:
-                    QMessageBox.information(self, "สำรองเรียบร้อย", "ส่งไฟล์สำรองไปยัง Telegram เรียบร้อยแล้ว")
-                else:
-                    QMessageBox.warning(self, "ส่งไฟล์ล้มเหลว", "ไม่สามารถส่งไฟล์ไปยัง Telegram ได้ — ตรวจสอบ token/chat/การเชื่อมต่อ")
-            except Exception:
-                QMessageBox.warning(self, "ส่งไฟล์ล้มเหลว", "เกิดข้อผิดพลาดขณะส่งไฟล์ไปยัง Telegram")
-            finally:
-                try:
-                    csv_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
+            self.vault.backup_to_telegram()
+        except ValueError as e:
+            QMessageBox.warning(self, "สำรองไม่สำเร็จ", str(e))
         except Exception:
             QMessageBox.warning(self, "สำรองล้มเหลว", "เกิดข้อผิดพลาดไม่คาดคิดขณะสำรองข้อมูล")
-    
-    def save_data(self):
-        """บันทึกข้อมูลแบบเข้ารหัส"""
-        if self.master_password:
-            self.storage.save_data(self.data, self.master_password)
-            # อัปเดต metadata ไฟล์ด้วย (ปลอดภัยสำหรับค่า telegram ที่ไม่สำคัญต่อความลับหลัก)
-            try:
-                self.storage.save_metadata({
-                    'telegram_bot': self.data.get('telegram_bot', ''),
-                    'telegram_chat': self.data.get('telegram_chat', '')
-                })
-            except Exception:
-                pass
-    
+        else:
+            QMessageBox.information(self, "สำรองเรียบร้อย", "ส่งไฟล์สำรองไปยัง Telegram เรียบร้อยแล้ว")
+
     def closeEvent(self, event):
         """เมื่อปิดโปรแกรม"""
-        self.save_data()
+        if hasattr(self, 'search_scheduler'):
+            self.search_scheduler.wait()
+        if not self.vault.close():
+            QMessageBox.warning(self, "บันทึกไม่สำเร็จ", "ไม่สามารถบันทึกข้อมูลล่าสุดได้ — ข้อมูลก่อนหน้ายังอยู่ครบ")
         event.accept()
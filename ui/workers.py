@@ -0,0 +1,197 @@
+import threading
+from collections import namedtuple
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+UnlockResult = namedtuple("UnlockResult", "session data prepared")
+
+# worker ที่ไม่มีหน้าต่างรอผลแล้วแต่ยังรันอยู่ (setAutoDelete(False)) — อ้างอิงไว้จนกว่า run จะจบ
+_abandoned = set()
+
+class UnlockSignals(QObject):
+    """สัญญาณจาก UnlockWorker (ส่งข้าม thread กลับมาที่ GUI thread)"""
+    progress = Signal(int, str)      # เปอร์เซ็นต์, ข้อความขั้นตอน
+    finished = Signal(object)        # UnlockResult หรือ None ถ้ารหัสผ่านผิด/ไฟล์เสีย
+    cancelled = Signal()
+
+class UnlockWorker(QRunnable):
+    """
+    ปลดล็อก vault นอก GUI thread:
+    derive key -> ตรวจค่าตรวจกุญแจ -> ถอดรหัส/parse แบบ stream -> เตรียมข้อมูล (prepare)
+    ยกเลิกได้ระหว่างขั้นตอน (KDF ที่กำลังรันอยู่จะทำจนจบแล้วทิ้งผล)
+    """
+
+    STAGES = [
+        (10, "กำลังตรวจสอบรหัสผ่าน..."),
+        (60, "กำลังถอดรหัสและอ่านข้อมูล..."),
+        (90, "กำลังเตรียมรายการ..."),
+    ]
+
+    def __init__(self, storage, password: str, prepare=None):
+        super().__init__()
+        self.storage = storage
+        self.password = password
+        # prepare(data) รันใน worker หลัง parse เช่น migrate/สร้าง index (ค่าที่คืนอยู่ใน UnlockResult.prepared)
+        self.prepare = prepare
+        self.signals = UnlockSignals()
+        self._cancelled = False
+        # abandon กับการส่งผลตอนจบต้องไม่สลับกัน: ผลแต่ละครั้งถูกส่งให้หน้าต่าง หรือถูกล้างใน worker อย่างใดอย่างหนึ่ง
+        self._lock = threading.Lock()
+        self._orphaned = False
+        self._done = False
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self._cancelled = True
+
+    def abandon(self):
+        """
+        ยกเลิกโดยไม่มีผู้รอผล (หน้าต่างถูกปิด): ผลที่ได้ภายหลังไม่ถูกส่ง session ถูกล้างใน worker
+        และอ้างอิง worker ไว้จนกว่า run จะจบ — ไม่งั้น worker/signals อาจถูกเก็บกวาดก่อนจบ แล้ว session ไม่ถูกล้าง
+        คืนค่า False ถ้าส่งผลไปแล้ว (ผู้รับต้องล้าง session ของผลที่มาถึงหลังจากนี้เอง)
+        """
+        self.cancel()
+        with self._lock:
+            if self._done:
+                return False
+            self._orphaned = True
+            _abandoned.add(self)
+        return True
+
+    def _deliver(self, signal, *args) -> bool:
+        """ส่งผลครั้งสุดท้าย คืนค่า False ถ้าไม่มีผู้รอแล้ว (ผู้เรียกต้องล้าง session เอง)"""
+        with self._lock:
+            self._done = True
+            if self._orphaned:
+                return False
+        signal.emit(*args)
+        return True
+
+    def _stage(self, i: int) -> bool:
+        """แจ้งความคืบหน้า คืนค่า False ถ้าถูกยกเลิก"""
+        if self._cancelled:
+            return False
+        percent, text = self.STAGES[i]
+        self.signals.progress.emit(percent, text)
+        return True
+
+    def _abort(self, session):
+        if session:
+            session.wipe()
+        self._deliver(self.signals.cancelled)
+
+    def run(self):
+        try:
+            self._unlock()
+        finally:
+            _abandoned.discard(self)
+
+    def _unlock(self):
+        session = None
+        try:
+            if not self._stage(0):
+                return self._abort(None)
+            session = self.storage.create_session(self.password)
+            if session is None:
+                self._deliver(self.signals.finished, None)
+                return
+
+            if not self._stage(1):
+                return self._abort(session)
+            # payload ถูกถอดรหัสทีละช่วงระหว่าง parse (ถ้าไฟล์หลักเสียจะใช้ snapshot รุ่นก่อนหน้า)
+            data = self.storage.read_snapshot(session)
+            data = self.storage.replay_journal(data, session)
+
+            if not self._stage(2):
+                return self._abort(session)
+            # ย้าย vault เก่า/KDF ที่ calibrate ใหม่ (อาจต้องรัน KDF อีกรอบ จึงทำใน worker)
+            session = self.storage.upgrade_session(self.password, session)
+            prepared = self.prepare(data) if self.prepare else None
+            if self._cancelled:
+                return self._abort(session)
+
+            self.signals.progress.emit(100, "เสร็จสิ้น")
+            if not self._deliver(self.signals.finished, UnlockResult(session, data, prepared)):
+                session.wipe()
+        except Exception:
+            if session:
+                session.wipe()
+            self._deliver(self.signals.finished, None)
+
+class SearchSignals(QObject):
+    """สัญญาณจาก SearchWorker"""
+    finished = Signal(int, object)   # รุ่นของคำค้น, ผลลัพธ์ (None ถ้าถูกยกเลิก/ผิดพลาด)
+
+class SearchWorker(QRunnable):
+    """รัน search(query, cancelled) นอก GUI thread — cancelled() เป็นจริงเมื่อมีคำค้นที่ใหม่กว่า"""
+
+    def __init__(self, generation: int, search, query, is_current):
+        super().__init__()
+        self.generation = generation
+        self.search = search
+        self.query = query
+        self.is_current = is_current
+        self.signals = SearchSignals()
+        self.setAutoDelete(False)
+
+    def cancelled(self) -> bool:
+        return not self.is_current(self.generation)
+
+    def run(self):
+        result = None
+        try:
+            if not self.cancelled():
+                result = self.search(self.query, self.cancelled)
+        except Exception:
+            result = None
+        self.signals.finished.emit(self.generation, result)
+
+class SearchScheduler(QObject):
+    """
+    ค้นหาขณะพิมพ์: รอให้หยุดพิมพ์ DELAY_MS ก่อนเริ่ม แล้วรันใน thread pool
+    คำค้นใหม่ (หรือ cancel) ทำให้งานเก่าหยุดที่จุดตรวจถัดไป และผลของงานเก่าจะถูกทิ้ง
+    results ส่งเฉพาะผลของคำค้นล่าสุด (ใน GUI thread)
+    """
+    results = Signal(object)
+
+    DELAY_MS = 150
+
+    def __init__(self, search, parent=None):
+        super().__init__(parent)
+        # search(query, cancelled) -> ผลลัพธ์ หรือ None ถ้าถูกยกเลิก (ถูกเรียกใน worker thread)
+        self.search = search
+        self._generation = 0
+        self._query = None
+        # อ้างอิง worker ที่ยังรันอยู่ไว้จนกว่าจะส่งผล (setAutoDelete(False))
+        self._workers = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._start)
+
+    def schedule(self, query):
+        self._generation += 1
+        self._query = query
+        self._timer.start(self.DELAY_MS)
+
+    def cancel(self):
+        self._generation += 1
+        self._timer.stop()
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self._generation
+
+    def wait(self, msecs: int = 2000):
+        """ยกเลิกและรอ worker ที่ยังรันอยู่ (ก่อนปิด vault)"""
+        self.cancel()
+        if self._workers:
+            QThreadPool.globalInstance().waitForDone(msecs)
+
+    def _start(self):
+        worker = SearchWorker(self._generation, self.search, self._query, self.is_current)
+        worker.signals.finished.connect(self._deliver)
+        self._workers[self._generation] = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def _deliver(self, generation: int, result):
+        self._workers.pop(generation, None)
+        if result is not None and self.is_current(generation):
+            self.results.emit(result)
@@ -0,0 +1,107 @@
+import io
+import zlib
+import lzma
+
+try:
+    import zstandard as _zstd  # pip install zstandard
+except ImportError:
+    _zstd = None
+
+# บีบอัดก่อนเข้ารหัส (ข้อมูลที่เข้ารหัสแล้วบีบอัดไม่ได้) — ชื่อวิธีถูกบันทึกใน header ของ container ('compression')
+# payload ที่เล็กกว่า COMPRESS_THRESHOLD ไม่ถูกบีบอัด (ประหยัดไม่คุ้ม)
+COMPRESS_THRESHOLD = 4096
+
+class _Codec:
+    """ตัวบีบอัดหนึ่งชนิด: compressor()/decompressor() คืน object ที่มี compress/flush และ decompress"""
+
+    def __init__(self, name: str, compressor, decompressor):
+        self.name = name
+        self.compressor = compressor
+        self.decompressor = decompressor
+
+class _ZstdCompressor:
+    """ห่อ zstandard ให้มี compress/flush แบบเดียวกับ zlib"""
+
+    def __init__(self):
+        self._obj = _zstd.ZstdCompressor(level=6).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+CODECS = {
+    'zlib': _Codec('zlib', lambda: zlib.compressobj(6), zlib.decompressobj),
+    'lzma': _Codec('lzma', lambda: lzma.LZMACompressor(preset=6), lzma.LZMADecompressor),
+}
+if _zstd is not None:
+    CODECS['zstd'] = _Codec('zstd', _ZstdCompressor, lambda: _zstd.ZstdDecompressor().decompressobj())
+
+DEFAULT_COMPRESSION = 'zstd' if 'zstd' in CODECS else 'zlib'
+
+def choose_compression(size: int, name: str = DEFAULT_COMPRESSION) -> str:
+    """วิธีบีบอัดสำหรับ payload ขนาด size ไบต์ (None ถ้าเล็กเกินไป)"""
+    return name if size >= COMPRESS_THRESHOLD else None
+
+def _codec(name: str) -> _Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"ไม่รองรับการบีบอัดแบบ {name} (ถ้าเป็น zstd ให้ติดตั้ง zstandard)")
+
+def compress_bytes(data: bytes, name: str) -> bytes:
+    compressor = _codec(name).compressor()
+    return compressor.compress(data) + compressor.flush()
+
+def decompress_bytes(data, name: str, chunk_size: int = 1024 * 1024, output_size: int = 256 * 1024) -> bytearray:
+    """
+    คลายทีละชิ้นต่อท้าย bytearray เดียว (ไม่เกิดสำเนาทั้งก้อนตอนขยาย buffer ผลลัพธ์)
+    zlib/lzma จำกัดผลลัพธ์ต่อครั้งไว้ที่ output_size — ข้อมูลที่บีบอัดได้มากจะไม่ขยายเป็น bytes ก้อนใหญ่ก่อนถูกคัดลอก
+    หน่วยความจำสูงสุดจึงใกล้ขนาดผลลัพธ์
+    """
+    decompressor = _codec(name).decompressor()
+    out = bytearray()
+    with memoryview(data) as view:
+        for start in range(0, len(view), chunk_size):
+            chunk = view[start:start + chunk_size]
+            if hasattr(decompressor, 'unconsumed_tail'):
+                # zlib: ส่วนที่ยังไม่ได้ใช้ค้างอยู่ใน unconsumed_tail
+                while chunk:
+                    out += decompressor.decompress(chunk, output_size)
+                    chunk = decompressor.unconsumed_tail
+            elif hasattr(decompressor, 'needs_input'):
+                # lzma: ผลลัพธ์ที่เหลือค้างอยู่ใน decompressor จนกว่าจะต้องการข้อมูลเพิ่ม
+                out += decompressor.decompress(chunk, output_size)
+                while not decompressor.needs_input and not decompressor.eof:
+                    out += decompressor.decompress(b"", output_size)
+            else:
+                out += decompressor.decompress(chunk)
+    if hasattr(decompressor, 'flush'):
+        out += decompressor.flush()
+    return out
+
+class CompressingWriter(io.RawIOBase):
+    """file-like ที่บีบอัดข้อมูลแล้วส่งต่อให้ raw (เช่น EncryptedWriter) — close() ปิด raw ด้วย"""
+
+    def __init__(self, raw, name: str):
+        super().__init__()
+        self._raw = raw
+        self._compressor = _codec(name).compressor()
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        out = self._compressor.compress(bytes(b))
+        if out:
+            self._raw.write(out)
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._raw.write(self._compressor.flush())
+                self._raw.close()
+            finally:
+                super().close()
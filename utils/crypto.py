@@ -1,38 +1,114 @@
+import os
+import hmac
 import base64
 import hashlib
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from utils.kdf import KdfEngine, LEGACY_KDF
+
+class SessionKey:
+    """
+    กุญแจของ session ที่ derive ครั้งเดียวตอนปลดล็อก
+    ใช้เข้ารหัส/ถอดรหัสตลอดอายุหน้าต่าง และต้องเรียก wipe() เมื่อล็อกหรือปิดโปรแกรม
+    """
+
+    def __init__(self, key: bytes, key_id: str = None):
+        # key คือกุญแจดิบ 32 ไบต์ (ไม่ใช่ base64 แบบ Fernet)
+        # key_id มีค่าเมื่อเป็น data key ของ vault แบบ envelope, None เมื่อ derive จากรหัสผ่านโดยตรง
+        self._key = bytearray(key)
+        self._aead = AESGCM(bytes(self._key))
+        self.key_id = key_id
+
+    @property
+    def is_active(self) -> bool:
+        return self._aead is not None
+
+    def _require_active(self):
+        if self._aead is None:
+            raise ValueError("session key ถูกล้างไปแล้ว")
+
+    def encrypt(self, data: bytes, aad: bytes = None, nonce: bytes = None) -> tuple:
+        """เข้ารหัสด้วย AES-256-GCM คืนค่า (nonce, ciphertext) — ไม่ต้องรัน KDF ซ้ำ"""
+        self._require_active()
+        nonce = nonce or os.urandom(12)
+        return nonce, self._aead.encrypt(nonce, data, aad)
+
+    def decrypt(self, nonce: bytes, ciphertext: bytes, aad: bytes = None) -> bytes:
+        """ถอดรหัส AES-256-GCM (InvalidTag ถ้ากุญแจผิดหรือข้อมูลถูกแก้)"""
+        self._require_active()
+        return self._aead.decrypt(nonce, ciphertext, aad)
+
+    def decrypt_into(self, nonce: bytes, ciphertext, aad: bytes, buf) -> int:
+        """
+        ถอดรหัสลง buffer ที่เตรียมไว้ (ยาวเท่า plaintext พอดี) โดยไม่สร้าง bytes ใหม่
+        cryptography รุ่นที่ไม่มี decrypt_into จะถอดรหัสแล้วคัดลอกลง buffer แทน
+        """
+        self._require_active()
+        if hasattr(self._aead, 'decrypt_into'):
+            return self._aead.decrypt_into(nonce, ciphertext, aad, buf)
+        plain = self._aead.decrypt(nonce, ciphertext, aad)
+        buf[:len(plain)] = plain
+        return len(plain)
+
+    def decrypt_legacy(self, token: bytes) -> bytes:
+        """ถอดรหัสไฟล์แบบเก่า (Fernet base64) เพื่อย้ายไปใช้รูปแบบใหม่"""
+        self._require_active()
+        return Fernet(base64.urlsafe_b64encode(bytes(self._key))).decrypt(token)
+
+    def key_check_value(self) -> str:
+        """ค่าตรวจกุญแจขนาดเล็ก (HMAC ของกุญแจ) สำหรับเก็บใน header เปิดเผยได้โดยไม่รั่วกุญแจ"""
+        self._require_active()
+        mac = hmac.new(bytes(self._key), b"pm-key-check|" + (self.key_id or "").encode(), hashlib.sha256)
+        return base64.b64encode(mac.digest()[:16]).decode()
+
+    def matches_key_check(self, kcv: str) -> bool:
+        """ตรวจว่ากุญแจนี้ตรงกับค่าตรวจใน header โดยไม่ต้องถอดรหัส payload"""
+        return hmac.compare_digest(self.key_check_value(), kcv or "")
+
+    def derive_subkey(self, label: str) -> bytes:
+        """กุญแจย่อย 32 ไบต์สำหรับงานที่ไม่ใช่การเข้ารหัส payload (เช่น HMAC ของคอลัมน์ที่ค้นหาได้)"""
+        self._require_active()
+        return hmac.new(bytes(self._key), b"pm-subkey|" + label.encode(), hashlib.sha256).digest()
+
+    def wrap_with(self, kek: bytes, aad: bytes) -> tuple:
+        """wrap กุญแจนี้ด้วย key-encryption key คืนค่า (nonce, wrapped)"""
+        self._require_active()
+        nonce = os.urandom(12)
+        return nonce, AESGCM(kek).encrypt(nonce, bytes(self._key), aad)
+
+    def wipe(self):
+        """เขียนทับกุญแจในหน่วยความจำแล้วทิ้งตัวเข้ารหัส"""
+        wipe_bytes(self._key)
+        self._aead = None
+
+def wipe_bytes(buf: bytearray):
+    """เขียนทับ bytearray ด้วยศูนย์"""
+    for i in range(len(buf)):
+        buf[i] = 0
 
 class CryptoManager:
     """จัดการการเข้ารหัสโดยไม่สร้างไฟล์ .key"""
-    
+
     @staticmethod
-    def derive_key(password: str, salt: bytes) -> bytes:
-        """สร้าง key จาก password โดยใช้ PBKDF2HMAC"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=600000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key
-    
+    def create_session(password: str, salt: bytes, kdf: KdfEngine = None) -> SessionKey:
+        """derive key ครั้งเดียวแล้วห่อเป็น SessionKey สำหรับใช้ซ้ำ (vault แบบไม่มี envelope)"""
+        kdf = kdf or LEGACY_KDF
+        return SessionKey(kdf.derive(password, salt))
+
     @staticmethod
-    def encrypt_data(data: str, password: str, salt: bytes) -> str:
-        """เข้ารหัสข้อมูล"""
-        key = CryptoManager.derive_key(password, salt)
-        f = Fernet(key)
-        return f.encrypt(data.encode()).decode()
-    
+    def generate_data_key(key_id: str) -> SessionKey:
+        """สุ่ม data key ใหม่ 32 ไบต์สำหรับ vault แบบ envelope"""
+        return SessionKey(os.urandom(32), key_id)
+
     @staticmethod
-    def decrypt_data(encrypted_data: str, password: str, salt: bytes) -> str:
-        """ถอดรหัสข้อมูล"""
-        key = CryptoManager.derive_key(password, salt)
-        f = Fernet(key)
-        return f.decrypt(encrypted_data.encode()).decode()
-    
+    def unwrap_data_key(kek: bytes, nonce: bytes, wrapped: bytes, aad: bytes, key_id: str) -> SessionKey:
+        """แกะ data key ด้วย key-encryption key (InvalidTag ถ้ารหัสผ่านผิด)"""
+        raw = bytearray(AESGCM(kek).decrypt(nonce, wrapped, aad))
+        try:
+            return SessionKey(bytes(raw), key_id)
+        finally:
+            wipe_bytes(raw)
+
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash รหัสผ่านสำหรับการเปรียบเทียบ"""
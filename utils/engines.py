@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Protocol
+from utils.crypto import SessionKey
+from utils.storage import DataStorage
+from utils.sqlite_storage import SqliteStorage
+from utils.sharded_storage import ShardedStorage
+from utils.memory_storage import MemoryStorage
+
+# รูปแบบการจัดเก็บที่เลือกได้ (ชื่อ -> คลาส, ป้ายชื่อที่แสดงในหน้าตั้งค่า)
+STORAGE_ENGINES = {
+    DataStorage.ENGINE: DataStorage,
+    SqliteStorage.ENGINE: SqliteStorage,
+    ShardedStorage.ENGINE: ShardedStorage,
+}
+ENGINE_LABELS = {
+    DataStorage.ENGINE: "ไฟล์เดียว (JSON เข้ารหัส)",
+    SqliteStorage.ENGINE: "ฐานข้อมูล SQLite (เข้ารหัสทีละรายการ)",
+    ShardedStorage.ENGINE: "แยกไฟล์ตามโฟลเดอร์ (ถอดรหัสเมื่อเปิดโฟลเดอร์)",
+}
+
+# ที่เก็บข้อมูล (backend) — เลือกด้วยอาร์กิวเมนต์หรือตัวแปรสภาพแวดล้อม PASSWORD_MANAGER_BACKEND
+#   file    — โฟลเดอร์ข้อมูลปกติ (~/.password_manager หรือ PASSWORD_MANAGER_HOME) รูปแบบตาม engine
+#   tempdir — โฟลเดอร์ชั่วคราวใหม่ ถูกลบเมื่อ storage ถูกทิ้งหรือโปรแกรมจบ
+#   memory  — MemoryStorage ไม่แตะดิสก์
+BACKEND_ENV = "PASSWORD_MANAGER_BACKEND"
+BACKENDS = ('file', 'tempdir', 'memory')
+
+class StorageBackend(Protocol):
+    """
+    สิ่งที่หน้าต่างหลักและ worker ใช้จาก storage — ทุก engine (DataStorage และคลาสลูก) และ MemoryStorage มีครบ
+    การเขียนผ่าน queue_* ทำใน thread เบื้องหลัง ต้อง flush() ก่อนอ่านไฟล์หรือปิดโปรแกรม
+    """
+
+    ENGINE: str
+
+    # session / กุญแจ
+    def exists(self) -> bool: ...
+    def create_session(self, master_password: str) -> SessionKey: ...
+    def new_session(self, master_password: str) -> SessionKey: ...
+    def upgrade_session(self, master_password: str, session: SessionKey) -> SessionKey: ...
+    def adopt_session(self, master_password: str, session: SessionKey): ...
+    def change_password(self, session: SessionKey, new_password: str): ...
+
+    # โหลด
+    def load_data(self, session: SessionKey) -> dict: ...
+    def read_snapshot(self, session: SessionKey) -> dict: ...
+    def replay_journal(self, data: dict, session: SessionKey) -> dict: ...
+    def lazy_folders(self) -> set: ...
+    def release_folder(self, folder: str): ...
+    def count_entries(self, session: SessionKey, folder: str) -> int: ...
+
+    # บันทึก
+    def save_data(self, data: dict, session: SessionKey): ...
+    def queue_changes(self, ops: list, session: SessionKey) -> bool: ...
+    def queue_snapshot(self, data: dict, session: SessionKey): ...
+    def needs_compaction(self) -> bool: ...
+    def flush(self, timeout: float = None) -> bool: ...
+
+    # metadata (ไม่เข้ารหัส) / ลบ / สำรอง
+    def load_metadata(self) -> dict: ...
+    def save_metadata(self, meta: dict): ...
+    def delete_all_data(self): ...
+    def export_data_to_csv(self, data: dict, csv_path: Path): ...
+
+def open_storage(engine: str = None, root: Path = None):
+    """
+    เปิด storage ตามรูปแบบที่ระบุ หรือที่บันทึกไว้ใน metadata ('engine')
+    ถ้ายังไม่เคยเลือก ใช้รูปแบบที่มี vault อยู่แล้ว (ค่าเริ่มต้นคือ JSON)
+    root: โฟลเดอร์เก็บข้อมูล (None = โฟลเดอร์ปกติของโปรแกรม)
+    """
+    default = DataStorage(root=root)
+    if engine is None:
+        engine = default.load_metadata().get('engine')
+    if engine not in STORAGE_ENGINES:
+        engine = DataStorage.ENGINE
+        if not default.exists():
+            for name, cls in STORAGE_ENGINES.items():
+                if cls is not DataStorage and cls(root=root).exists():
+                    engine = name
+                    break
+    return default if engine == DataStorage.ENGINE else STORAGE_ENGINES[engine](root=root)
+
+def create_storage(backend: str = None, engine: str = None) -> StorageBackend:
+    """สร้าง storage ตาม backend ที่ระบุ หรือตาม PASSWORD_MANAGER_BACKEND (ไม่ระบุ = file)"""
+    backend = backend or os.environ.get(BACKEND_ENV) or 'file'
+    if backend not in BACKENDS:
+        raise ValueError(f"ไม่รู้จัก backend {backend} (เลือกได้: {', '.join(BACKENDS)})")
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'tempdir':
+        root = tempfile.mkdtemp(prefix="password_manager_")
+        storage = open_storage(engine, root)
+        weakref.finalize(storage, shutil.rmtree, root, True)
+        return storage
+    return open_storage(engine)
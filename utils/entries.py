@@ -0,0 +1,199 @@
+import uuid
+from bisect import bisect_left, insort
+from urllib.parse import urlsplit
+
+# ทุก entry มี 'id' ถาวร (สุ่ม ไม่ซ้ำ) ใช้อ้างอิงแทนการค้นหาด้วยค่าหรือลำดับในรายการ
+# ข้อมูลในไฟล์ยังเก็บเป็น list ต่อโฟลเดอร์เหมือนเดิม — index สร้างใหม่ในหน่วยความจำตอนโหลด
+
+# ลบพร้อมกันเกินจำนวนนี้ในโฟลเดอร์เดียว: สร้าง list ใหม่รอบเดียวถูกกว่าลบทีละตำแหน่ง
+_BULK_DELETE = 32
+
+def new_entry_id() -> str:
+    return uuid.uuid4().hex
+
+def entry_domain(url: str) -> str:
+    """โดเมนของ url (ตัวเล็ก ไม่มี www.) หรือ '' ถ้าไม่มี — ใช้ทั้ง domain_tag ของ SQLite และ index ค้นหา"""
+    url = (url or '').strip()
+    if not url:
+        return ''
+    host = urlsplit(url if '://' in url else '//' + url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+def ensure_entry_ids(data: dict) -> bool:
+    """
+    ใส่ id ให้ entry ที่ยังไม่มี (vault รุ่นก่อน) หรือ id ซ้ำกัน (เช่นคัดลอกมาจากที่อื่น)
+    คืนค่า True ถ้ามีการแก้ไข — ผู้เรียกควรบันทึก snapshot ใหม่
+    """
+    seen = set()
+    changed = False
+    for entries in data.get('folders', {}).values():
+        for i, entry in enumerate(entries):
+            entry_id = entry.get('id')
+            if not entry_id or entry_id in seen:
+                # แทนที่ทั้งก้อน ไม่แก้ในที่ (snapshot_data อาศัยว่า entry ไม่ถูกแก้หลังสร้าง)
+                entry = dict(entry, id=new_entry_id())
+                entries[i] = entry
+                changed = True
+            seen.add(entry['id'])
+    return changed
+
+class EntryIndex:
+    """
+    index id -> (folder, entry) ของข้อมูลทั้งหมด พร้อมตำแหน่งใน list ของโฟลเดอร์
+    ทุกการแก้ไขต้องผ่านเมธอดของคลาสนี้เพื่อให้ index ตรงกับข้อมูลเสมอ
+    - get: O(1), replace: O(log d) (d = จำนวนรายการที่ลบไปแล้วในโฟลเดอร์ตั้งแต่คำนวณตำแหน่งครั้งล่าสุด)
+    - remove: หาตำแหน่งด้วย bisect แล้ว del ออกจาก list — ลำดับในโฟลเดอร์ต้องคงเดิม (ลำดับที่แสดง
+      ลำดับเอกสารใน SearchIndex และลำดับในไฟล์) จึงสลับกับตัวสุดท้ายไม่ได้ การเลื่อน list ยังเป็น O(n)
+      แต่เป็น memmove ใน C ไม่ไล่ทีละรายการใน Python; ลบหลายรายการพร้อมกันสร้าง list ใหม่รอบเดียว
+    - ตำแหน่งที่เก็บไว้เป็นตำแหน่งเสมือน: ตำแหน่งจริง = ตำแหน่งเสมือน - จำนวนตำแหน่งที่ถูกลบซึ่งน้อยกว่า
+      คำนวณตำแหน่งทั้งโฟลเดอร์ใหม่เมื่อรายการที่ลบมากกว่าที่เหลือ (เฉลี่ย O(1) ต่อการลบ) หรือหลังลบหลายรายการ
+    search: SearchIndex (ถ้ามี) ถูกอัปเดตไปพร้อมกันทุกการแก้ไข
+    โฟลเดอร์ที่ถูก unload ยังอยู่ใน search เพื่อให้ค้นหาเจอ (ข้อความค้นหาของโฟลเดอร์ว่างต้องล้างเองหลัง rebuild)
+    """
+
+    def __init__(self, data: dict, search=None):
+        self.data = data
+        self.search = search
+        self.rebuild()
+
+    def rebuild(self):
+        self._entries = {}
+        # id -> ตำแหน่งเสมือนใน list ของโฟลเดอร์
+        self._positions = {}
+        # โฟลเดอร์ -> ตำแหน่งเสมือนที่ถูกลบ (เรียงลำดับ) ตั้งแต่คำนวณตำแหน่งครั้งล่าสุด
+        self._deleted = {}
+        # โฟลเดอร์ที่ _positions ต้องคำนวณใหม่ทั้งหมดก่อนใช้
+        self._stale = set()
+        for folder, entries in self.data.setdefault('folders', {}).items():
+            self._reindex_folder(folder)
+            if self.search is not None and entries:
+                self.search.load_folder(folder, entries)
+
+    def _reindex_folder(self, folder: str):
+        self._forget_positions(folder)
+        for position, entry in enumerate(self.data['folders'][folder]):
+            self._entries[entry['id']] = (folder, entry)
+            self._positions[entry['id']] = position
+
+    def _forget_positions(self, folder: str):
+        self._stale.discard(folder)
+        self._deleted.pop(folder, None)
+
+    def _position(self, folder: str, entry_id: str) -> int:
+        if folder in self._stale:
+            self._forget_positions(folder)
+            for position, entry in enumerate(self.data['folders'][folder]):
+                self._positions[entry['id']] = position
+        position = self._positions[entry_id]
+        deleted = self._deleted.get(folder)
+        return position - bisect_left(deleted, position) if deleted else position
+
+    def __contains__(self, entry_id) -> bool:
+        return entry_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, entry_id: str):
+        """คืนค่า (folder, entry) หรือ None"""
+        return self._entries.get(entry_id)
+
+    def folder_of(self, entry_id: str) -> str:
+        return self._entries[entry_id][0]
+
+    def add(self, folder: str, entry: dict):
+        entries = self.data['folders'].setdefault(folder, [])
+        entries.append(entry)
+        self._entries[entry['id']] = (folder, entry)
+        self._positions[entry['id']] = len(entries) - 1 + len(self._deleted.get(folder, ()))
+        if self.search is not None:
+            self.search.add(folder, entry)
+
+    def replace(self, entry_id: str, entry: dict):
+        """แทนที่ entry เดิม (ใช้ id เดิม) ในตำแหน่งเดิม"""
+        folder, _ = self._entries[entry_id]
+        if entry.get('id') != entry_id:
+            entry = dict(entry, id=entry_id)
+        self.data['folders'][folder][self._position(folder, entry_id)] = entry
+        self._entries[entry_id] = (folder, entry)
+        if self.search is not None:
+            self.search.add(folder, entry)
+        return entry
+
+    def remove(self, entry_ids) -> list:
+        """ลบ entry ตาม id (ข้าม id ที่ไม่มี) คืนค่า entry ที่ถูกลบตามลำดับที่ส่งมา"""
+        removed = []
+        by_folder = {}
+        for entry_id in entry_ids:
+            found = self._entries.get(entry_id)
+            if found is None:
+                continue
+            by_folder.setdefault(found[0], set()).add(entry_id)
+            removed.append(found[1])
+        for folder, ids in by_folder.items():
+            entries = self.data['folders'][folder]
+            if folder in self._stale or len(ids) > _BULK_DELETE:
+                entries[:] = [entry for entry in entries if entry['id'] not in ids]
+                self._stale.add(folder)
+            else:
+                # ลบจากตำแหน่งมากไปน้อย ตำแหน่งของรายการที่ยังไม่ลบจึงไม่เปลี่ยนระหว่างลบ
+                deleted = self._deleted.setdefault(folder, [])
+                for position in sorted((self._positions[entry_id] for entry_id in ids), reverse=True):
+                    del entries[position - bisect_left(deleted, position)]
+                    insort(deleted, position)
+                if len(deleted) > len(entries):
+                    self._stale.add(folder)
+            for entry_id in ids:
+                del self._entries[entry_id]
+                del self._positions[entry_id]
+        if self.search is not None:
+            self.search.remove([entry['id'] for entry in removed])
+        return removed
+
+    def move(self, entry_ids, folder: str) -> list:
+        """ย้าย entry ไปต่อท้ายโฟลเดอร์ปลายทาง คืนค่า entry ที่ถูกย้าย"""
+        moving = [entry_id for entry_id in entry_ids
+                  if entry_id in self._entries and self._entries[entry_id][0] != folder]
+        moved = self.remove(moving)
+        for entry in moved:
+            self.add(folder, entry)
+        return moved
+
+    def load_folder(self, folder: str, entries: list):
+        """ใส่ entry ของโฟลเดอร์ที่เพิ่งถอดรหัส (vault แบบแบ่ง shard โหลดโฟลเดอร์ทีหลัง) แล้วสร้าง index"""
+        self.data['folders'][folder] = entries
+        self._reindex_folder(folder)
+        if self.search is not None:
+            self.search.load_folder(folder, entries)
+
+    def unload_folder(self, folder: str):
+        """
+        เอา entry ของโฟลเดอร์ออกจากข้อมูลและ index (โฟลเดอร์ยังอยู่ในรายการเป็น list ว่าง)
+        index ค้นหายังเก็บชื่อ/ชื่อผู้ใช้/โดเมนไว้ แต่ทิ้ง notes จนกว่าจะ load_folder อีกครั้ง
+        """
+        self._forget_positions(folder)
+        if self.search is not None:
+            self.search.seal_folder(folder)
+        for entry in self.data['folders'][folder]:
+            self._entries.pop(entry['id'], None)
+            self._positions.pop(entry['id'], None)
+        self.data['folders'][folder] = []
+
+    def add_folder(self, folder: str):
+        self.data['folders'].setdefault(folder, [])
+
+    def rename_folder(self, folder: str, new_name: str):
+        self._forget_positions(folder)
+        folders = self.data['folders']
+        folders[new_name] = folders.pop(folder)
+        self._reindex_folder(new_name)
+        if self.search is not None:
+            self.search.rename_folder(folder, new_name)
+
+    def delete_folder(self, folder: str):
+        self._forget_positions(folder)
+        if self.search is not None:
+            self.search.remove_folder(folder)
+        for entry in self.data['folders'].pop(folder, []):
+            self._entries.pop(entry['id'], None)
+            self._positions.pop(entry['id'], None)
@@ -0,0 +1,125 @@
+import os
+import json
+from collections import OrderedDict
+from utils.crypto import SessionKey
+
+# โหมดประหยัดหน่วยความจำ: เก็บ plaintext เฉพาะโฟลเดอร์ที่ใช้ล่าสุดไม่เกินงบประมาณ
+# โฟลเดอร์ที่ถูกพักไว้อยู่ในหน่วยความจำเป็น ciphertext (AES-256-GCM ด้วยกุญแจสุ่มของ process นี้
+# ไม่ใช่ data key ของ vault) จึงถอดรหัสกลับได้เร็วโดยไม่ต้องอ่านไฟล์
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+def estimate_size(entries: list) -> int:
+    """ขนาดโดยประมาณของ plaintext (ผลรวมความยาวของค่าที่เป็นข้อความ)"""
+    return sum(len(value) for entry in entries for value in entry.values() if isinstance(value, str))
+
+class FolderCache:
+    """
+    LRU ของโฟลเดอร์ที่ถอดรหัสแล้ว จำกัดด้วยจำนวน entry และ/หรือขนาดโดยประมาณ
+    ผู้เรียกเป็นเจ้าของ list ของ entry — คลาสนี้แค่ตัดสินว่าโฟลเดอร์ไหนต้องถูกพัก และเก็บ ciphertext ของโฟลเดอร์ที่ถูกพัก
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._key = SessionKey(os.urandom(32))
+        # โฟลเดอร์ที่มี plaintext อยู่: ชื่อ -> (จำนวน entry, ขนาดโดยประมาณ) เรียงจากใช้นานสุดไปล่าสุด
+        self._resident = OrderedDict()
+        # โฟลเดอร์ที่ถูกพัก: ชื่อ -> (nonce, ciphertext) และจำนวน entry (แสดงผล/ยืนยันการลบโดยไม่ต้องถอดรหัส)
+        self._sealed = {}
+        self._sealed_counts = {}
+
+    @staticmethod
+    def _aad(folder: str) -> bytes:
+        return b"pm-folder-cache|" + folder.encode()
+
+    def is_sealed(self, folder: str) -> bool:
+        return folder in self._sealed
+
+    def sealed_folders(self) -> set:
+        return set(self._sealed)
+
+    def sealed_count(self, folder: str) -> int:
+        """จำนวน entry ของโฟลเดอร์ที่ถูกพัก"""
+        return self._sealed_counts[folder]
+
+    def access(self, folder: str, entries: list, keep=()) -> list:
+        """
+        บันทึกว่าโฟลเดอร์ถูกใช้ (นับ hit ถ้ามี plaintext อยู่แล้ว ไม่งั้นนับ miss)
+        คืนค่าโฟลเดอร์ที่ต้องพัก (ใช้นานสุดก่อน) เพื่อให้อยู่ในงบประมาณ — ไม่รวมโฟลเดอร์ที่เพิ่งใช้และใน keep
+        """
+        if folder in self._resident:
+            self.hits += 1
+            self._resident.move_to_end(folder)
+        else:
+            self.misses += 1
+        self._resident[folder] = (len(entries), estimate_size(entries))
+        return self.trim(set(keep) | {folder})
+
+    def trim(self, keep=()) -> list:
+        """คืนค่าโฟลเดอร์ที่ต้องพัก (ใช้นานสุดก่อน) เพื่อให้อยู่ในงบประมาณ — ไม่รวมโฟลเดอร์ใน keep"""
+        evict = []
+        for name in list(self._resident):
+            if not self._over_budget():
+                break
+            if name in keep:
+                continue
+            del self._resident[name]
+            evict.append(name)
+        return evict
+
+    def _over_budget(self) -> bool:
+        count = sum(size[0] for size in self._resident.values())
+        nbytes = sum(size[1] for size in self._resident.values())
+        return ((self.max_entries is not None and count > self.max_entries)
+                or (self.max_bytes is not None and nbytes > self.max_bytes))
+
+    def seal(self, folder: str, entries: list):
+        """เก็บโฟลเดอร์ที่ถูกพักเป็น ciphertext (ผู้เรียกต้องทิ้ง list plaintext เอง)"""
+        self._resident.pop(folder, None)
+        plain = json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode()
+        self._sealed[folder] = self._key.encrypt(plain, self._aad(folder))
+        self._sealed_counts[folder] = len(entries)
+
+    def peek(self, folder: str) -> list:
+        """ถอดรหัสโฟลเดอร์ที่ถูกพักโดยไม่นำกลับเข้า cache (ใช้ตอนบันทึก/สำรองทั้ง vault)"""
+        nonce, ciphertext = self._sealed[folder]
+        return json.loads(self._key.decrypt(nonce, ciphertext, self._aad(folder)))
+
+    def unseal(self, folder: str) -> list:
+        """ถอดรหัสโฟลเดอร์ที่ถูกพักเพื่อนำกลับมาใช้ (ตามด้วย access)"""
+        entries = self.peek(folder)
+        del self._sealed[folder]
+        del self._sealed_counts[folder]
+        return entries
+
+    def rename(self, folder: str, new_name: str):
+        if folder in self._sealed:
+            # associated data ผูกกับชื่อโฟลเดอร์ จึงต้องเข้ารหัสใหม่
+            self.seal(new_name, self.unseal(folder))
+        if folder in self._resident:
+            self._resident[new_name] = self._resident.pop(folder)
+
+    def forget(self, folder: str):
+        self._resident.pop(folder, None)
+        self._sealed.pop(folder, None)
+        self._sealed_counts.pop(folder, None)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'resident_folders': len(self._resident),
+            'resident_entries': sum(size[0] for size in self._resident.values()),
+            'sealed_folders': len(self._sealed),
+            'sealed_bytes': sum(len(ciphertext) for _, ciphertext in self._sealed.values()),
+        }
+
+    def clear(self):
+        """ทิ้ง ciphertext ทั้งหมดและล้างกุญแจของ cache"""
+        self._resident.clear()
+        self._sealed.clear()
+        self._sealed_counts.clear()
+        self._key.wipe()
@@ -0,0 +1,207 @@
+import os
+import json
+import struct
+import threading
+from utils.entries import EntryIndex, ensure_entry_ids
+
+# ไฟล์ journal: JOURNAL_MAGIC | journal_id(16) | record...
+# record: ความยาว ciphertext(4) | seq(8) | nonce(12) | ciphertext (AES-GCM ของ JSON list ของ op)
+# associated data ของแต่ละ record = JOURNAL_MAGIC | journal_id | seq จึงสลับ/ย้าย record ข้ามไฟล์ไม่ได้
+# snapshot (ไฟล์ vault) บันทึก journal_id และ journal_seq ที่รวมไว้แล้ว ตอนโหลดจะ replay เฉพาะ seq ที่มากกว่า
+JOURNAL_MAGIC = b"PMJL"
+JOURNAL_ID_SIZE = 16
+_FILE_HEADER_SIZE = len(JOURNAL_MAGIC) + JOURNAL_ID_SIZE
+_RECORD = struct.Struct(">IQ")
+_NONCE_SIZE = 12
+
+# op ที่อ้างอิง entry ด้วย id (ต้องใช้ EntryIndex)
+_ID_OPS = {'update_entry', 'delete_entries', 'move_entries'}
+
+def apply_op(data: dict, op: dict, index: EntryIndex = None):
+    """
+    ใช้ op หนึ่งรายการกับข้อมูล (ใช้ทั้งตอน replay และเป็นนิยามของ op แต่ละชนิด)
+    op ที่อ้างอิง entry ด้วย id ต้องส่ง index ของข้อมูลชุดเดียวกันมา
+    op แบบเก่าที่อ้างอิงด้วยลำดับ (index/indices) ยังรองรับสำหรับ journal ที่เขียนก่อนมี id
+    """
+    kind = op['op']
+    folders = data.setdefault('folders', {})
+    if kind == 'update_entry' and 'index' in op:
+        folders[op['folder']][op['index']] = op['entry']
+    elif kind == 'delete_entries' and 'indices' in op:
+        entries = folders[op['folder']]
+        for position in sorted(op['indices'], reverse=True):
+            del entries[position]
+    elif kind == 'add_entry':
+        if index is not None:
+            index.add(op['folder'], op['entry'])
+        else:
+            folders.setdefault(op['folder'], []).append(op['entry'])
+    elif kind == 'update_entry':
+        index.replace(op['id'], op['entry'])
+    elif kind == 'delete_entries':
+        index.remove(op['ids'])
+    elif kind == 'move_entries':
+        index.move(op['ids'], op['to'])
+    elif kind == 'add_folder':
+        folders.setdefault(op['folder'], [])
+    elif kind == 'rename_folder':
+        if index is not None:
+            index.rename_folder(op['folder'], op['new_name'])
+        else:
+            folders[op['new_name']] = folders.pop(op['folder'])
+    elif kind == 'delete_folder':
+        if index is not None:
+            index.delete_folder(op['folder'])
+        else:
+            folders.pop(op['folder'], None)
+    elif kind == 'set':
+        data[op['key']] = op['value']
+    else:
+        raise ValueError(f"ไม่รู้จัก op: {kind}")
+
+def _is_legacy(op: dict) -> bool:
+    return 'index' in op or 'indices' in op
+
+def apply_ops(data: dict, ops: list):
+    """ใช้ op ตามลำดับ — สร้าง EntryIndex เมื่อเจอ op แบบ id ครั้งแรก (op แบบเก่าทำให้ index ต้องสร้างใหม่)"""
+    index = None
+    for op in ops:
+        if _is_legacy(op):
+            apply_op(data, op)
+            index = None
+            continue
+        if index is None and op['op'] in _ID_OPS:
+            ensure_entry_ids(data)
+            index = EntryIndex(data)
+        apply_op(data, op, index)
+
+class Journal:
+    """journal แบบต่อท้ายอย่างเดียวของการเปลี่ยนแปลงที่เข้ารหัสแล้ว"""
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_id = None
+        self.last_seq = 0
+        # ความยาวไฟล์ส่วนที่อ่านได้ครบ — record ที่ขาดท้ายไฟล์ (เขียนค้างตอนเครื่องดับ) จะถูกตัดก่อนเขียนต่อ
+        self._valid_end = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.journal_id is not None
+
+    def size(self) -> int:
+        return self._valid_end
+
+    @staticmethod
+    def _aad(journal_id: bytes, seq: int) -> bytes:
+        return JOURNAL_MAGIC + journal_id + struct.pack(">Q", seq)
+
+    def start(self, journal_id: bytes, last_seq: int = 0):
+        """เริ่ม journal ใหม่ (ไฟล์เดิมจะถูกเขียนทับตอน append ครั้งแรก)"""
+        with self._lock:
+            self.journal_id = journal_id
+            self.last_seq = last_seq
+            self._valid_end = 0
+
+    def disable(self):
+        with self._lock:
+            self.journal_id = None
+            self.last_seq = 0
+            self._valid_end = 0
+
+    def _iter_records(self, blob: bytes):
+        """ไล่ record ที่ครบถ้วน คืนค่า (seq, nonce, ciphertext, ตำแหน่งจบ)"""
+        pos = _FILE_HEADER_SIZE
+        while pos + _RECORD.size + _NONCE_SIZE <= len(blob):
+            length, seq = _RECORD.unpack_from(blob, pos)
+            start = pos + _RECORD.size
+            end = start + _NONCE_SIZE + length
+            if end > len(blob):
+                break
+            yield seq, blob[start:start + _NONCE_SIZE], blob[start + _NONCE_SIZE:end], end
+            pos = end
+
+    def replay(self, session, journal_id: bytes, after_seq: int) -> list:
+        """
+        อ่าน op ทั้งหมดที่ seq > after_seq จากไฟล์ journal ของ journal_id นี้
+        หยุดที่ record แรกที่ขาด ถอดรหัสไม่ผ่าน หรือ seq ไม่ต่อเนื่อง (ส่วนที่เหลือถือว่าเขียนไม่สำเร็จ)
+        record ที่ seq <= after_seq (snapshot รวมไว้แล้ว) ยังอยู่ได้ เพราะเก็บไว้ให้ snapshot รุ่นก่อนหน้า
+        """
+        self.start(journal_id, after_seq)
+        if not self.path.exists():
+            return []
+        blob = self.path.read_bytes()
+        if blob[:_FILE_HEADER_SIZE] != JOURNAL_MAGIC + journal_id:
+            return []
+        ops = []
+        valid_end = _FILE_HEADER_SIZE
+        last_seq = after_seq
+        for seq, nonce, ciphertext, end in self._iter_records(blob):
+            try:
+                plain = session.decrypt(nonce, ciphertext, self._aad(journal_id, seq))
+            except Exception:
+                break
+            if seq > after_seq:
+                if seq != last_seq + 1:
+                    break
+                ops.extend(json.loads(plain))
+                last_seq = seq
+            valid_end = end
+        with self._lock:
+            self.last_seq = last_seq
+            self._valid_end = valid_end
+        return ops
+
+    def append(self, session, ops: list) -> int:
+        """ต่อท้าย record ใหม่ (ทุก op ในหนึ่งครั้งเป็น record เดียว) คืนค่า seq ของ record"""
+        with self._lock:
+            if self.journal_id is None:
+                raise ValueError("journal ยังไม่ถูกเริ่ม")
+            seq = self.last_seq + 1
+            plain = json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode()
+            nonce = os.urandom(_NONCE_SIZE)
+            _, ciphertext = session.encrypt(plain, self._aad(self.journal_id, seq), nonce)
+            record = _RECORD.pack(len(ciphertext), seq) + nonce + ciphertext
+            if self._valid_end == 0:
+                with open(self.path, 'wb') as f:
+                    f.write(JOURNAL_MAGIC + self.journal_id + record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._valid_end = _FILE_HEADER_SIZE + len(record)
+            else:
+                with open(self.path, 'r+b') as f:
+                    f.seek(self._valid_end)
+                    f.write(record)
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._valid_end += len(record)
+            self.last_seq = seq
+            return seq
+
+    def trim(self, upto_seq: int):
+        """ตัด record ที่ snapshot รวมไว้แล้ว (seq <= upto_seq) — คัดลอก ciphertext เดิมโดยไม่ต้องถอดรหัส"""
+        with self._lock:
+            if self.journal_id is None or self._valid_end == 0 or not self.path.exists():
+                return
+            blob = self.path.read_bytes()[:self._valid_end]
+            kept = bytearray(JOURNAL_MAGIC + self.journal_id)
+            for seq, nonce, ciphertext, end in self._iter_records(blob):
+                if seq > upto_seq:
+                    kept += _RECORD.pack(len(ciphertext), seq) + nonce + ciphertext
+            tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._valid_end = len(kept)
+
+    def delete(self):
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
+            self.journal_id = None
+            self.last_seq = 0
+            self._valid_end = 0
\ No newline at end of file
@@ -0,0 +1,206 @@
+import time
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id as _CryptoArgon2id  # cryptography >= 44
+except Exception:
+    _CryptoArgon2id = None
+
+try:
+    from argon2.low_level import hash_secret_raw as _argon2_hash_raw, Type as _Argon2Type  # pip install argon2-cffi
+except Exception:
+    _argon2_hash_raw = None
+
+_HAS_ARGON2 = _CryptoArgon2id is not None or _argon2_hash_raw is not None
+
+# เวลาปลดล็อกเป้าหมาย (มิลลิวินาที) ที่ใช้ตอน calibrate
+DEFAULT_TARGET_MS = 300
+
+class KdfEngine:
+    """ฐานของ KDF ทุกชนิด — พารามิเตอร์ทั้งหมดต้อง serialize เป็น dict ได้เพื่อเก็บใน header ของ vault"""
+
+    name = ""
+    # ชื่อพารามิเตอร์ -> (ค่าต่ำสุด, ค่าสูงสุด) ที่ยอมรับจากไฟล์ (kdf_from_params)
+    LIMITS = {}
+
+    def derive(self, password: str, salt: bytes, length: int = 32) -> bytes:
+        raise NotImplementedError
+
+    def params(self) -> dict:
+        raise NotImplementedError
+
+    def scaled(self, factor: float) -> "KdfEngine":
+        """คืน KDF ชนิดเดียวกันที่ปรับค่า cost ตามสัดส่วน (ไม่ต่ำกว่าค่าขั้นต่ำ)"""
+        raise NotImplementedError
+
+    def benchmark(self) -> float:
+        """วัดเวลา derive หนึ่งครั้ง (วินาที)"""
+        start = time.perf_counter()
+        self.derive("calibration", b"\x00" * 16)
+        return time.perf_counter() - start
+
+    def __eq__(self, other):
+        return isinstance(other, KdfEngine) and self.params() == other.params()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.params()})"
+
+class Pbkdf2Kdf(KdfEngine):
+    """PBKDF2-HMAC-SHA256 (ค่าเดิมของโปรแกรม)"""
+
+    name = "pbkdf2-sha256"
+    MIN_ITERATIONS = 600000
+    MAX_ITERATIONS = 20000000
+    LIMITS = {'iterations': (MIN_ITERATIONS, MAX_ITERATIONS)}
+
+    def __init__(self, iterations: int = 600000):
+        self.iterations = int(iterations)
+
+    def derive(self, password: str, salt: bytes, length: int = 32) -> bytes:
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=length,
+            salt=salt,
+            iterations=self.iterations,
+        )
+        return kdf.derive(password.encode())
+
+    def params(self) -> dict:
+        return {'name': self.name, 'iterations': self.iterations}
+
+    def scaled(self, factor: float) -> "Pbkdf2Kdf":
+        return Pbkdf2Kdf(max(self.MIN_ITERATIONS, min(self.MAX_ITERATIONS, int(self.iterations * factor))))
+
+class ScryptKdf(KdfEngine):
+    """scrypt — memory-hard ใช้ได้ทุกเครื่องที่มี OpenSSL"""
+
+    name = "scrypt"
+    MIN_LOG_N = 15
+    MAX_LOG_N = 20
+    # หน่วยความจำ = 128 * r * 2^log_n ไบต์ (log_n 20, r 8 = 1 GiB)
+    MAX_R = 8
+    MAX_P = 4
+    LIMITS = {'log_n': (MIN_LOG_N, MAX_LOG_N), 'r': (1, MAX_R), 'p': (1, MAX_P)}
+
+    def __init__(self, log_n: int = 15, r: int = 8, p: int = 1):
+        self.log_n = int(log_n)
+        self.r = int(r)
+        self.p = int(p)
+
+    def derive(self, password: str, salt: bytes, length: int = 32) -> bytes:
+        kdf = Scrypt(salt=salt, length=length, n=2 ** self.log_n, r=self.r, p=self.p)
+        return kdf.derive(password.encode())
+
+    def params(self) -> dict:
+        return {'name': self.name, 'log_n': self.log_n, 'r': self.r, 'p': self.p}
+
+    def scaled(self, factor: float) -> "ScryptKdf":
+        # n ต้องเป็นกำลังของ 2 — เพิ่มทีละเท่าตัวเท่าที่ยังไม่เกินเป้า
+        log_n = self.log_n
+        while factor >= 2 and log_n < self.MAX_LOG_N:
+            log_n += 1
+            factor /= 2
+        return ScryptKdf(max(self.MIN_LOG_N, log_n), self.r, self.p)
+
+class Argon2idKdf(KdfEngine):
+    """Argon2id — ใช้เมื่อมี cryptography >= 44 หรือ argon2-cffi"""
+
+    name = "argon2id"
+    MIN_MEMORY_KIB = 19 * 1024
+    MAX_MEMORY_KIB = 256 * 1024
+    MIN_TIME_COST = 2
+    MAX_TIME_COST = 16
+    MAX_PARALLELISM = 8
+    LIMITS = {'time_cost': (MIN_TIME_COST, MAX_TIME_COST), 'memory_kib': (MIN_MEMORY_KIB, MAX_MEMORY_KIB),
+              'parallelism': (1, MAX_PARALLELISM)}
+
+    def __init__(self, time_cost: int = 2, memory_kib: int = 19 * 1024, parallelism: int = 1):
+        self.time_cost = int(time_cost)
+        self.memory_kib = int(memory_kib)
+        self.parallelism = int(parallelism)
+
+    def derive(self, password: str, salt: bytes, length: int = 32) -> bytes:
+        if _CryptoArgon2id is not None:
+            kdf = _CryptoArgon2id(
+                salt=salt,
+                length=length,
+                iterations=self.time_cost,
+                lanes=self.parallelism,
+                memory_cost=self.memory_kib,
+            )
+            return kdf.derive(password.encode())
+        if _argon2_hash_raw is not None:
+            return _argon2_hash_raw(
+                password.encode(), salt,
+                time_cost=self.time_cost,
+                memory_cost=self.memory_kib,
+                parallelism=self.parallelism,
+                hash_len=length,
+                type=_Argon2Type.ID,
+            )
+        raise RuntimeError("ไม่มีไลบรารี Argon2 ในเครื่องนี้")
+
+    def params(self) -> dict:
+        return {'name': self.name, 'time_cost': self.time_cost,
+                'memory_kib': self.memory_kib, 'parallelism': self.parallelism}
+
+    def scaled(self, factor: float) -> "Argon2idKdf":
+        # เพิ่มหน่วยความจำก่อน (ต้านการเดาด้วย GPU ได้ดีกว่า) แล้วค่อยเพิ่มรอบ
+        memory = max(self.MIN_MEMORY_KIB, min(self.MAX_MEMORY_KIB, int(self.memory_kib * factor)))
+        factor = factor * self.memory_kib / memory
+        time_cost = max(self.MIN_TIME_COST, min(self.MAX_TIME_COST, int(round(self.time_cost * factor))))
+        return Argon2idKdf(time_cost, memory, self.parallelism)
+
+# ค่าที่ใช้กับไฟล์เก่าที่ไม่มี header
+LEGACY_KDF = Pbkdf2Kdf(600000)
+
+_KDF_TYPES = {
+    Pbkdf2Kdf.name: Pbkdf2Kdf,
+    ScryptKdf.name: ScryptKdf,
+    Argon2idKdf.name: Argon2idKdf,
+}
+
+def available_kdfs() -> list:
+    """รายชื่อ KDF ที่ใช้ได้บนเครื่องนี้ เรียงจากที่แนะนำที่สุด"""
+    names = [ScryptKdf.name, Pbkdf2Kdf.name]
+    if _HAS_ARGON2:
+        names.insert(0, Argon2idKdf.name)
+    return names
+
+def kdf_from_params(params: dict) -> KdfEngine:
+    """
+    สร้าง KDF จาก dict ที่เก็บใน header/metadata/keyslot (ValueError ถ้าไม่รู้จักหรือค่าอยู่นอก LIMITS)
+    ค่ามาจากไฟล์บนดิสก์ — ไฟล์ที่เสียหรือถูกแก้จะใส่ cost สูงจนโปรแกรมค้างหรือหน่วยความจำหมดตอนปลดล็อกไม่ได้
+    """
+    params = dict(params or {})
+    name = params.pop('name', None)
+    cls = _KDF_TYPES.get(name)
+    if cls is None:
+        raise ValueError(f"ไม่รู้จัก KDF: {name}")
+    if cls is Argon2idKdf and not _HAS_ARGON2:
+        raise ValueError("ไฟล์นี้ใช้ Argon2id แต่เครื่องนี้ไม่มีไลบรารี Argon2")
+    unknown = set(params) - set(cls.LIMITS)
+    if unknown:
+        raise ValueError(f"พารามิเตอร์ของ {name} ไม่รู้จัก: {', '.join(sorted(map(str, unknown)))}")
+    for key, value in params.items():
+        low, high = cls.LIMITS[key]
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+            raise ValueError(f"พารามิเตอร์ {key} ของ {name} ต้องเป็นจำนวนเต็ม {low}–{high}: {value!r}")
+    return cls(**params)
+
+def calibrate(target_ms: int = DEFAULT_TARGET_MS, name: str = None) -> KdfEngine:
+    """
+    วัดความเร็วเครื่องแล้วเลือกพารามิเตอร์ให้การปลดล็อกใช้เวลาประมาณ target_ms
+    (ไม่ต่ำกว่าค่าขั้นต่ำด้านความปลอดภัยของแต่ละชนิด)
+    """
+    name = name or available_kdfs()[0]
+    base = {
+        Argon2idKdf.name: lambda: Argon2idKdf(Argon2idKdf.MIN_TIME_COST, Argon2idKdf.MIN_MEMORY_KIB),
+        ScryptKdf.name: lambda: ScryptKdf(ScryptKdf.MIN_LOG_N),
+        Pbkdf2Kdf.name: lambda: Pbkdf2Kdf(Pbkdf2Kdf.MIN_ITERATIONS),
+    }[name]()
+    elapsed = min(base.benchmark(), base.benchmark())
+    factor = (target_ms / 1000.0) / max(elapsed, 1e-6)
+    return base.scaled(factor) if factor > 1 else base
\ No newline at end of file
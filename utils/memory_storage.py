@@ -0,0 +1,101 @@
+import io
+import os
+from pathlib import PurePosixPath
+from utils.crypto import SessionKey
+from utils.compression import DEFAULT_COMPRESSION
+from utils.serializers import DEFAULT_FORMAT, get_serializer
+from utils.storage import DataStorage
+from utils.vault_format import read_prefix
+from utils.writer import BackgroundWriter
+
+class MemoryStorage(DataStorage):
+    """
+    storage ที่เก็บทุกอย่างไว้ในหน่วยความจำของ process (ไม่สร้างไฟล์หรือโฟลเดอร์ใด ๆ)
+    snapshot ยัง serialize/บีบอัด/เข้ารหัสเป็น container แบบเดียวกับไฟล์ vault จริง
+    จึงใช้ทดสอบและวัดประสิทธิภาพของขั้นตอนเหล่านั้นได้โดยไม่มีเวลาของดิสก์ปน
+    ไม่มี journal — ทุกการบันทึกเป็น snapshot ทั้งก้อน
+    """
+
+    ENGINE = 'memory'
+
+    def __init__(self, filename="secure_data.enc", kdf=None):
+        # ไม่เรียก DataStorage.__init__ (สร้างโฟลเดอร์และไฟล์ .salt)
+        # filename เป็นแค่ชื่ออ้างอิง ไม่ชี้ไปที่ไฟล์จริง
+        self.root = None
+        self.filename = PurePosixPath("<memory>") / filename
+        self.journal = None
+        # ใช้เฉพาะกับ vault แบบ Fernet รุ่นเก่า ซึ่งไม่มีทางเกิดขึ้นในหน่วยความจำ
+        self.salt = os.urandom(32)
+        self._snapshot_header = {}
+        self._blob = None
+        self._keyslots = {}
+        self._metadata = {}
+        self.serializer = get_serializer(DEFAULT_FORMAT)
+        self.compression = DEFAULT_COMPRESSION
+        self.writer = BackgroundWriter(self)
+        if kdf is not None:
+            # ข้ามการ calibrate KDF (ใช้ KDF ราคาถูกตอนทดสอบได้)
+            self.save_metadata({'kdf': kdf.params()})
+
+    # ---------- metadata / keyslot ----------
+
+    def load_metadata(self):
+        return dict(self._metadata)
+
+    def save_metadata(self, meta: dict):
+        self._metadata.update(meta)
+
+    def _load_keyslots(self) -> dict:
+        return dict(self._keyslots)
+
+    def _store_keyslots(self, doc: dict):
+        self._keyslots = dict(doc)
+
+    # ---------- snapshot ----------
+
+    def exists(self) -> bool:
+        return self._blob is not None
+
+    def _current_header(self):
+        if self._blob is None:
+            return None, None
+        return self.filename, read_prefix(io.BytesIO(self._blob)).header
+
+    def save_data(self, data: dict, session: SessionKey):
+        if session.key_id is None:
+            raise ValueError("ต้องใช้ data key แบบ envelope ในการบันทึก (เรียก upgrade_session ก่อน)")
+        header, write = self._encode_snapshot(data, session, {})
+        buffer = io.BytesIO()
+        write(buffer)
+        self._blob = buffer.getvalue()
+        self._snapshot_header = header
+
+    def read_snapshot(self, session: SessionKey) -> dict:
+        blob = self._blob
+        if blob is None:
+            raise FileNotFoundError(self.filename)
+        prefix = read_prefix(io.BytesIO(blob))
+        self._snapshot_header = prefix.header
+        with memoryview(blob) as view:
+            payload = self._decrypt_payload(prefix, view[len(prefix.aad):], session)
+        return self.parse_payload(payload, prefix.header.get('format'))
+
+    # ---------- ไม่มี journal ----------
+
+    def append_changes(self, ops: list, session: SessionKey) -> bool:
+        return False
+
+    def queue_changes(self, ops: list, session: SessionKey) -> bool:
+        return False
+
+    def replay_journal(self, data: dict, session: SessionKey) -> dict:
+        return data
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def delete_all_data(self):
+        self.writer.flush()
+        self._blob = None
+        self._keyslots = {}
+        self._snapshot_header = {}
@@ -0,0 +1,473 @@
+import bisect
+import functools
+import heapq
+import threading
+from collections import Counter, deque
+from itertools import accumulate, chain, repeat
+from math import ceil
+
+from utils.entries import entry_domain
+from utils.search_query import free_text, structured
+from utils.thai_text import normalize_thai, split_words, word_spans
+
+# index สำหรับค้นหา: เก็บข้อความที่ normalize แล้วของแต่ละฟิลด์ใน entry (คำนวณครั้งเดียวตอนเพิ่ม/แก้ไข)
+# พร้อม posting ของ trigram -> หมายเลขเอกสาร แยกตามฟิลด์ ค้นหาแต่ละครั้งจึงไม่ต้องไล่ .lower() ทุกรายการ
+# ข้อความภาษาไทยผ่าน NFC และจัดรูปสระ/วรรณยุกต์ (utils/thai_text.py) ทั้งตอนสร้างคีย์และตอนค้นหา
+# ตำแหน่งของฟิลด์ใน tuple ข้อความของแต่ละเอกสาร (domain = โดเมนของ url)
+FIELDS = ('title', 'username', 'domain', 'notes')
+TITLE, USERNAME, DOMAIN, NOTES = range(len(FIELDS))
+# ฟิลด์ที่มี trigram posting — notes ยาวได้หลายบรรทัด ค้นด้วย find ในข้อความรวมแทน (ไม่เพิ่มหน่วยความจำต่อ trigram)
+_INDEXED = (TITLE, USERNAME, DOMAIN)
+# ค้นหาในโฟลเดอร์ (ผลเหมือนเดิม: คำค้นเป็น substring ของชื่อหรือชื่อผู้ใช้ ไม่สนตัวพิมพ์เล็ก/ใหญ่)
+SEARCH_FIELDS = (TITLE, USERNAME)
+# ค้นหาแบบจัดอันดับ: น้ำหนักของฟิลด์ ชื่อ > โดเมน > ชื่อผู้ใช้ > หมายเหตุ
+RANK_WEIGHTS = {TITLE: 1.0, DOMAIN: 0.8, USERNAME: 0.6, NOTES: 0.4}
+# สัดส่วน trigram ของคำค้นที่ต้องพบในฟิลด์จึงนับว่าใกล้เคียง (คำยาว 6–7 ตัวอักษรพิมพ์ผิดได้หนึ่งตัว)
+MIN_SIMILARITY = 0.5
+RANK_LIMIT = 100
+
+# ตัวคั่นต้น/ท้ายฟิลด์ (ไม่มีทางอยู่ในคำค้น) — ท้ายฟิลด์มีสองตัว ทุกตัวอักษรและทุกคู่ตัวอักษรจึงเป็นจุดเริ่มของ trigram บางตัว
+_START = "\x02"
+_END = "\x03\x03"
+# ตัวคั่นระหว่าง notes ในข้อความรวม
+_NOTES_SEP = "\x00"
+# ผู้สมัครไม่เกินจำนวนนี้ตรวจ notes ของแต่ละรายการตรง ๆ (ถูกกว่า find บนข้อความรวมทั้งหมด)
+_NOTES_VERIFY = 2048
+_EMPTY = frozenset()
+
+def normalize(text: str) -> str:
+    """NFC + จัดรูปอักษรไทย ตัวพิมพ์เล็กแบบ casefold และตัดอักขระควบคุม (ใช้เป็นตัวคั่นภายใน index)"""
+    if not text:
+        return ''
+    if not text.isascii():
+        text = normalize_thai(text)
+    folded = text.casefold()
+    # ข้อความที่เป็นตัวพิมพ์เล็กอยู่แล้วใช้ string เดิมของ entry (ไม่เก็บสำเนา)
+    text = text if folded == text else folded
+    if not text.isprintable():
+        text = ''.join(ch for ch in text if ch.isprintable() or ch == ' ')
+    return text
+
+def _domain(url: str) -> str:
+    try:
+        return entry_domain(url)
+    except ValueError:
+        return ''
+
+def entry_fields(entry: dict) -> tuple:
+    """ข้อความค้นหาของ entry ตามลำดับใน FIELDS"""
+    return (normalize(entry.get('title', '')), normalize(entry.get('username', '')),
+            normalize(_domain(entry.get('url', ''))), normalize(entry.get('notes', '')))
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def field_trigrams(text: str) -> set:
+    """
+    trigram ของฟิลด์ (มีตัวคั่นต้น/ท้าย) และ trigram ต้นคำของทุกคำถัดจากคำแรก (ตัวคั่นต้น + สองตัวอักษรแรกของคำ)
+    คำค้นที่ตรงกับต้นคำ เช่น "ธนาคาร" ใน "บัญชีธนาคาร" จึงได้คะแนนเหมือนขึ้นต้นฟิลด์ (ไม่กระทบการค้นแบบ substring)
+    """
+    if not text:
+        return set()
+    grams = trigrams(_START + text + _END)
+    if ' ' in text or not text.isascii():
+        padded = text + _END
+        grams.update(_START + padded[start:start + 2] for start, _ in word_spans(text) if start)
+    return grams
+
+def _locked(method):
+    """เมธอดที่ถือ lock ของ index ตลอดการทำงาน"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class SearchIndex:
+    """
+    index ค้นหาข้อความของ entry ทุกโฟลเดอร์ที่เคยถอดรหัส อัปเดตทีละรายการผ่าน EntryIndex
+    - เอกสารแต่ละรายการได้หมายเลขเพิ่มขึ้นเรื่อย ๆ (ไม่นำกลับมาใช้) ลำดับหมายเลขในโฟลเดอร์จึงตรงกับลำดับใน list
+    - คำค้น 1–3 ตัวอักษร: ผลลัพธ์คือ posting ของ trigram (หรือ union ของ trigram ที่ขึ้นต้นด้วยคำค้น) ไม่ต้องตรวจซ้ำ
+    - คำค้นยาวกว่านั้น: intersection ของ posting แล้วตรวจ substring กับข้อความที่เก็บไว้เฉพาะผู้สมัคร
+    - rank: จัดอันดับทุกฟิลด์ตาม RANK_WEIGHTS นับ trigram ที่ตรงกันของผู้สมัครทั้งหมดในครั้งเดียว (พิมพ์ผิดได้)
+    - โฟลเดอร์ที่ถูกพัก (โหมดประหยัดหน่วยความจำ) ยังอยู่ใน index แต่ไม่มี notes (ดู seal_folder)
+      ผู้เรียกต้องโหลดโฟลเดอร์ก่อนอ่าน entry — notes ของโฟลเดอร์นั้นค้นพบได้อีกครั้งหลังโหลด
+    - ทุกเมธอดสาธารณะถือ lock: ค้นหาจาก worker thread ได้ขณะ GUI thread แก้ไข (การแก้ไขรอจนค้นหาเสร็จ)
+    """
+
+    def __init__(self):
+        self._next_doc = 0
+        # id -> หมายเลขเอกสาร, หมายเลขเอกสาร -> (id, โฟลเดอร์, ข้อความค้นหาตาม FIELDS)
+        self._docs = {}
+        self._records = {}
+        self._folders = {}
+        # แยกตามฟิลด์: trigram -> หมายเลขเอกสาร
+        # และตัวอักษรแรก / สองตัวแรก -> trigram ที่ขึ้นต้นด้วยตัวอักษรเหล่านั้น (สำหรับคำค้นสั้น)
+        self._trigrams = {field: {} for field in _INDEXED}
+        self._prefixes = {field: {} for field in _INDEXED}
+        # (ข้อความ notes ทั้งหมดต่อกัน, ตำแหน่งเริ่มของแต่ละชิ้น, หมายเลขเอกสาร) — สร้างใหม่เมื่อใช้หลังการแก้ไข
+        self._notes = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, entry_id) -> bool:
+        return entry_id in self._docs
+
+    # ---------- อัปเดต ----------
+
+    @_locked
+    def add(self, folder: str, entry: dict):
+        """เพิ่มหรือแทนที่ entry (แก้ไขในที่เดิมคงหมายเลขเอกสารไว้ ลำดับจึงไม่เปลี่ยน)"""
+        entry_id = entry['id']
+        fields = entry_fields(entry)
+        doc = self._docs.get(entry_id)
+        if doc is None:
+            doc = self._next_doc
+            self._next_doc += 1
+            self._docs[entry_id] = doc
+            for field in _INDEXED:
+                self._post(field, doc, field_trigrams(fields[field]))
+            if fields[NOTES]:
+                self._notes = None
+        else:
+            _, old_folder, old_fields = self._records[doc]
+            if old_folder != folder:
+                self._discard(self._folders, old_folder, doc)
+            for field in _INDEXED:
+                if old_fields[field] != fields[field]:
+                    old_grams, grams = field_trigrams(old_fields[field]), field_trigrams(fields[field])
+                    self._unpost(field, doc, old_grams - grams)
+                    self._post(field, doc, grams - old_grams)
+            if old_fields[NOTES] != fields[NOTES]:
+                self._notes = None
+        self._records[doc] = (entry_id, folder, fields)
+        self._folders.setdefault(folder, set()).add(doc)
+
+    def _post(self, field: int, doc: int, grams: set):
+        postings = self._trigrams[field]
+        new_grams = [gram for gram in grams if gram not in postings]
+        if new_grams:
+            prefixes = self._prefixes[field]
+            for gram in new_grams:
+                postings[gram] = {doc}
+                prefixes.setdefault(gram[0], set()).add(gram)
+                prefixes.setdefault(gram[:2], set()).add(gram)
+            grams = grams.difference(new_grams)
+        # trigram ที่มีอยู่แล้ว (ส่วนใหญ่): เพิ่มหมายเลขเอกสารด้วย map ทั้งชุด ไม่วนทีละตัวใน Python
+        deque(map(set.add, map(postings.__getitem__, grams), repeat(doc)), maxlen=0)
+
+    def _unpost(self, field: int, doc: int, grams):
+        postings = self._trigrams[field]
+        for gram in grams:
+            docs = postings.get(gram)
+            if docs is None:
+                continue
+            docs.discard(doc)
+            if not docs:
+                del postings[gram]
+                self._discard(self._prefixes[field], gram[0], gram)
+                self._discard(self._prefixes[field], gram[:2], gram)
+
+    @staticmethod
+    def _discard(groups: dict, key, value):
+        members = groups.get(key)
+        if members is not None:
+            members.discard(value)
+            if not members:
+                del groups[key]
+
+    def _drop(self, doc: int):
+        entry_id, folder, fields = self._records.pop(doc)
+        del self._docs[entry_id]
+        self._discard(self._folders, folder, doc)
+        for field in _INDEXED:
+            self._unpost(field, doc, field_trigrams(fields[field]))
+        if fields[NOTES]:
+            self._notes = None
+
+    @_locked
+    def remove(self, entry_ids):
+        for entry_id in entry_ids:
+            doc = self._docs.get(entry_id)
+            if doc is not None:
+                self._drop(doc)
+
+    @_locked
+    def remove_folder(self, folder: str):
+        for doc in list(self._folders.get(folder, ())):
+            self._drop(doc)
+
+    @_locked
+    def rename_folder(self, folder: str, new_name: str):
+        docs = self._folders.pop(folder, set())
+        for doc in docs:
+            entry_id, _, fields = self._records[doc]
+            self._records[doc] = (entry_id, new_name, fields)
+        if docs:
+            self._folders.setdefault(new_name, set()).update(docs)
+
+    @_locked
+    def seal_folder(self, folder: str):
+        """
+        ทิ้ง notes ของโฟลเดอร์ที่ถูกพัก (ไม่เก็บ plaintext ที่ยาวที่สุดไว้นอก ciphertext ของ cache)
+        ชื่อ/ชื่อผู้ใช้/โดเมนยังค้นหาได้ — load_folder ใส่ notes กลับเมื่อโฟลเดอร์ถูกโหลด
+        """
+        records = self._records
+        for doc in self._folders.get(folder, ()):
+            entry_id, _, fields = records[doc]
+            if fields[NOTES]:
+                records[doc] = (entry_id, folder, fields[:NOTES] + ('',))
+                self._notes = None
+
+    @_locked
+    def load_folder(self, folder: str, entries: list):
+        """
+        แทนที่ข้อมูลของทั้งโฟลเดอร์ (หลังถอดรหัสโฟลเดอร์ หรือหลัง rollback)
+        entry ที่ยังอยู่ในโฟลเดอร์อื่นของ index ถูกลบก่อนเพื่อให้ได้หมายเลขใหม่ตามลำดับใน list
+        """
+        self.remove_folder(folder)
+        self.remove([entry['id'] for entry in entries])
+        for entry in entries:
+            self.add(folder, entry)
+
+    # ---------- ค้นหา ----------
+    # scope: ชุดหมายเลขเอกสารที่ผลลัพธ์ต้องอยู่ภายใน (None = ทุกเอกสาร)
+
+    def _scope(self, folder: str):
+        return self._folders.get(folder, _EMPTY) if folder is not None else None
+
+    def _postings(self, field: int, query: str) -> tuple:
+        """
+        (posting ที่ต้องใช้, รวมแบบ union หรือไม่) — คำค้นสั้นใช้ union ของ trigram ที่ขึ้นต้นด้วยคำค้น
+        คำค้นยาวใช้ intersection ของ trigram ทุกตัวในคำค้น (None ถ้ามี trigram ที่ไม่มีเอกสารใดเลย)
+        """
+        postings = self._trigrams[field]
+        if len(query) < 3:
+            return [postings[gram] for gram in self._prefixes[field].get(query, ())], True
+        sets = [postings.get(gram) for gram in trigrams(query)]
+        if not all(sets):
+            return None, False
+        sets.sort(key=len)
+        return sets, False
+
+    def _estimate(self, field: int, query: str) -> int:
+        """จำนวนเอกสารสูงสุดที่ฟิลด์นี้อาจมีคำค้น (ขนาดของ posting ที่ต้องใช้)"""
+        if field == NOTES:
+            return len(self._records)
+        sets, union = self._postings(field, query)
+        if sets is None:
+            return 0
+        return sum(map(len, sets)) if union else len(sets[0])
+
+    def _matches(self, field: int, query: str, scope=None) -> set:
+        """
+        หมายเลขเอกสารใน scope ที่ฟิลด์นี้มีคำค้นเป็น substring
+        ถ้างานกับ posting มากกว่าขนาดของ scope (คำค้นสั้นมาก/ผู้สมัครเหลือน้อย) จะตรวจข้อความของ scope แทน
+        """
+        records = self._records
+        size = len(scope) if scope is not None else len(records)
+        if field == NOTES:
+            if size > _NOTES_VERIFY:
+                found = self._note_matches(query)
+                return found & scope if scope is not None else found
+            return {doc for doc in (scope if scope is not None else records) if query in records[doc][2][field]}
+        sets, union = self._postings(field, query)
+        if sets is None:
+            return set()
+        cost = sum(map(len, sets)) if union else len(sets[0])
+        if cost > size:
+            return {doc for doc in (scope if scope is not None else records) if query in records[doc][2][field]}
+        if union:
+            candidates = set().union(*sets)
+        else:
+            candidates = sets[0].intersection(*sets[1:])
+        if scope is not None:
+            candidates &= scope
+        if len(query) > 3:
+            # trigram ครบทุกตัวยังไม่รับประกันว่าเรียงติดกัน — ตรวจ substring เฉพาะผู้สมัคร
+            return {doc for doc in candidates if query in records[doc][2][field]}
+        return candidates
+
+    def _note_matches(self, query: str) -> set:
+        """เอกสารที่ notes มีคำค้น: str.find บนข้อความรวม แล้วหาเจ้าของตำแหน่งด้วย bisect (ข้ามไปชิ้นถัดไปทันที)"""
+        if self._notes is None:
+            records = self._records
+            docs = [doc for doc in records if records[doc][2][NOTES]]
+            texts = [records[doc][2][NOTES] for doc in docs]
+            starts = list(accumulate((len(text) + 1 for text in texts), initial=0))
+            self._notes = (_NOTES_SEP.join(texts), starts, docs)
+        text, starts, docs = self._notes
+        found = set()
+        position = text.find(query)
+        while position >= 0:
+            i = bisect.bisect_right(starts, position) - 1
+            found.add(docs[i])
+            position = text.find(query, starts[i + 1])
+        return found
+
+    def _similar(self, field: int, grams, scope=None) -> dict:
+        """
+        หมายเลขเอกสาร -> จำนวน trigram ของคำค้นที่พบในฟิลด์ (เฉพาะที่ถึง MIN_SIMILARITY)
+        เอกสารที่มี trigram ถึง need ตัวต้องอยู่ใน posting ที่เล็กที่สุด len(grams) - need + 1 ชุดอย่างน้อยหนึ่งชุด
+        ผู้สมัครจึงมาจาก union ของชุดเหล่านั้น แล้วนับทุก posting พร้อมกันด้วย set intersection + Counter
+        """
+        postings = self._trigrams[field]
+        sets = sorted((postings.get(gram, _EMPTY) for gram in grams), key=len)
+        need = max(1, ceil(len(sets) * MIN_SIMILARITY))
+        pool = set().union(*sets[:len(sets) - need + 1])
+        if scope is not None:
+            pool &= scope
+        if not pool:
+            return {}
+        counts = Counter(chain.from_iterable(docs & pool for docs in sets))
+        return {doc: count for doc, count in counts.items() if count >= need}
+
+    def _starting_with(self, field: int, query: str, scope=None) -> set:
+        postings = self._trigrams[field]
+        docs = set().union(*(postings[gram] for gram in self._prefixes[field].get(_START + query, ())))
+        return docs & scope if scope is not None else docs
+
+    # ---------- คำค้นแบบมีโครงสร้าง (utils/search_query.py) ----------
+
+    def _clause_value(self, clause) -> str:
+        if clause.field == 'domain':
+            # url:https://www.github.com/login ใช้ได้เหมือน url:github.com
+            return normalize(_domain(clause.value.strip()) or clause.value)
+        return normalize(clause.value)
+
+    def _folder_docs(self, query: str) -> set:
+        """เอกสารในโฟลเดอร์ที่ชื่อมีคำค้น"""
+        return set().union(*(docs for name, docs in self._folders.items() if query in normalize(name)))
+
+    def _clause_estimate(self, clause, query: str) -> int:
+        if clause.field == 'folder':
+            return sum(len(docs) for name, docs in self._folders.items() if query in normalize(name))
+        if clause.field == 'text':
+            return sum(self._estimate(field, query) for field in SEARCH_FIELDS)
+        return self._estimate(FIELDS.index(clause.field), query)
+
+    def _clause_docs(self, clause, query: str, scope=None) -> set:
+        if clause.field == 'folder':
+            docs = self._folder_docs(query)
+            return docs & scope if scope is not None else docs
+        if clause.field == 'text':
+            return set().union(*(self._matches(field, query, scope) for field in SEARCH_FIELDS))
+        return self._matches(FIELDS.index(clause.field), query, scope)
+
+    @_locked
+    def plan(self, clauses, free_text: bool = True) -> list:
+        """
+        ลำดับการทำงานของคำค้น: [(clause, ค่าที่ normalize แล้ว, จำนวนเอกสารโดยประมาณ)]
+        ตัวกรองที่เลือกเฉพาะที่สุดทำก่อน ตัวถัดไปทำกับผู้สมัครที่เหลือเท่านั้น (เหลือน้อยกว่า posting ก็ตรวจข้อความตรง ๆ)
+        การยกเว้นทำหลังสุด free_text=False: ข้ามข้อความอิสระที่ไม่ถูกยกเว้น (ใช้จัดอันดับแทนการกรอง)
+        """
+        steps = []
+        for clause in clauses:
+            if clause.field == 'text' and not clause.negated and not free_text:
+                continue
+            query = self._clause_value(clause)
+            if query:
+                steps.append((clause, query, self._clause_estimate(clause, query)))
+        steps.sort(key=lambda step: (step[0].negated, step[2] if not step[0].negated else 0))
+        return steps
+
+    def _execute(self, steps, scope=None):
+        """รันแผนจาก plan คืนชุดหมายเลขเอกสาร (None = ไม่มีตัวกรองเลย)"""
+        for clause, query, _ in steps:
+            if scope is not None and not scope:
+                break
+            if clause.negated:
+                if scope is None:
+                    scope = set(self._records)
+                scope = scope - self._clause_docs(clause, query, scope)
+            else:
+                scope = self._clause_docs(clause, query, scope)
+        return scope
+
+    @_locked
+    def search(self, term: str, folder: str = None) -> list:
+        """
+        id ของ entry ที่ชื่อหรือชื่อผู้ใช้มีคำค้น (เฉพาะโฟลเดอร์ที่ระบุ หรือทุกโฟลเดอร์)
+        คำค้นที่ใช้ไวยากรณ์ (field:value, -ยกเว้น, "วลี") ถูกรันตามแผนจาก plan — ข้อความอิสระทุกคำต้องพบ
+        เรียงตามลำดับในโฟลเดอร์ (ค้นหาทุกโฟลเดอร์: ตามลำดับที่ถูกเพิ่มเข้า index)
+        """
+        records = self._records
+        scope = self._scope(folder)
+        clauses = structured(term)
+        if clauses is not None:
+            docs = self._execute(self.plan(clauses), scope)
+        else:
+            query = normalize(term)
+            if not query:
+                docs = scope if scope is not None else records
+            else:
+                docs = set().union(*(self._matches(field, query, scope) for field in SEARCH_FIELDS))
+        if docs is None:
+            docs = records
+        return [records[doc][0] for doc in sorted(docs)]
+
+    def _term_scores(self, query: str, scope=None) -> dict:
+        """
+        หมายเลขเอกสาร -> คะแนนของคำค้นหนึ่งคำ (normalize แล้ว) ใช้ฟิลด์ที่ได้คะแนนสูงสุด
+        คะแนนของฟิลด์ = น้ำหนัก × (สัดส่วน trigram ของคำค้นที่พบ + 1 ถ้ามีคำค้นทั้งคำ)
+        trigram แรกของคำค้นมีตัวคั่นต้นฟิลด์ ฟิลด์ที่ขึ้นต้นด้วยคำค้นจึงได้คะแนนมากกว่าที่พบกลางฟิลด์
+        """
+        grams = trigrams(_START + query)
+        scores = {}
+        for field, weight in RANK_WEIGHTS.items():
+            if field == NOTES and len(query) < 3:
+                # คำค้นสั้นพบใน notes เกือบทุกรายการ
+                continue
+            if field not in _INDEXED:
+                field_scores = {}
+            elif grams:
+                total = len(grams)
+                field_scores = {doc: count / total for doc, count in self._similar(field, grams, scope).items()}
+            else:
+                # คำค้นตัวเดียว: ฟิลด์ที่ขึ้นต้นด้วยคำค้น (trigram ที่ขึ้นต้นด้วยตัวคั่นต้นฟิลด์ + คำค้น)
+                field_scores = dict.fromkeys(self._starting_with(field, query, scope), 1.0)
+            for doc in self._matches(field, query, scope):
+                field_scores[doc] = field_scores.get(doc, 0.0) + 1.0
+            for doc, score in field_scores.items():
+                score *= weight
+                if score > scores.get(doc, 0.0):
+                    scores[doc] = score
+        return scores
+
+    @_locked
+    def rank(self, term: str, folder: str = None, limit: int = RANK_LIMIT) -> list:
+        """
+        id ของ entry ที่ใกล้เคียงคำค้นที่สุด limit รายการ (ทุกโฟลเดอร์ถ้าไม่ระบุ) เรียงจากคะแนนมากไปน้อย
+        คำค้นหลายคำ: คะแนนของทั้งวลีบวกคะแนนของแต่ละคำ (คำละฟิลด์ก็ได้ เช่น "facebook alice")
+        notes ต้องมีคำค้นตรงตัว ฟิลด์อื่นพิมพ์ผิดได้ตาม MIN_SIMILARITY
+        คำค้นที่ใช้ไวยากรณ์: ตัวกรองจำกัดผู้สมัครก่อน แล้วจัดอันดับด้วยข้อความอิสระ (ไม่มีก็เรียงตามลำดับที่ถูกเพิ่ม)
+        """
+        records = self._records
+        scope = self._scope(folder)
+        clauses = structured(term)
+        if clauses is not None:
+            scope = self._execute(self.plan(clauses, free_text=False), scope)
+            term = free_text(clauses)
+            if not term.strip():
+                return [records[doc][0] for doc in heapq.nsmallest(limit, scope if scope is not None else records)]
+            if scope is not None and not scope:
+                return []
+        query = normalize(term).strip()
+        if not query:
+            return []
+        scores = self._term_scores(query, scope)
+        # แยกคำด้วยช่องว่าง และตัดคำภาษาไทยที่เขียนติดกัน ("บัญชีกสิกร" -> บัญชี, กสิกร)
+        words = [word for word in split_words(query) if len(word) > 1]
+        if len(words) > 1:
+            for word in words:
+                for doc, score in self._term_scores(word, scope).items():
+                    scores[doc] = scores.get(doc, 0.0) + score
+        # top-K ด้วย heap (ไม่เรียงผลทั้งหมด) คะแนนเท่ากันเรียงตามลำดับที่ถูกเพิ่ม
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [records[doc][0] for doc, _ in best]
+
+    @_locked
+    def folder_of(self, entry_id: str) -> str:
+        return self._records[self._docs[entry_id]][1]
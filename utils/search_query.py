@@ -0,0 +1,55 @@
+import re
+from collections import namedtuple
+
+# คำค้นแบบมีโครงสร้างในช่องค้นหา เช่น  folder:work user:alice url:github.com -notes:old "bank of"
+# - field:value กรองเฉพาะฟิลด์ (substring ไม่สนตัวพิมพ์เล็ก/ใหญ่) ค่าที่มีช่องว่างใส่ในเครื่องหมายคำพูด
+# - ขึ้นต้นด้วย - คือไม่เอารายการที่ตรง
+# - ข้อความอื่น (หรือวลีในเครื่องหมายคำพูด) คือข้อความอิสระ: ต้องพบในชื่อหรือชื่อผู้ใช้ทุกคำ
+# ชื่อฟิลด์ที่ไม่รู้จัก (เช่น https://...) ถือเป็นข้อความธรรมดาทั้งคำ
+
+# ชื่อฟิลด์ในคำค้น -> ฟิลด์ที่ใช้กรอง ('text' = ข้อความอิสระ, 'folder' = ชื่อโฟลเดอร์)
+FIELD_ALIASES = {
+    'folder': 'folder', 'in': 'folder',
+    'title': 'title', 'name': 'title',
+    'user': 'username', 'username': 'username',
+    'url': 'domain', 'site': 'domain', 'domain': 'domain',
+    'notes': 'notes', 'note': 'notes',
+}
+
+Clause = namedtuple("Clause", "field value negated")
+
+_TOKEN = re.compile(r'(-)?(?:([A-Za-z]+):(?=[^\s]))?(?:"([^"]*)"?|(\S+))')
+
+def parse_query(text: str) -> list:
+    """แยกคำค้นเป็น Clause ตามลำดับที่พิมพ์ (ข้ามค่าว่าง เช่น "" หรือ - ตัวเดียว)"""
+    clauses = []
+    for match in _TOKEN.finditer(text or ''):
+        negated, name, quoted, word = match.groups()
+        value = quoted if quoted is not None else word
+        field = FIELD_ALIASES.get(name.lower()) if name else 'text'
+        if field is None:
+            # ชื่อฟิลด์ที่ไม่รู้จัก: คืนข้อความเดิมทั้งคำ
+            field, value = 'text', match.group(0)[1 if negated else 0:]
+        if value is None or not value.strip() or match.group(0) == '-':
+            # ค่าว่าง หรือ - ที่ไม่มีคำตามหลัง (เช่น "a - b") ไม่ใช่เงื่อนไข
+            continue
+        clauses.append(Clause(field, value, bool(negated)))
+    return clauses
+
+def structured(text: str):
+    """
+    Clause ของคำค้นที่ใช้ไวยากรณ์ (ตัวกรองฟิลด์ การยกเว้น หรือเครื่องหมายคำพูด)
+    None ถ้าเป็นข้อความธรรมดา — ค้นทั้งข้อความเป็น substring เดียวเหมือนเดิม
+    """
+    clauses = parse_query(text)
+    if '"' in (text or '') or any(clause.field != 'text' or clause.negated for clause in clauses):
+        return clauses
+    return None
+
+def has_folder_filter(text: str) -> bool:
+    """คำค้นเลือกโฟลเดอร์เอง (ผลลัพธ์มาจากหลายโฟลเดอร์ได้)"""
+    return any(clause.field == 'folder' and not clause.negated for clause in parse_query(text))
+
+def free_text(clauses: list) -> str:
+    """ข้อความอิสระที่ไม่ถูกยกเว้น (ใช้จัดอันดับ)"""
+    return ' '.join(clause.value for clause in clauses if clause.field == 'text' and not clause.negated)
@@ -0,0 +1,297 @@
+import os
+import json
+import threading
+from utils.crypto import SessionKey
+from utils.compression import choose_compression, compress_bytes, decompress_bytes
+from utils.entries import EntryIndex
+from utils.serializers import iter_json_chunks
+from utils.storage import DataStorage, atomic_write
+from utils.vault_format import CIPHER_AES_GCM, NONCE_SIZE, pack_prefix, read_header, unpack_vault
+
+# vault แบบแบ่ง shard: หนึ่งโฟลเดอร์ต่อหนึ่งไฟล์ในไดเรกทอรี secure_data.shards/
+#   manifest.bin       — ค่าทั่วไป (master_hash, telegram ฯลฯ) + รายการโฟลเดอร์ [{name, shard, rev, count}]
+#   <shard>.<rev>.bin  — list ของ entry ในโฟลเดอร์นั้น
+# ทุกไฟล์ใช้โครงสร้าง container เดียวกับ vault (utils/vault_format.py) เข้ารหัสด้วย data key
+# header ของ shard มี shard/rev และอยู่ใน associated data — manifest ตรวจว่าได้ไฟล์รุ่นที่ถูกต้อง
+# (สลับ shard ข้ามโฟลเดอร์หรือย้อนรุ่นไม่ได้)
+# การบันทึก: เขียน shard รุ่นใหม่เป็นไฟล์ใหม่ -> แทนที่ manifest แบบ atomic -> ลบ shard รุ่นเก่า
+# เครื่องดับกลางคันจึงได้ manifest เดิมที่ชี้ไฟล์รุ่นเดิมครบชุดเสมอ
+MANIFEST_NAME = "manifest.bin"
+
+class ShardedStorage(DataStorage):
+    """
+    vault ที่ถอดรหัสเฉพาะ manifest และโฟลเดอร์แรกตอนปลดล็อก โฟลเดอร์อื่นถอดรหัสเมื่อถูกเลือก
+    การบันทึกเขียนใหม่เฉพาะ shard ที่เปลี่ยน (op ชุดเดียวกับ journal ของแบบ JSON)
+    """
+
+    ENGINE = 'sharded'
+
+    def __init__(self, filename="secure_data.shards", root=None):
+        super().__init__(filename, root)
+        self.manifest_file = self.filename / MANIFEST_NAME
+        self.keyslot_file = self.filename.with_name(self.filename.name + '.mkey.bin')
+        # ไม่ใช้ journal/snapshot ของแบบ JSON
+        self.journal = None
+        # สถานะที่ถอดรหัสแล้ว (ใช้ร่วมกันระหว่าง GUI thread และ thread ของ writer)
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._loaded = {'folders': {}}
+        self._index = EntryIndex(self._loaded)
+
+    # ---------- ไฟล์ ----------
+
+    def _shard_path(self, record: dict):
+        return self.filename / f"{record['shard']}.{record['rev']}.bin"
+
+    @staticmethod
+    def _seal(session: SessionKey, header: dict, value) -> bytes:
+        nonce = os.urandom(NONCE_SIZE)
+        plain = ''.join(iter_json_chunks(value)).encode()
+        compression = choose_compression(len(plain))
+        if compression:
+            header = dict(header, compression=compression)
+            plain = compress_bytes(plain, compression)
+        prefix = pack_prefix(dict(header, key_id=session.key_id, cipher=CIPHER_AES_GCM), b"", nonce)
+        return prefix + session.encrypt(plain, prefix, nonce)[1]
+
+    @staticmethod
+    def _unseal(session: SessionKey, blob: bytes, expected: dict):
+        vault = unpack_vault(blob)
+        for key, value in expected.items():
+            if vault.header.get(key) != value:
+                raise ValueError(f"ไฟล์ไม่ตรงกับ manifest ({key})")
+        plain = session.decrypt(vault.nonce, vault.ciphertext, vault.aad)
+        if vault.header.get('compression'):
+            plain = decompress_bytes(plain, vault.header['compression'])
+        return json.loads(plain)
+
+    def _read_shard(self, session: SessionKey, record: dict) -> list:
+        return self._unseal(session, self._shard_path(record).read_bytes(),
+                            {'key_id': session.key_id, 'shard': record['shard'], 'rev': record['rev']})
+
+    def _write_files(self, session: SessionKey, dirty: set):
+        """เขียน shard รุ่นใหม่ของโฟลเดอร์ที่เปลี่ยน แล้วแทนที่ manifest และลบไฟล์ที่ไม่ถูกอ้างถึง"""
+        self.filename.mkdir(exist_ok=True)
+        for record in self._manifest['folders']:
+            if record['name'] not in dirty:
+                continue
+            entries = self._loaded['folders'][record['name']]
+            record['rev'] += 1
+            record['count'] = len(entries)
+            blob = self._seal(session, {'shard': record['shard'], 'rev': record['rev']}, entries)
+            atomic_write(self._shard_path(record), lambda f: f.write(blob))
+        blob = self._seal(session, {'kcv': session.key_check_value()}, self._manifest)
+        atomic_write(self.manifest_file, lambda f: f.write(blob))
+        referenced = {self._shard_path(record).name for record in self._manifest['folders']}
+        for path in self.filename.glob('*.bin'):
+            if path.name != MANIFEST_NAME and path.name not in referenced:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    # ---------- session ----------
+
+    def exists(self) -> bool:
+        return self.manifest_file.exists()
+
+    def _current_header(self):
+        if not self.exists():
+            return None, None
+        return self.manifest_file, read_header(self.manifest_file)
+
+    # ---------- โหลด ----------
+
+    def _record(self, folder: str) -> dict:
+        for record in self._manifest['folders']:
+            if record['name'] == folder:
+                return record
+        return None
+
+    def _reset(self, manifest: dict):
+        self._manifest = manifest
+        self._loaded = {'folders': {}}
+        self._index = EntryIndex(self._loaded)
+
+    def _ensure_loaded(self, session: SessionKey, folder: str):
+        """ถอดรหัส shard ของโฟลเดอร์ถ้ายังไม่ได้โหลด (สร้างโฟลเดอร์ใหม่ถ้ายังไม่มี)"""
+        if folder in self._loaded['folders']:
+            return
+        record = self._record(folder)
+        if record is None:
+            self._manifest['folders'].append({'name': folder, 'shard': os.urandom(8).hex(), 'rev': 0, 'count': 0})
+            self._index.load_folder(folder, [])
+        else:
+            self._index.load_folder(folder, self._read_shard(session, record))
+
+    def read_snapshot(self, session: SessionKey) -> dict:
+        """ถอดรหัส manifest และโฟลเดอร์แรกเท่านั้น โฟลเดอร์อื่นเป็น list ว่างจนกว่าจะ load_folder"""
+        with self._lock:
+            manifest = self._unseal(session, self.manifest_file.read_bytes(), {'key_id': session.key_id})
+            self._reset(manifest)
+            data = dict(manifest['settings'])
+            data['folders'] = {record['name']: [] for record in manifest['folders']}
+            if manifest['folders']:
+                first = manifest['folders'][0]['name']
+                self._ensure_loaded(session, first)
+                data['folders'][first] = list(self._loaded['folders'][first])
+        return data
+
+    def load_data(self, session: SessionKey) -> dict:
+        if not self.exists() or session is None:
+            return None
+        try:
+            return self.read_snapshot(session)
+        except Exception:
+            return None
+
+    def lazy_folders(self) -> set:
+        with self._lock:
+            if self._manifest is None:
+                return set()
+            return {record['name'] for record in self._manifest['folders']} - set(self._loaded['folders'])
+
+    def load_folder(self, session: SessionKey, folder: str) -> list:
+        """ถอดรหัสโฟลเดอร์ (ครั้งแรกที่ถูกเลือก) คืนค่าสำเนา list ของ entry"""
+        # ให้ op ที่ค้างอยู่ (เช่นเปลี่ยนชื่อโฟลเดอร์) ถูกใช้ก่อน ชื่อโฟลเดอร์จะได้ตรงกับ manifest
+        self.writer.flush()
+        with self._lock:
+            self._ensure_loaded(session, folder)
+            return list(self._loaded['folders'][folder])
+
+    def release_folder(self, folder: str):
+        """ทิ้ง plaintext ของโฟลเดอร์ (op ที่แตะโฟลเดอร์นี้ภายหลังจะถอดรหัส shard จากไฟล์ใหม่)"""
+        # shard ในไฟล์ต้องรวม op ที่ค้างอยู่แล้วก่อนทิ้งสำเนาในหน่วยความจำ
+        self.writer.flush()
+        with self._lock:
+            if folder in self._loaded['folders']:
+                self._index.delete_folder(folder)
+
+    def count_entries(self, session: SessionKey, folder: str) -> int:
+        """จำนวน entry ของโฟลเดอร์จาก manifest (ไม่ถอดรหัส shard)"""
+        # count ใน manifest ต้องรวม op ที่ค้างอยู่แล้ว
+        self.writer.flush()
+        with self._lock:
+            if folder in self._loaded['folders']:
+                return len(self._loaded['folders'][folder])
+            record = self._record(folder) if self._manifest is not None else None
+            return record['count'] if record is not None else 0
+
+    def replay_journal(self, data: dict, session: SessionKey) -> dict:
+        return data
+
+    # ---------- บันทึก ----------
+
+    def save_data(self, data: dict, session: SessionKey):
+        """เขียนทุกโฟลเดอร์ใหม่ทั้งหมด (ตั้งค่าครั้งแรก/ย้ายจากรูปแบบอื่น) — data ต้องโหลดครบทุกโฟลเดอร์"""
+        if session.key_id is None:
+            raise ValueError("ต้องใช้ data key แบบ envelope ในการบันทึก (เรียก upgrade_session ก่อน)")
+        with self._lock:
+            settings = {key: value for key, value in data.items() if key != 'folders'}
+            self._reset({'settings': settings, 'folders': []})
+            for folder, entries in data.get('folders', {}).items():
+                self._ensure_loaded(session, folder)
+                self._index.load_folder(folder, list(entries))
+            self._write_files(session, set(self._loaded['folders']))
+
+    def append_changes(self, ops: list, session: SessionKey) -> bool:
+        """ใช้ op กับโฟลเดอร์ที่เกี่ยวข้อง แล้วเขียนใหม่เฉพาะ shard ที่เปลี่ยน + manifest"""
+        if not ops or session.key_id is None:
+            return False
+        with self._lock:
+            if self._manifest is None:
+                return False
+            dirty = set()
+            for op in ops:
+                self._apply(session, op, dirty)
+            self._write_files(session, dirty & set(self._loaded['folders']))
+        return True
+
+    def _apply(self, session: SessionKey, op: dict, dirty: set):
+        kind = op['op']
+        index = self._index
+        if kind == 'add_entry':
+            self._ensure_loaded(session, op['folder'])
+            index.add(op['folder'], op['entry'])
+            dirty.add(op['folder'])
+        elif kind == 'update_entry':
+            self._ensure_entries_loaded(session, [op['id']])
+            dirty.add(index.folder_of(op['id']))
+            index.replace(op['id'], op['entry'])
+        elif kind == 'delete_entries':
+            self._ensure_entries_loaded(session, op['ids'])
+            dirty.update(index.folder_of(entry_id) for entry_id in op['ids'] if entry_id in index)
+            index.remove(op['ids'])
+        elif kind == 'move_entries':
+            self._ensure_loaded(session, op['to'])
+            self._ensure_entries_loaded(session, op['ids'])
+            dirty.update(index.folder_of(entry_id) for entry_id in op['ids'] if entry_id in index)
+            index.move(op['ids'], op['to'])
+            dirty.add(op['to'])
+        elif kind == 'add_folder':
+            if self._record(op['folder']) is None:
+                self._ensure_loaded(session, op['folder'])
+                dirty.add(op['folder'])
+        elif kind == 'rename_folder':
+            # shard ไม่มีชื่อโฟลเดอร์อยู่ข้างใน จึงแก้แค่ manifest (ย้ายไปท้ายรายการเหมือนแบบ JSON)
+            record = self._record(op['folder'])
+            self._manifest['folders'].remove(record)
+            self._manifest['folders'].append(dict(record, name=op['new_name']))
+            if op['folder'] in self._loaded['folders']:
+                index.rename_folder(op['folder'], op['new_name'])
+            if op['folder'] in dirty:
+                dirty.discard(op['folder'])
+                dirty.add(op['new_name'])
+        elif kind == 'delete_folder':
+            record = self._record(op['folder'])
+            if record is not None:
+                self._manifest['folders'].remove(record)
+            if op['folder'] in self._loaded['folders']:
+                index.delete_folder(op['folder'])
+            dirty.discard(op['folder'])
+        elif kind == 'set':
+            self._manifest['settings'][op['key']] = op['value']
+        else:
+            raise ValueError(f"ไม่รองรับ op: {kind}")
+
+    def _ensure_entries_loaded(self, session: SessionKey, entry_ids):
+        """
+        op ที่อ้างอิง entry ด้วย id ไม่ได้บอกโฟลเดอร์ต้นทาง ซึ่งอาจถูก release_folder ไปแล้ว
+        (เช่นถูกพักในโหมดประหยัดหน่วยความจำก่อน op ถูกเขียน) — ถอดรหัส shard ที่ยังไม่ได้โหลดจนพบครบ
+        """
+        missing = [entry_id for entry_id in entry_ids if entry_id not in self._index]
+        for record in list(self._manifest['folders']):
+            if not missing:
+                break
+            if record['name'] not in self._loaded['folders']:
+                self._ensure_loaded(session, record['name'])
+                missing = [entry_id for entry_id in missing if entry_id not in self._index]
+
+    def queue_changes(self, ops: list, session: SessionKey) -> bool:
+        if not ops or session.key_id is None:
+            return False
+        self.writer.queue_ops(session, ops)
+        return True
+
+    def queue_snapshot(self, data: dict, session: SessionKey):
+        """
+        shard ถูกเขียนใหม่ทีละโฟลเดอร์ตาม op อยู่แล้ว จึงเขียนทั้งหมดเฉพาะตอนยังไม่มี vault
+        (data ของ vault ที่เปิดอยู่อาจมีโฟลเดอร์ที่ยังไม่ได้โหลด เขียนทับจะทำให้ข้อมูลหาย)
+        """
+        if not self.exists() or self.writer.has_pending_snapshot():
+            super().queue_snapshot(data, session)
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    # ---------- ลบ ----------
+
+    def delete_all_data(self):
+        """ลบข้อมูลทั้งหมด"""
+        self.writer.flush()
+        with self._lock:
+            for path in self.filename.glob('*.bin'):
+                path.unlink()
+            if self.keyslot_file.exists():
+                self.keyslot_file.unlink()
+            self._reset(None)
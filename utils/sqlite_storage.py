@@ -0,0 +1,341 @@
+import json
+import hmac
+import sqlite3
+import hashlib
+import threading
+from utils.crypto import SessionKey
+from utils.entries import entry_domain
+from utils.storage import DataStorage
+
+# vault แบบ SQLite: แต่ละ entry เป็นหนึ่งแถวที่เข้ารหัสแยกกัน (AES-256-GCM ด้วย data key เดียวกับแบบ JSON)
+# คอลัมน์ *_tag คือ HMAC ของค่า (กุญแจย่อยจาก data key) — เลือกแถวของโฟลเดอร์ผ่าน index ได้โดยไม่เปิดเผยชื่อ
+# (title_tag/domain_tag ถูกเขียนไว้ด้วยเป็นส่วนหนึ่งของรูปแบบไฟล์ แต่โปรแกรมยังไม่ได้ใช้ค้นหา)
+# associated data ของแถวผูกกับ id ของแถว จึงย้าย ciphertext ไปแถวอื่นไม่ได้
+# ความทนทานต่อเครื่องดับใช้ transaction ของ SQLite (WAL) แทน snapshot + journal
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    nonce BLOB NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS folders (
+    tag BLOB PRIMARY KEY,
+    position INTEGER NOT NULL,
+    nonce BLOB NOT NULL,
+    name BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    folder_tag BLOB NOT NULL,
+    position INTEGER NOT NULL,
+    title_tag BLOB NOT NULL,
+    domain_tag BLOB,
+    nonce BLOB NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_folder ON entries (folder_tag, position);
+CREATE INDEX IF NOT EXISTS entries_by_title ON entries (title_tag);
+CREATE INDEX IF NOT EXISTS entries_by_domain ON entries (domain_tag);
+"""
+_TAG_SIZE = 16
+
+class SqliteStorage(DataStorage):
+    """
+    vault แบบ SQLite — ใช้ keyslot/session/metadata ร่วมกับ DataStorage
+    ปลดล็อกถอดรหัสเฉพาะค่าทั่วไปและชื่อโฟลเดอร์ แถวของ entry ถูกถอดรหัสทีละโฟลเดอร์เมื่อถูกเลือก (load_folder)
+    การแก้ไขเขียนเฉพาะแถวที่เกี่ยวข้อง (op อ้างอิงแถวด้วย id จึงไม่ต้องถือ plaintext ของโฟลเดอร์ไว้)
+    """
+
+    ENGINE = 'sqlite'
+
+    def __init__(self, filename="secure_data.db", root=None):
+        super().__init__(filename, root)
+        # keyslot แยกจากแบบ JSON (with_suffix จะชนกับ secure_data.mkey.bin)
+        self.keyslot_file = self.filename.with_name(self.filename.name + '.mkey.bin')
+        # ไม่ใช้ journal/snapshot ของแบบ JSON
+        self.journal = None
+        self._conn = None
+        self._db_lock = threading.RLock()
+        # โฟลเดอร์ที่ยังไม่ได้ถอดรหัสแถวของ entry หลัง read_snapshot
+        self._lazy = set()
+
+    # ---------- การเชื่อมต่อ ----------
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.filename, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _transaction(self, work):
+        """รัน work(conn) ใน transaction เดียว (สำเร็จทั้งหมดหรือไม่มีผลเลย)"""
+        with self._db_lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def _meta(self) -> dict:
+        with self._db_lock:
+            return dict(self._db().execute("SELECT key, value FROM meta"))
+
+    # ---------- การเข้ารหัสแถว ----------
+
+    @staticmethod
+    def _tag(index_key: bytes, kind: str, value: str) -> bytes:
+        return hmac.new(index_key, f"{kind}|{value}".encode(), hashlib.sha256).digest()[:_TAG_SIZE]
+
+    @staticmethod
+    def _index_key(session: SessionKey) -> bytes:
+        return session.derive_subkey("sqlite-index")
+
+    @staticmethod
+    def _seal(session: SessionKey, kind: str, key: str, value) -> tuple:
+        plain = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+        return session.encrypt(plain, f"pm-sqlite|{kind}|{key}".encode())
+
+    @staticmethod
+    def _open(session: SessionKey, kind: str, key: str, nonce: bytes, value: bytes):
+        return json.loads(session.decrypt(nonce, value, f"pm-sqlite|{kind}|{key}".encode()))
+
+    def _folder_tag(self, index_key: bytes, folder: str) -> bytes:
+        return self._tag(index_key, 'folder', folder)
+
+    def _entry_row(self, session: SessionKey, index_key: bytes, folder_tag: bytes, position: int, entry: dict) -> tuple:
+        nonce, body = self._seal(session, 'entry', entry['id'], entry)
+        domain = entry_domain(entry.get('url', ''))
+        return (entry['id'], folder_tag, position,
+                self._tag(index_key, 'title', entry.get('title', '').strip().lower()),
+                self._tag(index_key, 'domain', domain) if domain else None,
+                nonce, body)
+
+    @staticmethod
+    def _next_position(conn, table: str, where: str = "", args: tuple = ()) -> int:
+        row = conn.execute(f"SELECT COALESCE(MAX(position) + 1, 0) FROM {table} {where}", args).fetchone()
+        return row[0]
+
+    # ---------- session ----------
+
+    def exists(self) -> bool:
+        if not self.filename.exists():
+            return False
+        try:
+            return 'key_id' in self._meta()
+        except sqlite3.Error:
+            return False
+
+    def _current_header(self):
+        """ค่า key_id/kcv จากตาราง meta (ทำหน้าที่แทน header ของไฟล์ vault)"""
+        if not self.exists():
+            return None, None
+        return self.filename, self._meta()
+
+    # ---------- บันทึก ----------
+
+    def save_data(self, data: dict, session: SessionKey):
+        """เขียนข้อมูลทั้งหมดแทนของเดิมใน transaction เดียว (ตั้งค่าครั้งแรก/ย้ายจากแบบ JSON)"""
+        if session.key_id is None:
+            raise ValueError("ต้องใช้ data key แบบ envelope ในการบันทึก (เรียก upgrade_session ก่อน)")
+        index_key = self._index_key(session)
+
+        def work(conn):
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM folders")
+            conn.execute("DELETE FROM settings")
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [('key_id', session.key_id), ('kcv', session.key_check_value())])
+            for key, value in data.items():
+                if key != 'folders':
+                    self._set(conn, session, key, value)
+            for position, (folder, entries) in enumerate(data.get('folders', {}).items()):
+                folder_tag = self._insert_folder(conn, session, index_key, folder, position)
+                conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (self._entry_row(session, index_key, folder_tag, i, entry)
+                                  for i, entry in enumerate(entries)))
+
+        self._transaction(work)
+        with self._db_lock:
+            # ข้อมูลที่เพิ่งเขียนมาจากหน่วยความจำครบทุกโฟลเดอร์
+            self._lazy = set()
+
+    def _set(self, conn, session: SessionKey, key: str, value):
+        nonce, sealed = self._seal(session, 'setting', key, value)
+        conn.execute("INSERT OR REPLACE INTO settings (key, nonce, value) VALUES (?, ?, ?)", (key, nonce, sealed))
+
+    def _insert_folder(self, conn, session: SessionKey, index_key: bytes, folder: str, position: int = None) -> bytes:
+        tag = self._folder_tag(index_key, folder)
+        if conn.execute("SELECT 1 FROM folders WHERE tag = ?", (tag,)).fetchone():
+            return tag
+        if position is None:
+            position = self._next_position(conn, 'folders')
+        nonce, name = self._seal(session, 'folder', tag.hex(), folder)
+        conn.execute("INSERT INTO folders (tag, position, nonce, name) VALUES (?, ?, ?, ?)",
+                     (tag, position, nonce, name))
+        return tag
+
+    def append_changes(self, ops: list, session: SessionKey) -> bool:
+        """ใช้ op (ชุดเดียวกับ journal ของแบบ JSON) กับแถวที่เกี่ยวข้องเท่านั้น ใน transaction เดียว"""
+        if not ops or session.key_id is None:
+            return False
+        index_key = self._index_key(session)
+
+        def work(conn):
+            for op in ops:
+                self._apply(conn, session, index_key, op)
+
+        self._transaction(work)
+        return True
+
+    def _apply(self, conn, session: SessionKey, index_key: bytes, op: dict):
+        kind = op['op']
+        if kind == 'add_entry':
+            folder_tag = self._insert_folder(conn, session, index_key, op['folder'])
+            position = self._next_position(conn, 'entries', "WHERE folder_tag = ?", (folder_tag,))
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         self._entry_row(session, index_key, folder_tag, position, op['entry']))
+        elif kind == 'update_entry':
+            row = conn.execute("SELECT folder_tag, position FROM entries WHERE id = ?", (op['id'],)).fetchone()
+            if row:
+                entry = dict(op['entry'], id=op['id'])
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             self._entry_row(session, index_key, row[0], row[1], entry))
+        elif kind == 'delete_entries':
+            conn.executemany("DELETE FROM entries WHERE id = ?", [(entry_id,) for entry_id in op['ids']])
+        elif kind == 'move_entries':
+            folder_tag = self._insert_folder(conn, session, index_key, op['to'])
+            position = self._next_position(conn, 'entries', "WHERE folder_tag = ?", (folder_tag,))
+            for entry_id in op['ids']:
+                moved = conn.execute("UPDATE entries SET folder_tag = ?, position = ? WHERE id = ? AND folder_tag != ?",
+                                     (folder_tag, position, entry_id, folder_tag))
+                position += moved.rowcount
+        elif kind == 'add_folder':
+            self._insert_folder(conn, session, index_key, op['folder'])
+        elif kind == 'rename_folder':
+            old_tag = self._folder_tag(index_key, op['folder'])
+            conn.execute("DELETE FROM folders WHERE tag = ?", (old_tag,))
+            # โฟลเดอร์ที่เปลี่ยนชื่อย้ายไปท้ายรายการ เหมือนแบบ JSON
+            new_tag = self._insert_folder(conn, session, index_key, op['new_name'])
+            conn.execute("UPDATE entries SET folder_tag = ? WHERE folder_tag = ?", (new_tag, old_tag))
+        elif kind == 'delete_folder':
+            tag = self._folder_tag(index_key, op['folder'])
+            conn.execute("DELETE FROM entries WHERE folder_tag = ?", (tag,))
+            conn.execute("DELETE FROM folders WHERE tag = ?", (tag,))
+        elif kind == 'set':
+            self._set(conn, session, op['key'], op['value'])
+        else:
+            raise ValueError(f"ไม่รองรับ op: {kind}")
+
+    def queue_changes(self, ops: list, session: SessionKey) -> bool:
+        """op ทุกชนิดเขียนลงแถวได้ทันที (ไม่ต้องมี snapshot ก่อนเหมือนแบบ JSON)"""
+        if not ops or session.key_id is None:
+            return False
+        self.writer.queue_ops(session, ops)
+        return True
+
+    def queue_snapshot(self, data: dict, session: SessionKey):
+        """
+        แถวในฐานข้อมูลถูกอัปเดตทีละ op อยู่แล้ว จึงเขียนทั้งก้อนเฉพาะตอนยังไม่มีฐานข้อมูล
+        (บันทึกตอนปิดโปรแกรมจึงไม่ต้องเข้ารหัสทุกแถวซ้ำ)
+        """
+        if not self.exists() or self.writer.has_pending_snapshot():
+            super().queue_snapshot(data, session)
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def replay_journal(self, data: dict, session: SessionKey) -> dict:
+        return data
+
+    # ---------- อ่าน ----------
+
+    def read_snapshot(self, session: SessionKey) -> dict:
+        """
+        ถอดรหัสค่าทั่วไปและชื่อโฟลเดอร์เท่านั้น (ใช้ตอนปลดล็อก) — ทุกโฟลเดอร์เป็น list ว่างจนกว่าจะ load_folder
+        เวลาปลดล็อกจึงไม่ขึ้นกับจำนวน entry ใน vault
+        """
+        with self._db_lock:
+            conn = self._db()
+            data = {key: self._open(session, 'setting', key, nonce, value)
+                    for key, nonce, value in conn.execute("SELECT key, nonce, value FROM settings")}
+            data['folders'] = {name: [] for name in self.list_folders(session)}
+            self._lazy = set(data['folders'])
+        return data
+
+    def load_data(self, session: SessionKey) -> dict:
+        if not self.exists() or session is None:
+            return None
+        try:
+            return self.read_snapshot(session)
+        except Exception:
+            return None
+
+    def lazy_folders(self) -> set:
+        with self._db_lock:
+            return set(self._lazy)
+
+    def load_folder(self, session: SessionKey, folder: str) -> list:
+        """ถอดรหัสเฉพาะแถวของโฟลเดอร์ (ครั้งแรกที่ถูกเลือก หรือหลังถูกพัก) คืนค่า list ของ entry"""
+        # op ที่ค้างอยู่ (เช่นเปลี่ยนชื่อโฟลเดอร์หรือย้ายรายการเข้า) ต้องถูกเขียนก่อน แถวที่อ่านจึงตรงกับข้อมูลล่าสุด
+        self.writer.flush()
+        entries = self.list_entries(session, folder)
+        with self._db_lock:
+            self._lazy.discard(folder)
+        return entries
+
+    def release_folder(self, folder: str):
+        """โฟลเดอร์ถูกพัก: storage ไม่ถือ plaintext ของแถวไว้ จึงแค่ให้ load_folder อ่านจากฐานข้อมูลใหม่"""
+        with self._db_lock:
+            self._lazy.add(folder)
+
+    def list_folders(self, session: SessionKey) -> list:
+        """ชื่อโฟลเดอร์ตามลำดับ (ไม่แตะแถวของ entry)"""
+        with self._db_lock:
+            rows = self._db().execute("SELECT tag, nonce, name FROM folders ORDER BY position").fetchall()
+        return [self._open(session, 'folder', tag.hex(), nonce, name) for tag, nonce, name in rows]
+
+    def count_entries(self, session: SessionKey, folder: str = None) -> int:
+        """จำนวน entry (ทั้งหมด หรือในโฟลเดอร์เดียว) โดยไม่ถอดรหัสแถว"""
+        # แถวต้องรวม op ที่ค้างอยู่แล้ว (เช่นรายการที่เพิ่งย้ายเข้า)
+        self.writer.flush()
+        with self._db_lock:
+            if folder is None:
+                return self._db().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            tag = self._folder_tag(self._index_key(session), folder)
+            return self._db().execute("SELECT COUNT(*) FROM entries WHERE folder_tag = ?", (tag,)).fetchone()[0]
+
+    def list_entries(self, session: SessionKey, folder: str) -> list:
+        """entry ในโฟลเดอร์เดียวตามลำดับ — ถอดรหัสเฉพาะแถวของโฟลเดอร์นั้น"""
+        tag = self._folder_tag(self._index_key(session), folder)
+        with self._db_lock:
+            rows = self._db().execute("SELECT id, nonce, body FROM entries WHERE folder_tag = ? ORDER BY position",
+                                      (tag,)).fetchall()
+        return [self._open(session, 'entry', entry_id, nonce, body) for entry_id, nonce, body in rows]
+
+    # ---------- ลบ ----------
+
+    def delete_all_data(self):
+        """ลบข้อมูลทั้งหมด"""
+        self.writer.flush()
+        self.close()
+        for path in (self.filename, self.filename.with_name(self.filename.name + '-wal'),
+                     self.filename.with_name(self.filename.name + '-shm'), self.keyslot_file):
+            if path.exists():
+                path.unlink()
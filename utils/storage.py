@@ -1,9 +1,22 @@
+import io
+import os
 import json
+import mmap
+import base64
 import hashlib
 from pathlib import Path
-from utils.crypto import CryptoManager
+from utils.crypto import CryptoManager, SessionKey, wipe_bytes
+from utils.kdf import LEGACY_KDF, calibrate, kdf_from_params
+from utils.vault_format import (CIPHER_AES_GCM_STREAM, NONCE_SIZE, is_vault_container,
+                                pack_keyslots, pack_prefix, read_header, read_prefix,
+                                unpack_keyslots, unpack_vault)
+from utils.stream import EncryptedWriter, NONCE_PREFIX_SIZE, SEGMENT_SIZE, decrypt_segments
+from utils.journal import Journal, apply_ops, JOURNAL_ID_SIZE
+from utils.writer import BackgroundWriter
+from utils.serializers import DEFAULT_FORMAT, SERIALIZERS, get_serializer
+from utils.compression import (COMPRESS_THRESHOLD, DEFAULT_COMPRESSION, CompressingWriter,
+                               choose_compression, decompress_bytes)
 import csv
-import win32crypt
 
 try:
     import win32crypt  # pip install pywin32
@@ -11,13 +24,74 @@ try:
 except Exception:
     _HAS_DPAPI = False
 
+# บรรทัดแรกของไฟล์ vault แบบข้อความรุ่นก่อน (Fernet token + header JSON)
+# ไฟล์เก่ากว่านั้นเป็น Fernet token ล้วน — ทั้งสองแบบถูกย้ายเป็นไบนารีเมื่อบันทึกครั้งแรก
+LEGACY_HEADER_PREFIX = b"PMV1 "
+
+# โฟลเดอร์เก็บข้อมูลกำหนดได้ด้วยตัวแปรสภาพแวดล้อมนี้ (ค่าเริ่มต้น ~/.password_manager)
+DATA_DIR_ENV = "PASSWORD_MANAGER_HOME"
+
+# journal จะถูกรวมเป็น snapshot ใหม่ (compaction) เมื่อใหญ่เกินค่านี้หรือเกินครึ่งหนึ่งของ snapshot
+JOURNAL_COMPACT_MIN = 256 * 1024
+
+def _fsync_dir(path: Path):
+    """fsync โฟลเดอร์ให้การ rename คงทน (Windows ไม่รองรับ — ข้าม)"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def default_data_dir() -> Path:
+    """โฟลเดอร์เก็บข้อมูลของโปรแกรม (PASSWORD_MANAGER_HOME ถ้ากำหนดไว้)"""
+    configured = os.environ.get(DATA_DIR_ENV)
+    return Path(configured) if configured else Path.home() / ".password_manager"
+
+def atomic_write(path: Path, write_fn, previous: Path = None):
+    """
+    เขียนไฟล์แบบ atomic: write_fn(f) เขียนลงไฟล์ชั่วคราว -> fsync -> rename ทับของเดิม
+    ถ้าระบุ previous ไฟล์เดิมจะถูกเก็บไว้เป็นรุ่นก่อนหน้า (ใช้กู้คืนถ้าไฟล์ใหม่เสีย)
+    ไฟล์จริงจึงเป็นของเดิมครบหรือของใหม่ครบเสมอ แม้เครื่องดับกลางคัน
+    """
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    if previous is not None and path.exists():
+        os.replace(path, previous)
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
 class DataStorage:
-    """จัดการการเก็บและโหลดข้อมูล"""
+    """จัดการการเก็บและโหลดข้อมูล (vault เป็นไฟล์ payload เดียวที่เข้ารหัสทั้งก้อน + journal)"""
+
+    ENGINE = 'json'
     
-    def __init__(self, filename="secure_data.enc"):
-        self.filename = Path.home() / ".password_manager" / filename
-        self.filename.parent.mkdir(exist_ok=True)
+    def __init__(self, filename="secure_data.enc", root: Path = None):
+        # root: โฟลเดอร์เก็บข้อมูล (None = default_data_dir()) — ใช้โฟลเดอร์ชั่วคราวตอนทดสอบ/วัดประสิทธิภาพได้
+        self.root = Path(root) if root is not None else default_data_dir()
+        self.filename = self.root / filename
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        # snapshot รุ่นก่อนหน้า — ใช้แทนเมื่อไฟล์หลักหายหรือเสีย
+        self.previous_file = self.filename.with_name(self.filename.name + '.prev')
+        self.keyslot_file = self.filename.with_suffix('.mkey.bin')
+        self.journal = Journal(self.filename.with_suffix('.journal'))
         self.salt = self._get_or_create_salt()
+        # header ของ snapshot ที่โหลดล่าสุด (ใช้หา journal_id/journal_seq ตอน replay)
+        self._snapshot_header = {}
+        # รูปแบบ payload ที่ใช้บันทึก (utils/serializers.py) — การโหลดใช้รูปแบบตาม header ของไฟล์
+        format = self.load_metadata().get('format')
+        self.serializer = get_serializer(format if format in SERIALIZERS else DEFAULT_FORMAT)
+        # วิธีบีบอัด payload ที่ใหญ่กว่าเกณฑ์ (None = ไม่บีบอัด)
+        self.compression = DEFAULT_COMPRESSION
+        # การเขียนทั้งหมดจากหน้าต่างหลักผ่าน thread นี้ (รวมการแก้ไขที่ถี่ ๆ เป็นการเขียนครั้งเดียว)
+        self.writer = BackgroundWriter(self)
 
     def export_data_to_csv(self, data: dict, csv_path: Path):
         """
@@ -62,12 +136,14 @@ class DataStorage:
             pass
     
     def save_metadata(self, meta: dict):
-        """บันทึก metadata (ไม่เข้ารหัส) ไฟล์เดียวกับ storage แต่ต่างนามสกุล"""
+        """บันทึก metadata (ไม่เข้ารหัส) ไฟล์เดียวกับ storage แต่ต่างนามสกุล — รวมกับค่าที่มีอยู่เดิม"""
         try:
             meta_file = self.filename.with_suffix('.meta.json')
             meta_file.parent.mkdir(parents=True, exist_ok=True)
+            merged = self.load_metadata()
+            merged.update(meta)
             with open(meta_file, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, ensure_ascii=False, indent=2)
+                json.dump(merged, f, ensure_ascii=False, indent=2)
         except Exception:
             # ไม่ล้มเหลวร้ายแรง — ไม่จำเป็นต้องแจ้งผู้ใช้ที่นี่
             pass
@@ -93,25 +169,371 @@ class DataStorage:
             salt_file.write_bytes(salt)
             return salt
     
-    def save_data(self, data: dict, master_password: str):
-        """บันทึกข้อมูลแบบเข้ารหัส"""
-        json_data = json.dumps(data, ensure_ascii=False)
-        encrypted = CryptoManager.encrypt_data(json_data, master_password, self.salt)
-        self.filename.write_text(encrypted)
+    def preferred_kdf(self):
+        """
+        KDF ที่ calibrate ไว้สำหรับเครื่องนี้ (เก็บใน metadata)
+        ถ้ายังไม่มีหรือใช้ไม่ได้ จะ benchmark ใหม่แล้วบันทึกไว้
+        """
+        meta = self.load_metadata()
+        try:
+            return kdf_from_params(meta['kdf'])
+        except Exception:
+            kdf = calibrate()
+            self.save_metadata({'kdf': kdf.params()})
+            return kdf
+
+    def exists(self) -> bool:
+        """มี vault อยู่แล้วหรือไม่ (รวมรุ่นก่อนหน้าที่ใช้กู้คืนได้)"""
+        return self.filename.exists() or self.previous_file.exists()
+
+    def _vault_candidates(self) -> list:
+        """ไฟล์ snapshot ที่ลองอ่านตามลำดับ: ไฟล์หลัก แล้วรุ่นก่อนหน้า"""
+        return [p for p in (self.filename, self.previous_file) if p.exists()]
+
+    def _current_header(self):
+        """header ของ snapshot แรกที่อ่านได้ คืนค่า (path, header หรือ None ถ้าเป็นไฟล์แบบเก่า)"""
+        for path in self._vault_candidates():
+            try:
+                return path, read_header(path)
+            except Exception:
+                continue
+        return None, None
+
+    def _read_vault(self, path: Path = None):
+        """
+        อ่านไฟล์ vault คืนค่า (header, salt, reader)
+        reader(session) -> bytes คือ plaintext ของ payload
+        """
+        blob = (path or self.filename).read_bytes()
+        if is_vault_container(blob):
+            vault = unpack_vault(blob)
+            reader = lambda session: session.decrypt(vault.nonce, vault.ciphertext, vault.aad)
+            return vault.header, vault.salt, reader
+        if blob.startswith(LEGACY_HEADER_PREFIX):
+            header_line, token = blob.split(b"\n", 1)
+            header = json.loads(header_line[len(LEGACY_HEADER_PREFIX):])
+            reader = lambda session: session.decrypt_legacy(token)
+            return header, base64.b64decode(header['salt']), reader
+        reader = lambda session: session.decrypt_legacy(blob)
+        return {'kdf': LEGACY_KDF.params()}, self.salt, reader
+
+    # ---------- keyslot (envelope encryption) ----------
+
+    @staticmethod
+    def _slot_aad(slot_type: str, key_id: str) -> bytes:
+        return f"pm-keyslot|{slot_type}|{key_id}".encode()
+
+    def _load_keyslots(self) -> dict:
+        if not self.keyslot_file.exists():
+            return {}
+        return unpack_keyslots(self.keyslot_file.read_bytes())
+
+    def _write_password_slot(self, master_password: str, session: SessionKey):
+        """wrap data key ด้วยกุญแจจากรหัสผ่าน (KDF ที่ calibrate แล้ว + salt ใหม่) แทน slot รหัสผ่านเดิม"""
+        kdf = self.preferred_kdf()
+        salt = os.urandom(16)
+        kek = bytearray(kdf.derive(master_password, salt))
+        try:
+            nonce, wrapped = session.wrap_with(bytes(kek), self._slot_aad('password', session.key_id))
+        finally:
+            wipe_bytes(kek)
+        doc = self._load_keyslots()
+        if doc.get('key_id') != session.key_id:
+            doc = {'key_id': session.key_id, 'slots': []}
+        doc['slots'] = [slot for slot in doc.get('slots', []) if slot.get('type') != 'password']
+        doc['slots'].append({
+            'type': 'password',
+            'kdf': kdf.params(),
+            'salt': base64.b64encode(salt).decode(),
+            'nonce': base64.b64encode(nonce).decode(),
+            'wrapped': base64.b64encode(wrapped).decode(),
+        })
+        self._store_keyslots(doc)
+
+    def _store_keyslots(self, doc: dict):
+        atomic_write(self.keyslot_file, lambda f: f.write(pack_keyslots(doc)))
+
+    def _unlock_password_slot(self, master_password: str, key_id: str):
+        """แกะ data key จาก slot รหัสผ่าน คืนค่า SessionKey หรือ None ถ้ารหัสผ่านผิด"""
+        doc = self._load_keyslots()
+        if doc.get('key_id') != key_id:
+            return None
+        for slot in doc.get('slots', []):
+            if slot.get('type') != 'password':
+                continue
+            kdf = kdf_from_params(slot['kdf'])
+            kek = bytearray(kdf.derive(master_password, base64.b64decode(slot['salt'])))
+            try:
+                return CryptoManager.unwrap_data_key(
+                    bytes(kek), base64.b64decode(slot['nonce']), base64.b64decode(slot['wrapped']),
+                    self._slot_aad('password', key_id), key_id)
+            except Exception:
+                return None
+            finally:
+                wipe_bytes(kek)
+        return None
+
+    def _password_slot_kdf(self):
+        for slot in self._load_keyslots().get('slots', []):
+            if slot.get('type') == 'password':
+                return kdf_from_params(slot['kdf'])
+        return None
+
+    # ---------- session ----------
+
+    def create_session(self, master_password: str) -> SessionKey:
+        """
+        เปิด session ของ vault ปัจจุบัน
+        - vault แบบ envelope: แกะ data key จาก keyslot แล้วเทียบค่าตรวจกุญแจใน header
+          รหัสผ่านผิดจะได้ None ทันทีหลัง KDF โดยไม่อ่าน/ถอดรหัส payload
+        - vault แบบเก่า: derive key ด้วย KDF/salt ที่บันทึกไว้ (ไฟล์ Fernet ใช้ PBKDF2 600k + .salt)
+          ตรวจรหัสผ่านได้จากการถอดรหัสทั้งไฟล์เท่านั้น
+        """
+        path, header = self._current_header()
+        if path is None:
+            return self.new_session(master_password)
+        if header and header.get('key_id'):
+            session = self._unlock_password_slot(master_password, header['key_id'])
+            if session and 'kcv' in header and not session.matches_key_check(header['kcv']):
+                session.wipe()
+                return None
+            return session
+        header, salt, _ = self._read_vault(path)
+        return CryptoManager.create_session(master_password, salt, kdf_from_params(header['kdf']))
+
+    def new_session(self, master_password: str) -> SessionKey:
+        """สร้าง data key ใหม่แล้ว wrap ด้วยรหัสผ่านลงไฟล์ keyslot (ตั้งรหัสครั้งแรก/ย้ายจาก vault แบบเก่า)"""
+        session = CryptoManager.generate_data_key(os.urandom(8).hex())
+        self._write_password_slot(master_password, session)
+        return session
+
+    def upgrade_session(self, master_password: str, session: SessionKey) -> SessionKey:
+        """
+        - session จาก vault แบบเก่า: สร้าง data key ใหม่ การบันทึกครั้งถัดไปจะเป็น envelope
+        - slot รหัสผ่านใช้ KDF ต่างจากที่ calibrate ไว้: wrap data key เดิมใหม่ (ไม่แตะ payload)
+        """
+        if session.key_id is None:
+            upgraded = self.new_session(master_password)
+            session.wipe()
+            return upgraded
+        if self._password_slot_kdf() != self.preferred_kdf():
+            self._write_password_slot(master_password, session)
+        return session
+
+    def adopt_session(self, master_password: str, session: SessionKey):
+        """ใช้ data key ของ session ที่เปิดอยู่กับ storage นี้ (ย้ายรูปแบบการจัดเก็บโดยไม่สร้างกุญแจใหม่)"""
+        self._write_password_slot(master_password, session)
+
+    def change_password(self, session: SessionKey, new_password: str):
+        """เปลี่ยนรหัสผ่านหลัก — wrap data key 32 ไบต์ใหม่ ไม่ต้องเข้ารหัส vault ทั้งก้อนซ้ำ"""
+        self._write_password_slot(new_password, session)
+
+    @staticmethod
+    def snapshot_data(data: dict) -> dict:
+        """
+        สำเนาตื้นของข้อมูลสำหรับเขียนใน thread อื่น (คัดลอกแค่ dict/list ไม่คัดลอก entry)
+        ใช้ได้เพราะ entry ถูกแทนที่ทั้งก้อนเมื่อแก้ไข ไม่ถูกแก้ในที่
+        """
+        snapshot = dict(data)
+        snapshot['folders'] = {name: list(entries) for name, entries in data.get('folders', {}).items()}
+        return snapshot
+
+    def save_data(self, data: dict, session: SessionKey):
+        """
+        บันทึก snapshot ทั้งก้อน (เรียกจาก thread ของ writer หรือเรียกตรงเมื่อไม่มีการเขียนค้าง)
+        - payload เข้ารหัสทีละช่วงด้วย data key ผ่าน EncryptedWriter จึงไม่มีสำเนาทั้งก้อนในหน่วยความจำ
+        - payload ที่ใหญ่กว่า COMPRESS_THRESHOLD ถูกบีบอัดก่อนเข้ารหัส (วิธีที่ใช้อยู่ใน header 'compression')
+        - เขียนแบบ atomic (ไฟล์ชั่วคราว + fsync + rename) และเก็บ snapshot เดิมไว้เป็น .prev
+        - journal ถูกตัดเหลือเฉพาะ record ที่ใหม่กว่า snapshot รุ่นก่อนหน้า เพื่อให้ .prev + journal ยังครบ
+        """
+        if session.key_id is None:
+            raise ValueError("ต้องใช้ data key แบบ envelope ในการบันทึก (เรียก upgrade_session ก่อน)")
+        if not self.journal.active:
+            self.journal.start(os.urandom(JOURNAL_ID_SIZE))
+        journal_id = self.journal.journal_id.hex()
+        header, write = self._encode_snapshot(data, session, {
+            'journal_id': journal_id,
+            'journal_seq': self.journal.last_seq,
+        })
+        try:
+            previous_header = read_header(self.filename) if self.filename.exists() else None
+        except Exception:
+            previous_header = None
+        atomic_write(self.filename, write, self.previous_file)
+        self._snapshot_header = header
+        if previous_header and previous_header.get('journal_id') == journal_id:
+            self.journal.trim(previous_header.get('journal_seq', 0))
+
+    def _encode_snapshot(self, data: dict, session: SessionKey, fields: dict):
+        """
+        เตรียม snapshot ในรูปแบบ container ของ vault คืนค่า (header, write) — write(f) เขียนทั้งไฟล์ลง f
+        fields คือค่าเพิ่มเติมใน header (เช่นตำแหน่งใน journal)
+        """
+        header = {
+            'key_id': session.key_id,
+            'kcv': session.key_check_value(),
+            'cipher': CIPHER_AES_GCM_STREAM,
+            'segment': SEGMENT_SIZE,
+            **fields,
+            'format': self.serializer.name,
+        }
+        # ต้องรู้ว่าจะบีบอัดหรือไม่ก่อนเขียน header จึงอ่านล่วงหน้าจนถึงเกณฑ์ (vault เล็กไม่ถูกบีบอัด)
+        chunks = self.serializer.iter_chunks(data)
+        head = []
+        head_size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            head_size += len(chunk)
+            if head_size >= COMPRESS_THRESHOLD:
+                break
+        compression = choose_compression(head_size, self.compression) if self.compression else None
+        if compression:
+            header['compression'] = compression
+        nonce = os.urandom(NONCE_PREFIX_SIZE) + bytes(NONCE_SIZE - NONCE_PREFIX_SIZE)
+        prefix = pack_prefix(header, b"", nonce)
+
+        def write(f):
+            f.write(prefix)
+            writer = EncryptedWriter(f, session, nonce[:NONCE_PREFIX_SIZE], prefix, SEGMENT_SIZE)
+            if compression:
+                writer = CompressingWriter(writer, compression)
+            out = io.BufferedWriter(writer, SEGMENT_SIZE)
+            for chunk in head:
+                out.write(chunk)
+            for chunk in chunks:
+                out.write(chunk)
+            # ปิด writer (เขียนช่วงสุดท้าย) โดยไม่ปิดไฟล์ปลายทาง
+            out.close()
+
+        return header, write
+
+    # ---------- journal / การเขียนเบื้องหลัง ----------
+
+    def append_changes(self, ops: list, session: SessionKey) -> bool:
+        """
+        บันทึกการเปลี่ยนแปลงเป็น record ต่อท้าย journal ทันที (ต้นทุนตามขนาดการเปลี่ยนแปลง ไม่ใช่ขนาด vault)
+        คืนค่า False ถ้ายังไม่มี journal (เช่น vault รูปแบบเก่า) — ผู้เรียกต้อง save_data ทั้งก้อนแทน
+        """
+        if not ops or not self.journal.active or session.key_id is None:
+            return False
+        self.journal.append(session, ops)
+        return True
+
+    def queue_changes(self, ops: list, session: SessionKey) -> bool:
+        """
+        ส่งการเปลี่ยนแปลงให้ writer เบื้องหลัง (รวมกับรายการที่ตามมาติด ๆ เป็น record เดียว)
+        คืนค่า False ถ้ายังไม่มี journal และไม่มี snapshot ค้าง หรือมี op ที่เขียนลง journal ไม่สำเร็จ
+        — ผู้เรียกต้อง queue_snapshot แทน
+        """
+        if not ops or session.key_id is None:
+            return False
+        if not (self.journal.active or self.writer.has_pending_snapshot()):
+            return False
+        if self.writer.snapshot_required:
+            # journal บนดิสก์ขาด op ที่เขียนไม่สำเร็จ — ให้ผู้เรียกเขียน snapshot ทั้งก้อนแทน
+            return False
+        self.writer.queue_ops(session, ops)
+        return True
+
+    def queue_snapshot(self, data: dict, session: SessionKey):
+        """ส่ง snapshot (จาก snapshot_data) ให้ writer เขียนทั้งก้อน — snapshot ใหม่แทนที่รายการค้างเดิม"""
+        self.writer.queue_snapshot(session, data)
+
+    def flush(self, timeout: float = None) -> bool:
+        """เขียนรายการค้างทั้งหมดให้เสร็จ (เรียกก่อนปิดโปรแกรม) คืนค่า False ถ้าเขียนไม่สำเร็จ"""
+        return self.writer.flush(timeout)
+
+    def replay_journal(self, data: dict, session: SessionKey) -> dict:
+        """ใช้ op ใน journal ที่ใหม่กว่า snapshot ที่เพิ่งโหลดกับข้อมูล"""
+        journal_id = self._snapshot_header.get('journal_id')
+        if not journal_id:
+            self.journal.disable()
+            return data
+        ops = self.journal.replay(session, bytes.fromhex(journal_id), self._snapshot_header.get('journal_seq', 0))
+        apply_ops(data, ops)
+        return data
+
+    def lazy_folders(self) -> set:
+        """โฟลเดอร์ที่ยังไม่ได้ถอดรหัสหลัง read_snapshot (แบบนี้ถอดรหัสทั้งหมดตั้งแต่แรก)"""
+        return set()
+
+    def release_folder(self, folder: str):
+        """ทิ้ง plaintext ของโฟลเดอร์ที่ storage ถือไว้ (แบบนี้ไม่ถือไว้หลังโหลด)"""
+
+    def count_entries(self, session: SessionKey, folder: str) -> int:
+        """จำนวน entry ของโฟลเดอร์ที่ยังไม่ได้โหลดโดยไม่ถอดรหัส (None = ไม่รู้ แบบนี้ไม่มีโฟลเดอร์ที่ยังไม่ได้โหลด)"""
+        return None
+
+    def needs_compaction(self) -> bool:
+        if self.writer.snapshot_required:
+            return True
+        try:
+            snapshot_size = self.filename.stat().st_size
+        except OSError:
+            snapshot_size = 0
+        return self.journal.size() > max(JOURNAL_COMPACT_MIN, snapshot_size // 2)
     
-    def load_data(self, master_password: str) -> dict:
-        """โหลดข้อมูลและถอดรหัส"""
-        if not self.filename.exists():
+    def load_data(self, session: SessionKey) -> dict:
+        """โหลดข้อมูลและถอดรหัสด้วย session key (รองรับไฟล์ Fernet แบบเก่า)"""
+        if not self.exists() or session is None:
             return None
         
         try:
-            encrypted = self.filename.read_text()
-            decrypted = CryptoManager.decrypt_data(encrypted, master_password, self.salt)
-            return json.loads(decrypted)
+            return self.replay_journal(self.read_snapshot(session), session)
         except:
             return None
+
+    def read_snapshot(self, session: SessionKey) -> dict:
+        """ถอดรหัสและ parse snapshot จากไฟล์หลัก ถ้าเสีย/หายให้ใช้รุ่นก่อนหน้า (.prev)"""
+        error = None
+        for path in self._vault_candidates():
+            try:
+                payload = self.read_payload(session, path)
+                return self.parse_payload(payload, self._snapshot_header.get('format'))
+            except Exception as e:
+                error = e
+        raise error or FileNotFoundError(self.filename)
+
+    def read_payload(self, session: SessionKey, path: Path = None):
+        """
+        ถอดรหัส payload ของ vault ทั้งก้อน (ยังไม่ parse) คืนค่า bytes-like
+        - vault แบบ stream: map ไฟล์ด้วย mmap แล้วถอดรหัสแต่ละช่วงจาก memoryview ลง buffer เดียว
+          หน่วยความจำสูงสุดจึงใกล้ขนาด plaintext (ciphertext เป็นหน้าไฟล์ที่ OS จัดการ ไม่ถูกคัดลอก)
+        - payload ที่บีบอัดไว้ถูกคลายจาก buffer นั้นตรง ๆ แล้วทิ้ง buffer ทันที
+        - ไฟล์รูปแบบเก่าถอดรหัสทั้งก้อนแบบเดิม
+        """
+        path = path or self.filename
+        with open(path, 'rb') as f:
+            prefix = read_prefix(f)
+            self._snapshot_header = prefix.header if prefix else {}
+            if prefix and prefix.header.get('cipher') == CIPHER_AES_GCM_STREAM:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                    return self._decrypt_payload(prefix, view[len(prefix.aad):], session)
+        _, _, reader = self._read_vault(path)
+        return reader(session)
+
+    @staticmethod
+    def _decrypt_payload(prefix, sealed, session: SessionKey):
+        """ถอดรหัส (และคลายการบีบอัด) ส่วน ciphertext ของ snapshot แบบ stream จาก buffer"""
+        payload = decrypt_segments(sealed, session, prefix.nonce[:NONCE_PREFIX_SIZE], prefix.aad,
+                                   prefix.header.get('segment', SEGMENT_SIZE))
+        if prefix.header.get('compression'):
+            payload = decompress_bytes(payload, prefix.header['compression'])
+        return payload
+
+    @staticmethod
+    def parse_payload(payload, format: str = None) -> dict:
+        """parse payload ที่ได้จาก read_payload (format ตาม header ของไฟล์ ไม่มี = JSON)"""
+        return get_serializer(format).loads(payload)
     
     def delete_all_data(self):
         """ลบข้อมูลทั้งหมด"""
+        # ให้การเขียนที่ค้างอยู่จบก่อน ไม่งั้นจะสร้างไฟล์กลับขึ้นมาหลังลบ
+        self.writer.flush()
         if self.filename.exists():
-            self.filename.unlink()
\ No newline at end of file
+            self.filename.unlink()
+        if self.previous_file.exists():
+            self.previous_file.unlink()
+        if self.keyslot_file.exists():
+            self.keyslot_file.unlink()
+        self.journal.delete()
\ No newline at end of file
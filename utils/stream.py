@@ -0,0 +1,86 @@
+import io
+import struct
+
+# การเข้ารหัสแบบแบ่งช่วง (segment) ตามแนว STREAM:
+#   nonce ของแต่ละช่วง = nonce_prefix(7) | ลำดับช่วง(4, big-endian) | ธงช่วงสุดท้าย(1)
+# ทุกช่วงยืนยันความถูกต้องด้วย AES-GCM แยกกัน สลับลำดับ/ตัดช่วงท้าย/ต่อท้ายข้อมูลจะถอดรหัสไม่ผ่าน
+# ใช้หน่วยความจำคงที่ประมาณหนึ่งช่วงไม่ว่า vault จะใหญ่แค่ไหน
+SEGMENT_SIZE = 64 * 1024
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+MAX_SEGMENTS = 2 ** 32 - 1
+
+class StreamIntegrityError(ValueError):
+    """ข้อมูลที่เข้ารหัสแบบ stream ถูกแก้ไข สลับลำดับ หรือถูกตัดทอน"""
+
+def _segment_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    if counter > MAX_SEGMENTS:
+        raise StreamIntegrityError("จำนวนช่วงเกินขีดจำกัด")
+    return prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+class EncryptedWriter(io.RawIOBase):
+    """
+    file-like สำหรับเขียน plaintext แล้วเข้ารหัสลง fileobj ทีละช่วง
+    ต้องเรียก close() เพื่อเขียนช่วงสุดท้าย (ที่มีธง last)
+    """
+
+    def __init__(self, fileobj, session, nonce_prefix: bytes, aad: bytes, segment_size: int = SEGMENT_SIZE):
+        super().__init__()
+        if len(nonce_prefix) != NONCE_PREFIX_SIZE:
+            raise ValueError("nonce_prefix ต้องยาว 7 ไบต์")
+        self._out = fileobj
+        self._session = session
+        self._prefix = nonce_prefix
+        self._aad = aad
+        self._segment_size = segment_size
+        self._buffer = bytearray()
+        self._counter = 0
+
+    def writable(self):
+        return True
+
+    def _emit(self, chunk, last: bool):
+        nonce = _segment_nonce(self._prefix, self._counter, last)
+        _, ciphertext = self._session.encrypt(bytes(chunk), self._aad, nonce)
+        self._out.write(ciphertext)
+        self._counter += 1
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError("เขียนลง stream ที่ปิดแล้ว")
+        self._buffer += b
+        # เก็บช่วงสุดท้ายไว้เสมอ เพราะยังไม่รู้ว่าเป็นช่วงสุดท้ายหรือไม่จนกว่าจะ close()
+        while len(self._buffer) > self._segment_size:
+            self._emit(self._buffer[:self._segment_size], last=False)
+            del self._buffer[:self._segment_size]
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._emit(self._buffer, last=True)
+                self._buffer = bytearray()
+            finally:
+                super().close()
+
+def decrypt_segments(sealed, session, nonce_prefix: bytes, aad: bytes, segment_size: int = SEGMENT_SIZE) -> bytearray:
+    """
+    ถอดรหัสข้อมูลจาก EncryptedWriter ทั้งก้อนจาก buffer (เช่น memoryview ของ mmap) ลง bytearray เดียว
+    อ่านแต่ละช่วงเป็น slice ของ buffer เดิมและถอดรหัสลงตำแหน่งของมันตรง ๆ — ไม่มีสำเนา ciphertext หรือ bytes ต่อช่วง
+    """
+    sealed_size = segment_size + TAG_SIZE
+    with memoryview(sealed) as view:
+        count = max(1, -(-len(view) // sealed_size))
+        if len(view) - (count - 1) * sealed_size < TAG_SIZE:
+            raise StreamIntegrityError("ข้อมูลถูกตัดทอน (ไม่พบช่วงสุดท้าย)")
+        plain = bytearray(len(view) - count * TAG_SIZE)
+        with memoryview(plain) as out:
+            for counter in range(count):
+                chunk = view[counter * sealed_size:(counter + 1) * sealed_size]
+                start = counter * segment_size
+                nonce = _segment_nonce(nonce_prefix, counter, counter == count - 1)
+                try:
+                    session.decrypt_into(nonce, chunk, aad, out[start:start + len(chunk) - TAG_SIZE])
+                except Exception:
+                    raise StreamIntegrityError(f"ช่วงที่ {counter} ไม่ผ่านการตรวจสอบ")
+    return plain
@@ -0,0 +1,134 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+try:
+    from pythainlp.tokenize import word_tokenize as _word_tokenize  # pip install pythainlp
+except ImportError:
+    _word_tokenize = None
+
+# ข้อความไทยที่แสดงผลเหมือนกันพิมพ์ได้หลายแบบ (ลำดับสระ/วรรณยุกต์, ํ + า แทน ำ, เ + เ แทน แ)
+# normalize_thai ทำให้เป็นรูปเดียวกันก่อนสร้างคีย์ค้นหาและก่อนค้นหา — ผลตรงกันไม่ว่าพิมพ์แบบใด
+# word_spans ตัดคำ (คั่นด้วยช่องว่าง และตัดคำไทยด้วยพจนานุกรม) ใช้ให้คะแนนคำค้นที่ตรงกับต้นคำ
+
+_TONES = '\u0e48-\u0e4b'                 # ่ ้ ๊ ๋
+_VOWEL_MARKS = '\u0e31\u0e34-\u0e3a\u0e47'  # ั ิ ี ึ ื ุ ู ฺ ็
+_THAI = re.compile('[\u0e01-\u0e5b]')
+_THAI_RUN = re.compile('[\u0e01-\u0e4e]+')
+_TOKEN = re.compile(r'\S+')
+
+# (รูปแบบ, แทนด้วย) ตามลำดับ
+_FIXES = (
+    # วรรณยุกต์พิมพ์ก่อนสระบน/ล่าง: กี่ พิมพ์เป็น ก + ่ + ี
+    (re.compile(f'([{_TONES}]+)([{_VOWEL_MARKS}]+)'), r'\2\1'),
+    # ํ + า (มีวรรณยุกต์คั่นได้) -> ำ: น้ำ พิมพ์เป็น น + ้ + ํ + า หรือ น + ํ + ้ + า
+    (re.compile(f'\u0e4d([{_TONES}]?)\u0e32'), '\\1\u0e33'),
+    # เครื่องหมายซ้ำติดกัน (แสดงผลซ้อนทับจนมองไม่เห็น)
+    (re.compile(f'([{_VOWEL_MARKS}\u0e47-\u0e4e])\\1+'), r'\1'),
+    # เ + เ -> แ
+    (re.compile('\u0e40\u0e40'), '\u0e41'),
+)
+
+# ตัดคำไม่ได้ก่อนตัวอักษรเหล่านี้ (สระหลัง/บน/ล่าง วรรณยุกต์ การันต์) และหลังสระหน้า
+_FOLLOWING = frozenset('\u0e30\u0e31\u0e32\u0e33\u0e34\u0e35\u0e36\u0e37\u0e38\u0e39\u0e3a\u0e45'
+                       '\u0e47\u0e48\u0e49\u0e4a\u0e4b\u0e4c\u0e4d\u0e4e')
+_LEADING = frozenset('\u0e40\u0e41\u0e42\u0e43\u0e44')
+
+# พจนานุกรมสำรองเมื่อไม่มี pythainlp: คำที่พบบ่อยในชื่อรายการ/หมายเหตุของ vault (รูปที่ normalize แล้ว)
+THAI_WORDS = frozenset("""
+บัญชี ธนาคาร รหัส ผ่าน รหัสผ่าน ผู้ใช้ ใช้ ชื่อ อีเมล เมล ระบบ เข้าสู่ระบบ เข้า สู่ ออก เว็บ เว็บไซต์ ไซต์ แอป แอพ
+งาน ที่ทำงาน ทำงาน ส่วนตัว ส่วน ตัว บ้าน ครอบครัว บริษัท ร้าน ร้านค้า ค้า ออนไลน์ เกม มือถือ โทรศัพท์ เบอร์
+ไฟฟ้า ประปา น้ำ ไฟ อินเทอร์เน็ต เน็ต บัตร เครดิต เดบิต ประกัน สังคม ภาษี สรรพากร รัฐ กรม กระทรวง
+มหาวิทยาลัย โรงเรียน โรงพยาบาล ห้อง สมาชิก ลูกค้า ทดสอบ สำรอง หลัก ใหม่ เก่า ทั่วไป ข้อมูล สำคัญ
+การ เงิน การเงิน ลงทุน หุ้น กองทุน ประกันภัย ประกันชีวิต ชีวิต รถ ยนต์ รถยนต์ ที่ อยู่ ที่อยู่ หมายเหตุ
+วันเกิด วัน เกิด คำถาม คำตอบ ความ ลับ ความลับ ปลอดภัย กสิกร กสิกรไทย ไทย กรุงเทพ กรุงไทย กรุงศรี
+ออมสิน ไทยพาณิชย์ พาณิชย์ ทหารไทย ธนชาต ยูโอบี เกียรตินาคิน อาคารสงเคราะห์ เพย์ พร้อมเพย์ ทรู ดีแทค
+เอไอเอส ช้อปปี้ ลาซาด้า ไลน์ เฟซบุ๊ก เฟสบุ๊ค กูเกิล ยูทูบ ทวิตเตอร์ อินสตาแกรม เน็ตฟลิกซ์ แกร็บ
+ไปรษณีย์ ขนส่ง เดินทาง ตั๋ว เครื่องบิน โรงแรม จอง สั่ง ซื้อ ขาย อาหาร กาแฟ ผู้ดูแล แอดมิน เซิร์ฟเวอร์
+เครือข่าย ไวไฟ เราเตอร์ คอมพิวเตอร์ โน้ตบุ๊ก ทีวี กล้อง วงจรปิด ประตู กุญแจ ตู้ เซฟ พิน ยืนยัน ตัวตน
+บัตรประชาชน ประชาชน ใบขับขี่ หนังสือเดินทาง พาสปอร์ต เก็บ ของ และ หรือ สำหรับ
+""".split())
+_LENGTHS = sorted({len(word) for word in THAI_WORDS}, reverse=True)
+
+def normalize_thai(text: str) -> str:
+    """NFC แล้วจัดรูปอักษรไทยที่พิมพ์ได้หลายแบบให้เป็นรูปเดียว (ข้อความที่ไม่มีอักษรไทยผ่าน NFC อย่างเดียว)"""
+    text = unicodedata.normalize('NFC', text)
+    if _THAI.search(text) is None:
+        return text
+    for pattern, replacement in _FIXES:
+        text = pattern.sub(replacement, text)
+    return text
+
+def _maximal_matching(text: str) -> tuple:
+    """
+    ตัดคำด้วย THAI_WORDS แบบ maximal matching: ตัวอักษรที่ไม่อยู่ในพจนานุกรมน้อยที่สุด แล้วจำนวนคำน้อยที่สุด
+    ส่วนที่ไม่รู้จักติดกันรวมเป็นคำเดียว และไม่ตัดกลางพยางค์ (ก่อนสระหลัง/วรรณยุกต์ หรือหลังสระหน้า)
+    """
+    n = len(text)
+    cuttable = [i == 0 or i == n or (text[i] not in _FOLLOWING and text[i - 1] not in _LEADING)
+                for i in range(n + 1)]
+    # best[i] = (ตัวอักษรที่ไม่รู้จัก, จำนวนคำ, ตำแหน่งก่อนหน้า, รู้จักหรือไม่) ของการตัด text[:i]
+    best = [None] * (n + 1)
+    best[0] = (0, 0, 0, True)
+    for i in range(n):
+        if best[i] is None or not cuttable[i]:
+            continue
+        unknown, count = best[i][0], best[i][1]
+        steps = [(i + length, True) for length in _LENGTHS
+                 if i + length <= n and cuttable[i + length] and text[i:i + length] in THAI_WORDS]
+        end = i + 1
+        while not cuttable[end]:
+            end += 1
+        steps.append((end, False))
+        for end, known in steps:
+            candidate = (unknown + (0 if known else end - i), count + 1, i, known)
+            if best[end] is None or candidate[:2] < best[end][:2]:
+                best[end] = candidate
+    words = []
+    end = n
+    merge = False
+    while end > 0:
+        _, _, start, known = best[end]
+        if not known and merge:
+            words[-1] = text[start:end] + words[-1]
+        else:
+            words.append(text[start:end])
+        merge = not known
+        end = start
+    return tuple(reversed(words))
+
+@lru_cache(maxsize=8192)
+def segment(run: str) -> tuple:
+    """ตัดคำข้อความไทยที่ไม่มีช่องว่าง (ใช้ pythainlp ถ้ามี ไม่มีก็ใช้ THAI_WORDS)"""
+    if _word_tokenize is not None:
+        try:
+            words = tuple(word for word in _word_tokenize(run, keep_whitespace=False) if word)
+            if ''.join(words) == run:
+                return words
+        except Exception:
+            pass
+    return _maximal_matching(run)
+
+def word_spans(text: str) -> list:
+    """(ต้น, ท้าย) ของแต่ละคำ: คั่นด้วยช่องว่าง และช่วงอักษรไทยในแต่ละคำถูกตัดคำด้วยพจนานุกรม"""
+    spans = []
+    for token in _TOKEN.finditer(text):
+        start, end = token.span()
+        if _THAI.search(text, start, end) is None:
+            spans.append((start, end))
+            continue
+        position = start
+        for run in _THAI_RUN.finditer(text, start, end):
+            if run.start() > position:
+                spans.append((position, run.start()))
+            offset = run.start()
+            for word in segment(run.group()):
+                spans.append((offset, offset + len(word)))
+                offset += len(word)
+            position = run.end()
+        if position < end:
+            spans.append((position, end))
+    return spans
+
+def split_words(text: str) -> list:
+    return [text[start:end] for start, end in word_spans(text)]
@@ -0,0 +1,112 @@
+import json
+import struct
+from collections import namedtuple
+
+# โครงสร้างไฟล์ vault แบบไบนารี:
+#   MAGIC(4) | version(1) | header_len(2, big-endian) | header (JSON) |
+#   salt_len(1) | salt | nonce(12) | ciphertext (AES-256-GCM, มี tag 16 ไบต์ท้าย)
+# ทุกไบต์ก่อน ciphertext ถูกใช้เป็น associated data จึงแก้ header โดยไม่ถูกจับไม่ได้
+#
+# version 1: กุญแจ payload derive จากรหัสผ่านโดยตรง (header มี kdf, salt อยู่ในไฟล์)
+# version 2: envelope — payload เข้ารหัสด้วย data key สุ่ม (header มี key_id, salt ว่าง)
+#            data key ถูก wrap ด้วยกุญแจจากรหัสผ่านเก็บในไฟล์ keyslot (.mkey.bin)
+# version 3: เหมือน 2 แต่ payload เข้ารหัสแบบแบ่งช่วง (utils/stream.py) อ่าน/เขียนได้โดยไม่โหลดทั้งไฟล์
+#            nonce_prefix ของ stream คือ 7 ไบต์แรกของ nonce ใน header
+MAGIC = b"PMVT"
+FORMAT_VERSION = 3
+SUPPORTED_VERSIONS = (1, 2, 3)
+NONCE_SIZE = 12
+CIPHER_AES_GCM = "aes-256-gcm"
+CIPHER_AES_GCM_STREAM = "aes-256-gcm-stream"
+
+_PREFIX = struct.Struct(">4sBH")
+
+# ไฟล์ keyslot: KEYSLOT_MAGIC | JSON {'key_id': ..., 'slots': [...]}
+# แต่ละ slot wrap data key ตัวเดียวกันด้วยวิธีปลดล็อกคนละแบบ (ตอนนี้มีแค่ 'password')
+KEYSLOT_MAGIC = b"PMKS"
+
+VaultBlob = namedtuple("VaultBlob", "version header salt nonce ciphertext aad")
+VaultPrefix = namedtuple("VaultPrefix", "version header salt nonce aad")
+
+class VaultFormatError(ValueError):
+    """ไฟล์ไม่ใช่ vault แบบไบนารี หรือโครงสร้างเสียหาย"""
+
+def is_vault_container(blob: bytes) -> bool:
+    return blob[:len(MAGIC)] == MAGIC
+
+def pack_prefix(header: dict, salt: bytes, nonce: bytes, version: int = FORMAT_VERSION) -> bytes:
+    """สร้างส่วนหัวทั้งหมดก่อน ciphertext (ใช้เป็น associated data ด้วย)"""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    if len(salt) > 255 or len(nonce) != NONCE_SIZE:
+        raise VaultFormatError("salt หรือ nonce มีขนาดไม่ถูกต้อง")
+    return (_PREFIX.pack(MAGIC, version, len(header_bytes)) + header_bytes
+            + bytes([len(salt)]) + salt + nonce)
+
+def read_prefix(fileobj) -> VaultPrefix:
+    """
+    อ่านส่วนหัวจาก file object จนถึงต้น ciphertext (ตำแหน่งไฟล์จะอยู่ที่ ciphertext พอดี)
+    คืนค่า None ถ้าไม่ใช่ไฟล์แบบไบนารี
+    """
+    raw = fileobj.read(_PREFIX.size)
+    if len(raw) < _PREFIX.size or raw[:len(MAGIC)] != MAGIC:
+        return None
+    _, version, header_len = _PREFIX.unpack(raw)
+    if version not in SUPPORTED_VERSIONS:
+        raise VaultFormatError(f"ไม่รองรับ vault เวอร์ชัน {version}")
+    try:
+        header_bytes = fileobj.read(header_len)
+        header = json.loads(header_bytes)
+        salt_len_byte = fileobj.read(1)
+        salt = fileobj.read(salt_len_byte[0])
+        nonce = fileobj.read(NONCE_SIZE)
+    except Exception as e:
+        raise VaultFormatError(f"header ของ vault เสียหาย: {e}")
+    if len(nonce) != NONCE_SIZE:
+        raise VaultFormatError("ไฟล์ vault ถูกตัดทอน")
+    return VaultPrefix(version, header, salt, nonce, raw + header_bytes + salt_len_byte + salt + nonce)
+
+def read_header(path) -> dict:
+    """
+    อ่านเฉพาะ header ของไฟล์ vault แบบไบนารี (ไม่อ่าน payload)
+    คืนค่า None ถ้าไม่ใช่ไฟล์แบบไบนารี
+    """
+    with open(path, 'rb') as f:
+        prefix = read_prefix(f)
+    return prefix.header if prefix else None
+
+def unpack_vault(blob: bytes) -> VaultBlob:
+    """แยกไฟล์ vault เป็นส่วนต่าง ๆ (VaultFormatError ถ้าไม่ถูกต้อง)"""
+    try:
+        magic, version, header_len = _PREFIX.unpack_from(blob, 0)
+        if magic != MAGIC:
+            raise VaultFormatError("ไม่ใช่ไฟล์ vault")
+        if version not in SUPPORTED_VERSIONS:
+            raise VaultFormatError(f"ไม่รองรับ vault เวอร์ชัน {version}")
+        pos = _PREFIX.size
+        header = json.loads(bytes(blob[pos:pos + header_len]))
+        pos += header_len
+        salt_len = blob[pos]
+        pos += 1
+        salt = bytes(blob[pos:pos + salt_len])
+        pos += salt_len
+        nonce = bytes(blob[pos:pos + NONCE_SIZE])
+        pos += NONCE_SIZE
+        if len(nonce) != NONCE_SIZE:
+            raise VaultFormatError("ไฟล์ vault ถูกตัดทอน")
+    except VaultFormatError:
+        raise
+    except Exception as e:
+        raise VaultFormatError(f"โครงสร้าง vault เสียหาย: {e}")
+    return VaultBlob(version, header, salt, nonce, blob[pos:], bytes(blob[:pos]))
+
+def pack_keyslots(doc: dict) -> bytes:
+    return KEYSLOT_MAGIC + json.dumps(doc, separators=(",", ":")).encode()
+
+def unpack_keyslots(blob: bytes) -> dict:
+    """อ่านไฟล์ keyslot (VaultFormatError ถ้าไม่ถูกต้อง)"""
+    if blob[:len(KEYSLOT_MAGIC)] != KEYSLOT_MAGIC:
+        raise VaultFormatError("ไม่ใช่ไฟล์ keyslot")
+    try:
+        return json.loads(blob[len(KEYSLOT_MAGIC):])
+    except Exception as e:
+        raise VaultFormatError(f"ไฟล์ keyslot เสียหาย: {e}")
\ No newline at end of file
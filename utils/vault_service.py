@@ -0,0 +1,737 @@
+import platform
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from utils.compression import choose_compression
+from utils.crypto import CryptoManager
+from utils.engines import STORAGE_ENGINES, create_storage, open_storage
+from utils.entries import EntryIndex, ensure_entry_ids, new_entry_id
+from utils.folder_cache import FolderCache
+from utils.search_index import RANK_LIMIT, SearchIndex
+from utils.telegram import TelegramNotifier
+
+# ใส่รหัสผ่านผิดติดกันครบจำนวนนี้ ข้อมูลทั้งหมดจะถูกลบ
+MAX_LOGIN_ATTEMPTS = 3
+# โฟลเดอร์ของ vault ใหม่ และโฟลเดอร์ของรายการที่นำเข้าโดยไม่ระบุโฟลเดอร์
+DEFAULT_FOLDER = "ทั่วไป"
+IMPORT_FOLDER = "Imported"
+
+class _Transaction:
+    """
+    transaction ที่เปิดอยู่: op ที่รอบันทึกตอน commit และสถานะก่อนเริ่มสำหรับ rollback
+    สำเนาข้อมูลเป็นแบบตื้น (dict/list เท่านั้น) ใช้ได้เพราะ entry ถูกแทนที่ทั้งก้อนเมื่อแก้ไข ไม่ถูกแก้ในที่
+    """
+
+    def __init__(self, vault, keep):
+        self.keep = set(keep)
+        self.ops = []
+        # มี op ที่บันทึกเป็น journal ไม่ได้ (ต้องเขียน snapshot ทั้งก้อนตอน commit)
+        self.full = False
+        self.snapshot = vault.storage.snapshot_data(vault.data)
+        self.lazy = set(vault.lazy_folders)
+        # โฟลเดอร์ที่ถูกถอดรหัสระหว่าง transaction -> entry ตอนโหลด (ก่อนถูกแก้)
+        self.loaded = {}
+
+class VaultService:
+    """
+    แกนของโปรแกรมที่ไม่ขึ้นกับ Qt: ถือข้อมูล, index, cache และ storage ของ vault
+    ทุกการแก้ไขต้องผ่านเมธอดของคลาสนี้ (อัปเดต index/cache แล้วส่ง op ให้ storage บันทึกเบื้องหลัง)
+    ข้อผิดพลาดที่ผู้ใช้ควรเห็นเป็น ValueError พร้อมข้อความภาษาไทย — หน้าต่างหลักมีหน้าที่แค่ถาม/แสดงผล
+    ไม่ thread-safe: ให้เรียกจาก thread เดียว (การเขียนไฟล์อยู่ใน thread ของ storage อยู่แล้ว)
+    """
+
+    def __init__(self, storage=None):
+        # storage: backend ที่จะใช้ (ดู utils/engines.py) — ไม่ระบุ = ตามการตั้งค่า (ปกติคือไฟล์ในโฟลเดอร์ข้อมูล)
+        self.storage = storage if storage is not None else create_storage()
+        self.master_password = None
+        self.session = None
+        # index id -> (โฟลเดอร์, entry) — การแก้ไข entry/โฟลเดอร์ทั้งหมดต้องผ่าน index นี้
+        self.entry_index = None
+        # โฟลเดอร์ที่ storage ยังไม่ได้ถอดรหัส (vault แบบแบ่ง shard) — ถอดรหัสเมื่อถูกใช้ครั้งแรก
+        self.lazy_folders = set()
+        # โหมดประหยัดหน่วยความจำ (None = ปิด) — เก็บ plaintext เฉพาะโฟลเดอร์ที่ใช้ล่าสุด
+        self.folder_cache = None
+        self.data = {
+            'master_hash': None,
+            'telegram_bot': '',
+            'telegram_chat': '',
+            'folders': {},
+            'login_attempts': 0
+        }
+        self._ids_migrated = False
+        self._tx = None
+
+    @property
+    def is_unlocked(self) -> bool:
+        return self.session is not None and self.session.is_active
+
+    # ---------- ตั้งรหัสครั้งแรก / ปลดล็อก / ใส่รหัสผิด ----------
+
+    def has_vault(self) -> bool:
+        return self.storage.exists()
+
+    def load_public_settings(self):
+        """อ่านค่าที่ไม่เข้ารหัส (Telegram) จาก metadata — ใช้แจ้งเตือนเมื่อใส่รหัสผิดก่อนปลดล็อก"""
+        try:
+            meta = self.storage.load_metadata()
+            if meta:
+                self.data['telegram_bot'] = meta.get('telegram_bot', '')
+                self.data['telegram_chat'] = meta.get('telegram_chat', '')
+        except Exception:
+            pass
+
+    def create_vault(self, master_password: str):
+        """สร้าง vault ใหม่ด้วยรหัสผ่านหลัก (มีโฟลเดอร์เริ่มต้นหนึ่งโฟลเดอร์)"""
+        self.master_password = master_password
+        self.session = self.storage.new_session(master_password)
+        self.data['master_hash'] = CryptoManager.hash_password(master_password)
+        self.data['folders'] = {DEFAULT_FOLDER: []}
+        self.entry_index = EntryIndex(self.data, SearchIndex())
+        self.save()
+
+    @staticmethod
+    def prepare_data(data: dict):
+        """
+        เตรียมข้อมูลหลังปลดล็อก (รันใน worker thread ได้): ใส่ id ให้ entry ของ vault รุ่นก่อน แล้วสร้าง index (รวม index ค้นหา)
+        คืนค่า (EntryIndex, มีการใส่ id ใหม่หรือไม่)
+        """
+        migrated = ensure_entry_ids(data)
+        return EntryIndex(data, SearchIndex()), migrated
+
+    def unlock(self, master_password: str) -> bool:
+        """
+        ปลดล็อกแบบ synchronous (สคริปต์/ทดสอบ) แล้วบันทึกการย้ายรูปแบบทันที
+        หน้าต่างหลักทำขั้นตอนเดียวกันใน UnlockWorker แล้วเรียก accept_unlock
+        """
+        session = self.storage.create_session(master_password)
+        if session is None:
+            return False
+        try:
+            data = self.storage.replay_journal(self.storage.read_snapshot(session), session)
+            session = self.storage.upgrade_session(master_password, session)
+        except Exception:
+            session.wipe()
+            return False
+        if not self.accept_unlock(master_password, session, data, self.prepare_data(data)):
+            return False
+        self.save_after_unlock()
+        return True
+
+    def accept_unlock(self, master_password: str, session, data: dict, prepared=None) -> bool:
+        """
+        รับผลการปลดล็อก (session + ข้อมูลที่ parse แล้ว)
+        รหัสผ่านถูกตรวจแล้วตอนสร้าง session (แกะ keyslot + ค่าตรวจกุญแจ หรือ AEAD ของ payload แบบเก่า)
+        ไม่เทียบกับ master_hash ในข้อมูล — ค่านั้นอาจยังไม่ตรงกับ keyslot ถ้าโปรแกรมหยุดระหว่างเปลี่ยนรหัสผ่าน
+        คืนค่า False และล้าง session ถ้าไม่มีข้อมูล — ผู้เรียกต้องเรียก record_failed_login ต่อ
+        """
+        if not data:
+            session.wipe()
+            return False
+        self.master_password = master_password
+        self.session = session
+        self.data = data
+        self.entry_index, self._ids_migrated = prepared if prepared is not None else self.prepare_data(data)
+        self.lazy_folders = self.storage.lazy_folders()
+        self.set_memory_lean(self.storage.load_metadata().get('memory_lean', False))
+        self.data['login_attempts'] = 0
+        return True
+
+    def save_after_unlock(self):
+        """
+        บันทึกหลังปลดล็อก (รีเซ็ตตัวนับ/ย้ายรูปแบบไฟล์) — หน้าต่างหลักเรียกหลังแสดงผลแล้ว
+        vault ที่เพิ่งได้ id ใหม่ต้องบันทึกทั้งก้อน (op ใน journal อ้างอิง id เหล่านี้)
+        """
+        self.save(None if self._ids_migrated else [{'op': 'set', 'key': 'login_attempts', 'value': 0}])
+        self._ids_migrated = False
+
+    def record_failed_login(self) -> bool:
+        """
+        นับการใส่รหัสผิดและแจ้งเตือนทาง Telegram (ถ้าตั้งค่าไว้)
+        ครบ MAX_LOGIN_ATTEMPTS ครั้งจะลบข้อมูลทั้งหมด — คืนค่า True เมื่อถูกลบแล้ว
+        """
+        attempts = self.data.get('login_attempts', 0) + 1
+        self.data['login_attempts'] = attempts
+
+        bot = self.data.get('telegram_bot', '')
+        chat = self.data.get('telegram_chat', '')
+        if bot and chat:
+            msg = f"พยายามเข้าสู่ระบบล้มเหลว \nเวลา: {datetime.now().strftime('%d/%m/%Y %H:%M')}\nเครื่อง: {platform.node()}"
+            try:
+                TelegramNotifier.send_message(bot, chat, msg)
+            except Exception:
+                pass
+
+        if attempts >= MAX_LOGIN_ATTEMPTS:
+            self.delete_everything()
+            return True
+        return False
+
+    def delete_everything(self):
+        """ลบ vault และไฟล์ metadata/key/backup ทุกชนิดที่อาจถูกสร้าง (เงียบเมื่อลบไม่ได้)"""
+        try:
+            self.storage.delete_all_data()
+        except Exception:
+            pass
+        try:
+            filename = self.storage.filename
+            candidates = [
+                filename.with_suffix('.meta'),
+                filename.with_suffix('.meta.json'),
+                filename.with_suffix('.meta.bin'),
+                filename.with_suffix('.mkey.bin'),
+                filename.with_suffix('.backup.enc'),
+                filename.with_suffix('.backup.bin'),
+                # ถ้ามีไฟล์ชื่อ secure_data.meta อยู่โดยตรง ในโฟลเดอร์เดียวกัน ให้ลบทิ้งด้วย
+                Path(filename.parent) / 'secure_data.meta'
+            ]
+            for p in candidates:
+                try:
+                    if p.exists():
+                        p.unlink(missing_ok=True)
+                except Exception:
+                    pass
+        except Exception:
+            # storage ที่ไม่ใช่ไฟล์ (เช่นในหน่วยความจำ) ไม่มีไฟล์ให้ลบ
+            pass
+
+    # ---------- โฟลเดอร์ ----------
+
+    def folder_names(self) -> list:
+        return list(self.data['folders'])
+
+    def entries(self, folder_name: str, keep=()) -> list:
+        """รายการในโฟลเดอร์ (ถอดรหัสก่อนถ้ายังไม่ได้โหลด) — list ที่คืนเป็นของ vault ห้ามแก้โดยตรง"""
+        self.ensure_folder_loaded(folder_name, keep)
+        return self.data['folders'].get(folder_name, [])
+
+    def entry_count(self, folder_name: str) -> int:
+        """
+        จำนวนรายการในโฟลเดอร์โดยไม่ถอดรหัส entry — โฟลเดอร์ที่ยังไม่ได้โหลดหรือถูกพักเป็น list ว่างใน data
+        จึงต้องใช้ตัวนับของ cache หรือของ storage (manifest/ฐานข้อมูล) แทน len()
+        """
+        if folder_name not in self.lazy_folders:
+            return len(self.data['folders'].get(folder_name, ()))
+        if self.folder_cache and self.folder_cache.is_sealed(folder_name):
+            return self.folder_cache.sealed_count(folder_name)
+        count = self.storage.count_entries(self.session, folder_name)
+        return count if count is not None else len(self.entries(folder_name))
+
+    @property
+    def search_index(self):
+        return self.entry_index.search if self.entry_index is not None else None
+
+    def search(self, folder_name: str, term: str, keep=()) -> list:
+        """รายการในโฟลเดอร์ที่ชื่อหรือชื่อผู้ใช้มีคำค้น (ไม่สนตัวพิมพ์เล็ก/ใหญ่) ตามลำดับในโฟลเดอร์"""
+        entries = self.entries(folder_name, keep)
+        if not term:
+            return entries
+        get = self.entry_index.get
+        return [get(entry_id)[1] for entry_id in self.search_index.search(term, folder_name)]
+
+    def find(self, folder_name: str, term: str, cancelled=None):
+        """
+        เหมือน search แต่ไม่โหลดหรือพักโฟลเดอร์ใด ๆ จึงเรียกจาก worker thread ได้
+        (ผู้เรียกต้องโหลดโฟลเดอร์ไว้ก่อนใน GUI thread) — คืนค่า None ถ้า cancelled() เป็นจริงระหว่างทาง
+        """
+        if not term:
+            return list(self.data['folders'].get(folder_name, ()))
+        get = self.entry_index.get
+        results = []
+        for i, entry_id in enumerate(self.search_index.search(term, folder_name)):
+            if cancelled is not None and not i % 4096 and cancelled():
+                return None
+            found = get(entry_id)
+            if found is not None:
+                results.append(found[1])
+        return results
+
+    def search_all(self, term: str, keep=()) -> list:
+        """
+        ค้นหาทุกโฟลเดอร์ที่เคยถอดรหัส คืนค่า [(โฟลเดอร์, entry)]
+        โฟลเดอร์ที่ถูกพักแต่มีผลลัพธ์จะถูกถอดรหัสกลับ (โฟลเดอร์ของ vault แบบ shard ที่ยังไม่เคยเปิดไม่ถูกค้นหา)
+        """
+        if not term:
+            return []
+        return self.resolve(self.search_index.search(term), keep)
+
+    def search_ranked(self, term: str, keep=(), limit: int = RANK_LIMIT) -> list:
+        """
+        ค้นหาแบบจัดอันดับทุกโฟลเดอร์ (ชื่อ > โดเมนของ url > ชื่อผู้ใช้ > หมายเหตุ พิมพ์ผิดได้เล็กน้อย)
+        คืนค่า [(โฟลเดอร์, entry)] ไม่เกิน limit รายการ เรียงจากใกล้เคียงที่สุด
+        โฟลเดอร์ของ vault แบบ shard ที่ยังไม่เคยเปิดจะถูกถอดรหัสก่อน
+        """
+        if not term:
+            return []
+        self.ensure_all_folders_loaded(keep)
+        return self.resolve(self.find_ranked(term, limit), keep)
+
+    def find_ranked(self, term: str, limit: int = RANK_LIMIT) -> list:
+        """
+        id ของผลค้นหาแบบจัดอันดับ (ใช้ index อย่างเดียว จึงเรียกจาก worker thread ได้)
+        ผู้เรียกต้อง ensure_all_folders_loaded ก่อน และใช้ resolve ใน GUI thread เพื่อได้ entry
+        """
+        return self.search_index.rank(term, limit=limit) if term else []
+
+    def resolve(self, entry_ids, keep=()) -> list:
+        """[(โฟลเดอร์, entry)] ตามลำดับ id — โฟลเดอร์ที่ถูกพักจะถูกถอดรหัสกลับ (ข้าม id ที่ถูกลบไปแล้ว)"""
+        results = []
+        for entry_id in entry_ids:
+            found = self.entry_index.get(entry_id)
+            if found is None and entry_id in self.search_index:
+                self.ensure_folder_loaded(self.search_index.folder_of(entry_id), keep)
+                found = self.entry_index.get(entry_id)
+            if found is not None:
+                results.append(found)
+        return results
+
+    def ensure_folder_loaded(self, folder_name: str, keep=()):
+        """
+        ถอดรหัสโฟลเดอร์ที่ยังไม่ได้โหลดหรือถูกพักไว้ (ต้องเรียกก่อนอ่านหรือแก้ไขรายการในโฟลเดอร์นั้น)
+        ในโหมดประหยัดหน่วยความจำ โฟลเดอร์ที่ใช้นานสุดจะถูกพักเมื่อเกินงบประมาณ ยกเว้นโฟลเดอร์ใน keep
+        """
+        cache = self.folder_cache
+        if folder_name in self.lazy_folders:
+            if cache and cache.is_sealed(folder_name):
+                entries = cache.unseal(folder_name)
+            else:
+                entries = self.storage.load_folder(self.session, folder_name)
+            self.entry_index.load_folder(folder_name, entries)
+            self.lazy_folders.discard(folder_name)
+            if self._tx is not None:
+                self._tx.loaded[folder_name] = list(entries)
+        if cache and folder_name in self.data['folders']:
+            if self._tx is not None:
+                # ระหว่าง transaction ไม่พักโฟลเดอร์ใด (ciphertext ใน cache ต้องเป็นข้อมูลก่อนเริ่มเสมอ)
+                keep = self.data['folders']
+            for evicted in cache.access(folder_name, self.data['folders'][folder_name], keep=set(keep)):
+                self.evict_folder(evicted)
+
+    def evict_folder(self, folder_name: str):
+        """พักโฟลเดอร์: เก็บเป็น ciphertext ใน cache แล้วทิ้ง plaintext (ทั้งที่นี่และใน storage)"""
+        self.folder_cache.seal(folder_name, self.data['folders'][folder_name])
+        self.entry_index.unload_folder(folder_name)
+        self.storage.release_folder(folder_name)
+        self.lazy_folders.add(folder_name)
+
+    def ensure_all_folders_loaded(self, keep=()):
+        """
+        ถอดรหัสทุกโฟลเดอร์ที่ storage ยังไม่ได้โหลด (ก่อน export/สำรอง/ย้ายรูปแบบการจัดเก็บ/ค้นหาทุกโฟลเดอร์)
+        โฟลเดอร์ที่ถูกพักใน cache ไม่ถูกนำกลับ — ใช้ full_data() เพื่อได้ข้อมูลครบ
+        """
+        cache = self.folder_cache
+        for folder_name in list(self.lazy_folders):
+            if not (cache and cache.is_sealed(folder_name)):
+                self.ensure_folder_loaded(folder_name, keep)
+
+    def full_data(self) -> dict:
+        """สำเนาข้อมูลครบทุกโฟลเดอร์สำหรับบันทึก/สำรอง (โฟลเดอร์ที่ถูกพักถอดรหัสเฉพาะในสำเนานี้)"""
+        snapshot = self.storage.snapshot_data(self.data)
+        if self.folder_cache:
+            for folder_name in self.folder_cache.sealed_folders():
+                snapshot['folders'][folder_name] = self.folder_cache.peek(folder_name)
+        return snapshot
+
+    def set_memory_lean(self, enabled: bool, keep=()):
+        """เปิด/ปิดโหมดประหยัดหน่วยความจำ (เปิดแล้วพักทุกโฟลเดอร์ที่โหลดอยู่ ยกเว้นใน keep)"""
+        if enabled and self.folder_cache is None:
+            self.folder_cache = FolderCache()
+            for folder_name in list(self.data['folders']):
+                if folder_name not in self.lazy_folders and folder_name not in keep:
+                    self.evict_folder(folder_name)
+            for folder_name in keep:
+                if folder_name in self.data['folders']:
+                    self.ensure_folder_loaded(folder_name, keep)
+        elif not enabled and self.folder_cache is not None:
+            cache, self.folder_cache = self.folder_cache, None
+            for folder_name in cache.sealed_folders():
+                self.entry_index.load_folder(folder_name, cache.unseal(folder_name))
+                self.lazy_folders.discard(folder_name)
+            cache.clear()
+
+    def add_folder(self, folder_name: str):
+        if folder_name in self.data['folders']:
+            raise ValueError("มีโฟลเดอร์นี้อยู่แล้ว")
+        self.entry_index.add_folder(folder_name)
+        self.save([{'op': 'add_folder', 'folder': folder_name}])
+
+    def rename_folder(self, folder_name: str, new_name: str) -> bool:
+        """เปลี่ยนชื่อโฟลเดอร์ คืนค่า False ถ้าชื่อเดิม"""
+        if new_name == folder_name:
+            return False
+        if new_name in self.data['folders']:
+            raise ValueError("มีโฟลเดอร์ชื่อนี้อยู่แล้ว")
+        self._unseal_for_transaction(folder_name)
+        self.entry_index.rename_folder(folder_name, new_name)
+        if folder_name in self.lazy_folders:
+            self.lazy_folders.discard(folder_name)
+            self.lazy_folders.add(new_name)
+        if self.folder_cache:
+            self.folder_cache.rename(folder_name, new_name)
+        self.save([{'op': 'rename_folder', 'folder': folder_name, 'new_name': new_name}])
+        return True
+
+    def delete_folder(self, folder_name: str):
+        if len(self.data['folders']) == 1:
+            raise ValueError("ต้องมีอย่างน้อย 1 โฟลเดอร์")
+        self._unseal_for_transaction(folder_name)
+        self.entry_index.delete_folder(folder_name)
+        self.lazy_folders.discard(folder_name)
+        if self.folder_cache:
+            self.folder_cache.forget(folder_name)
+        self.save([{'op': 'delete_folder', 'folder': folder_name}])
+
+    def delete_folders(self, folder_names) -> list:
+        """ลบหลายโฟลเดอร์ใน transaction เดียว (ต้องเหลืออย่างน้อย 1 โฟลเดอร์) คืนค่าโฟลเดอร์ที่ถูกลบ"""
+        names = [name for name in dict.fromkeys(folder_names) if name in self.data['folders']]
+        if len(names) >= len(self.data['folders']):
+            raise ValueError("ต้องมีอย่างน้อย 1 โฟลเดอร์")
+        with self.transaction():
+            for folder_name in names:
+                self.delete_folder(folder_name)
+        return names
+
+    def move_folder_contents(self, folder_names, target: str, keep=()) -> list:
+        """ย้ายทุกรายการในหลายโฟลเดอร์ไปยังโฟลเดอร์ปลายทางใน transaction เดียว คืนค่ารายการที่ถูกย้าย"""
+        moved = []
+        with self.transaction(keep):
+            for folder_name in folder_names:
+                if folder_name == target or folder_name not in self.data['folders']:
+                    continue
+                ids = [entry['id'] for entry in self.entries(folder_name)]
+                moved.extend(self.move_entries(ids, target))
+        return moved
+
+    # ---------- รายการรหัสผ่าน ----------
+
+    def add_entry(self, folder_name: str, entry: dict) -> dict:
+        """เพิ่มรายการ (ใส่ id ให้ถ้ายังไม่มี) คืนค่า entry ที่ถูกเก็บ"""
+        if folder_name not in self.data['folders']:
+            raise ValueError(f"ไม่พบโฟลเดอร์ '{folder_name}'")
+        self.ensure_folder_loaded(folder_name, {folder_name})
+        if not entry.get('id'):
+            entry = dict(entry, id=new_entry_id())
+        self.entry_index.add(folder_name, entry)
+        self.save([{'op': 'add_entry', 'folder': folder_name, 'entry': entry}])
+        return entry
+
+    def update_entry(self, entry_id: str, entry: dict) -> dict:
+        """แทนที่รายการเดิม (id เดิม) คืนค่า entry ใหม่ หรือ None ถ้าไม่พบ"""
+        if self.entry_index is None or entry_id not in self.entry_index:
+            return None
+        entry = self.entry_index.replace(entry_id, entry)
+        self.save([{'op': 'update_entry', 'id': entry_id, 'entry': entry}])
+        return entry
+
+    def retitle_entries(self, ids, title: str) -> list:
+        """
+        เปลี่ยนชื่อ (title) ของหลายรายการใน transaction เดียว — รายการที่ชื่อเดียวกันแสดงเป็นกลุ่มเดียวกัน
+        คืนค่ารายการที่ถูกแก้ไข
+        """
+        changed = []
+        with self.transaction():
+            for entry_id in ids:
+                found = self.entry_index.get(entry_id)
+                if found is None or found[1].get('title') == title:
+                    continue
+                changed.append(self.update_entry(entry_id, dict(found[1], title=title)))
+        return changed
+
+    def delete_entries(self, ids) -> list:
+        """ลบรายการตาม id คืนค่ารายการที่ถูกลบ"""
+        removed = self.entry_index.remove(ids)
+        if removed:
+            self.save([{'op': 'delete_entries', 'ids': [entry['id'] for entry in removed]}])
+        return removed
+
+    def move_entries(self, ids, folder_name: str, keep=()) -> list:
+        """ย้ายรายการตาม id ไปยังโฟลเดอร์อื่น คืนค่ารายการที่ถูกย้าย"""
+        ids = list(ids)
+        # โฟลเดอร์ต้นทางต้องไม่ถูกพักตอนถอดรหัสโฟลเดอร์ปลายทาง
+        sources = {self.entry_index.folder_of(entry_id) for entry_id in ids if entry_id in self.entry_index}
+        self.ensure_folder_loaded(folder_name, set(keep) | sources | {folder_name})
+        moved = self.entry_index.move(ids, folder_name)
+        if moved:
+            self.save([{'op': 'move_entries', 'ids': [entry['id'] for entry in moved], 'to': folder_name}])
+        return moved
+
+    def import_entries(self, rows) -> tuple:
+        """
+        นำเข้ารายการ (dict ที่มี folder/title/username/password/url/notes) สร้างโฟลเดอร์ที่ยังไม่มีอัตโนมัติ
+        ทำใน transaction เดียว (บันทึกครั้งเดียว) ข้ามแถวที่มีปัญหา คืนค่า (จำนวนที่นำเข้า, โฟลเดอร์ที่สร้างใหม่)
+        """
+        count = 0
+        folders_created = []
+        with self.transaction():
+            for item in rows:
+                try:
+                    folder_name = item.get('folder', '').strip() or IMPORT_FOLDER
+                    entry = {
+                        'id': new_entry_id(),
+                        'title': item.get('title', '').strip(),
+                        'username': item.get('username', '').strip(),
+                        'password': item.get('password', '').strip(),
+                        'url': item.get('url', '').strip(),
+                        'notes': item.get('notes', '').strip()
+                    }
+                except Exception:
+                    # ข้ามรายการที่มีปัญหา
+                    continue
+                if folder_name not in self.data['folders']:
+                    self.add_folder(folder_name)
+                    folders_created.append(folder_name)
+                self.add_entry(folder_name, entry)
+                count += 1
+        return count, folders_created
+
+    # ---------- ตั้งค่า ----------
+
+    def update_settings(self, telegram_bot: str, telegram_chat: str, new_password: str = None,
+                        memory_lean: bool = None, keep=()):
+        """บันทึกค่าตั้งค่าจากหน้าตั้งค่า (Telegram, รหัสผ่านหลักใหม่, โหมดประหยัดหน่วยความจำ)"""
+        self._require_no_transaction()
+        self.data['telegram_bot'] = telegram_bot
+        self.data['telegram_chat'] = telegram_chat
+        ops = [
+            {'op': 'set', 'key': 'telegram_bot', 'value': telegram_bot},
+            {'op': 'set', 'key': 'telegram_chat', 'value': telegram_chat},
+        ]
+        if new_password:
+            self.data['master_hash'] = CryptoManager.hash_password(new_password)
+            ops.append({'op': 'set', 'key': 'master_hash', 'value': self.data['master_hash']})
+        self.save(ops)
+        if new_password:
+            # keyslot ใหม่ถูกเขียนลงดิสก์ทันที — ข้อมูลที่รอเขียนต้องถึงดิสก์ก่อน
+            # โปรแกรมหยุดระหว่างสองขั้นตอนนี้ รหัสผ่านเดิมยังปลดล็อกได้
+            if not self.storage.flush():
+                raise ValueError("บันทึกข้อมูลไม่สำเร็จ รหัสผ่านหลักยังเป็นรหัสเดิม")
+            self.storage.change_password(self.session, new_password)
+            self.master_password = new_password
+        if memory_lean is not None and memory_lean != bool(self.folder_cache):
+            self.set_memory_lean(memory_lean, keep)
+            self.storage.save_metadata({'memory_lean': memory_lean})
+
+    def can_switch_storage(self) -> bool:
+        """ย้ายรูปแบบการจัดเก็บได้เฉพาะ storage แบบไฟล์"""
+        return self.storage.ENGINE in STORAGE_ENGINES
+
+    def switch_storage(self, engine: str) -> bool:
+        """
+        ย้าย vault ไปยังรูปแบบการจัดเก็บอื่น (ใช้ data key เดิม)
+        ไฟล์ของรูปแบบเดิมถูกลบหลังเขียนรูปแบบใหม่สำเร็จเท่านั้น
+        """
+        self._require_no_transaction()
+        if engine == self.storage.ENGINE or not self.can_switch_storage():
+            return False
+        if not self.storage.flush():
+            return False
+        self.ensure_all_folders_loaded()
+        target = open_storage(engine, self.storage.root)
+        try:
+            target.adopt_session(self.master_password, self.session)
+            target.save_data(self.full_data(), self.session)
+        except Exception:
+            try:
+                target.delete_all_data()
+            except Exception:
+                pass
+            return False
+        previous, self.storage = self.storage, target
+        self.lazy_folders = self.storage.lazy_folders()
+        if self.folder_cache:
+            for folder_name in self.folder_cache.sealed_folders():
+                self.storage.release_folder(folder_name)
+                self.lazy_folders.add(folder_name)
+        self.storage.save_metadata({'engine': engine})
+        try:
+            previous.delete_all_data()
+        except Exception:
+            pass
+        return True
+
+    # ---------- สำรองข้อมูล ----------
+
+    def export_csv(self, csv_path: Path) -> bool:
+        """เขียนข้อมูลทุกโฟลเดอร์เป็น CSV คืนค่า False ถ้าไม่ได้ไฟล์ที่มีข้อมูล"""
+        csv_path = Path(csv_path)
+        self.ensure_all_folders_loaded()
+        data_to_export = self.full_data()
+        if not data_to_export.get('folders'):
+            # ลองใช้ backup ที่ถอดได้ (storage บางแบบมีเมธอดเหล่านี้)
+            try:
+                backup = {}
+                if hasattr(self.storage, "decrypt_backup_with_master"):
+                    backup = self.storage.decrypt_backup_with_master() or {}
+                elif hasattr(self.storage, "load_plaintext_backup"):
+                    backup = self.storage.load_plaintext_backup() or {}
+                if backup and backup.get('folders'):
+                    data_to_export = backup
+            except Exception:
+                pass
+        try:
+            self.storage.export_data_to_csv(data_to_export, csv_path)
+        except Exception:
+            pass
+        return csv_path.exists() and csv_path.stat().st_size > 0
+
+    def backup_to_telegram(self):
+        """
+        สร้าง CSV ชั่วคราวแล้วส่งไปที่ Telegram (ไฟล์ใหญ่บีบอัดเป็น zip ก่อนส่ง) ไฟล์ชั่วคราวถูกลบเสมอ
+        ValueError พร้อมข้อความสำหรับผู้ใช้ถ้าสำรองไม่สำเร็จ
+        """
+        bot = self.data.get('telegram_bot', '') or ''
+        chat = self.data.get('telegram_chat', '') or ''
+        if not bot or not chat:
+            raise ValueError("ยังไม่ได้ตั้งค่า Telegram (bot token / chat id)")
+
+        csv_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        csv_path = Path(tempfile.gettempdir()) / csv_name
+        send_path = csv_path
+        try:
+            if not self.export_csv(csv_path):
+                raise ValueError("ไม่สามารถสร้างไฟล์สำรองได้ (ไฟล์ว่างหรือไม่ถูกสร้าง)")
+
+            # ไฟล์ใหญ่บีบอัดเป็น zip ก่อนส่ง (ส่งเร็วขึ้นและไม่ชนเพดานขนาดไฟล์ของ Telegram)
+            if choose_compression(csv_path.stat().st_size):
+                try:
+                    zip_path = csv_path.with_suffix('.zip')
+                    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+                        archive.write(csv_path, csv_name)
+                    send_path = zip_path
+                except Exception:
+                    pass
+
+            try:
+                sent = TelegramNotifier.send_file(bot, chat, str(send_path), "Password Manager backup")
+            except Exception:
+                raise ValueError("เกิดข้อผิดพลาดขณะส่งไฟล์ไปยัง Telegram")
+            if not sent:
+                raise ValueError("ไม่สามารถส่งไฟล์ไปยัง Telegram ได้ — ตรวจสอบ token/chat/การเชื่อมต่อ")
+        finally:
+            try:
+                csv_path.unlink(missing_ok=True)
+                if send_path != csv_path:
+                    send_path.unlink(missing_ok=True)
+            except Exception:
+                pass
+
+    # ---------- transaction ----------
+
+    @contextmanager
+    def transaction(self, keep=()):
+        """
+        รวมการแก้ไขหลายครั้งเป็นหน่วยเดียว: ใช้กับ with แล้วเรียกเมธอดแก้ไขตามปกติ
+            with vault.transaction():
+                vault.move_entries(ids, "งาน")
+                vault.delete_entries(other_ids)
+        - ระหว่างนั้นไม่มีการบันทึก — op ทั้งหมดถูกบันทึกครั้งเดียวตอนจบ (journal record เดียว หรือ snapshot เดียว)
+        - ถ้ามี exception ข้อมูล/index/โฟลเดอร์กลับเป็นเหมือนก่อนเริ่ม แล้วส่ง exception ต่อ
+        - transaction ซ้อนกันรวมเป็นอันนอกสุด
+        keep: โฟลเดอร์ที่ไม่ให้ถูกพักตอนจบ (โหมดประหยัดหน่วยความจำ) เช่นโฟลเดอร์ที่แสดงอยู่
+        """
+        if self._tx is not None:
+            yield self
+            return
+        tx = self._tx = _Transaction(self, keep)
+        try:
+            yield self
+        except BaseException:
+            self._tx = None
+            self._rollback(tx)
+            raise
+        self._tx = None
+        if tx.full or tx.ops:
+            self.save(None if tx.full else tx.ops)
+        self._trim_cache(tx.keep)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._tx is not None
+
+    def _rollback(self, tx: _Transaction):
+        folders = tx.snapshot['folders']
+        # โฟลเดอร์ที่ถอดรหัสระหว่าง transaction กลับเป็นค่าตอนโหลด และยังคงถอดรหัสอยู่
+        folders.update(tx.loaded)
+        created = set(self.data['folders']) - set(folders)
+        # แก้ dict เดิม (EntryIndex อ้างอิง self.data อยู่)
+        self.data.clear()
+        self.data.update(tx.snapshot)
+        self.lazy_folders = tx.lazy - set(tx.loaded)
+        self.entry_index.rebuild()
+        # rebuild ใส่เฉพาะโฟลเดอร์ที่มีรายการ — ล้างข้อความค้นหาของโฟลเดอร์ที่ไม่มีแล้วหรือว่างจริง
+        for folder_name in created | {name for name, entries in folders.items()
+                                      if not entries and name not in self.lazy_folders}:
+            self.search_index.remove_folder(folder_name)
+        if self.folder_cache:
+            for folder_name in created:
+                self.folder_cache.forget(folder_name)
+        self._trim_cache(tx.keep)
+
+    def _trim_cache(self, keep=()):
+        if self.folder_cache:
+            for evicted in self.folder_cache.trim(keep):
+                if evicted in self.data['folders'] and evicted not in self.lazy_folders:
+                    self.evict_folder(evicted)
+
+    def _unseal_for_transaction(self, folder_name: str):
+        """ภายใน transaction ถอดรหัสโฟลเดอร์ที่ถูกพักก่อนเปลี่ยนชื่อ/ลบ เพื่อให้ rollback คืนค่าได้"""
+        if self._tx is not None and self.folder_cache and self.folder_cache.is_sealed(folder_name):
+            self.ensure_folder_loaded(folder_name)
+
+    def _require_no_transaction(self):
+        if self._tx is not None:
+            raise RuntimeError("ทำรายการนี้ระหว่าง transaction ไม่ได้")
+
+    # ---------- บันทึก / ปิด ----------
+
+    def save(self, ops=None):
+        """
+        บันทึกข้อมูลแบบเข้ารหัส (เขียนจริงใน thread ของ storage.writer ไม่บล็อกผู้เรียก)
+        ถ้าส่ง ops (รายการการเปลี่ยนแปลง) มา จะต่อท้าย journal แทนการเขียน vault ทั้งก้อน
+        และรวม journal เป็น snapshot ใหม่เมื่อใหญ่เกินเกณฑ์
+        """
+        if self._tx is not None:
+            # ภายใน transaction: เก็บ op ไว้บันทึกครั้งเดียวตอนจบ
+            if ops:
+                self._tx.ops.extend(ops)
+            else:
+                self._tx.full = True
+            return
+        if self.is_unlocked:
+            if ops and self.storage.queue_changes(ops, self.session):
+                if self.storage.needs_compaction():
+                    self.storage.queue_snapshot(self.full_data(), self.session)
+            else:
+                self.storage.queue_snapshot(self.full_data(), self.session)
+            # อัปเดต metadata ไฟล์ด้วย (ปลอดภัยสำหรับค่า telegram ที่ไม่สำคัญต่อความลับหลัก)
+            try:
+                self.storage.save_metadata({
+                    'telegram_bot': self.data.get('telegram_bot', ''),
+                    'telegram_chat': self.data.get('telegram_chat', '')
+                })
+            except Exception:
+                pass
+
+    def wipe_session(self):
+        """ล้าง session key และ cache ออกจากหน่วยความจำ (ใช้ตอนล็อก/ปิดโปรแกรม)"""
+        if self.session:
+            self.session.wipe()
+            self.session = None
+        if self.folder_cache:
+            self.folder_cache.clear()
+            self.folder_cache = None
+
+    def close(self) -> bool:
+        """
+        บันทึกรายการค้างทั้งหมดแล้วล้าง session คืนค่า False ถ้าบันทึกไม่สำเร็จ
+        ทุกการแก้ไขถูกส่งให้ storage ไปแล้วตอนเกิดขึ้น จึงแค่ flush — เขียน snapshot ทั้งก้อนเฉพาะเมื่อ
+        storage ต้องการ (journal ใหญ่เกินเกณฑ์) ไม่ต้องเข้ารหัส vault ใหม่ทุกครั้งที่ปิดโปรแกรม
+        """
+        ok = True
+        if self.is_unlocked:
+            if self.storage.needs_compaction():
+                self.storage.queue_snapshot(self.full_data(), self.session)
+            ok = self.storage.flush()
+        self.wipe_session()
+        return ok
@@ -0,0 +1,162 @@
+import time
+import threading
+
+# รอให้การแก้ไขเงียบลงเท่านี้ก่อนเขียน (วินาที) แต่ไม่ช้ากว่า MAX_DELAY นับจากรายการแรกที่ค้าง
+DEBOUNCE_SECONDS = 0.3
+MAX_DELAY_SECONDS = 2.0
+
+class BackgroundWriter:
+    """
+    thread เขียนไฟล์ของ DataStorage — การเขียนทั้งหมด (journal และ snapshot) ผ่าน thread เดียวตามลำดับ
+    - op ที่ต่อกันถูกรวมเป็น journal record เดียว (เช่นนำเข้า CSV 200 แถว หรือแก้ไขรัว ๆ)
+    - snapshot ใหม่แทนที่ snapshot ที่ค้างก่อนหน้า แต่ op ที่ค้างยังถูกต่อท้าย journal ก่อนเขียน snapshot
+      (snapshot นี้จะเป็น .prev ในการบันทึกครั้งถัดไป — .prev + journal ต้องมีการแก้ไขครบ)
+    - แต่ละรายการเขียนแยกกัน: รายการที่ล้มเหลวไม่ทำให้รายการถัดไปหายไป
+      op ที่เขียนไม่สำเร็จ (และ op หลังจากนั้น เพื่อคงลำดับ) ถูกเก็บไว้ลองใหม่ในรอบถัดไป
+      จนกว่าจะเขียนได้หรือมี snapshot ที่ใหม่กว่าครอบคลุม — ระหว่างนั้น snapshot_required เป็นจริง
+    """
+
+    def __init__(self, storage, debounce: float = DEBOUNCE_SECONDS, max_delay: float = MAX_DELAY_SECONDS):
+        self.storage = storage
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.last_error = None
+        self._cond = threading.Condition()
+        # รายการค้าง: ('ops', session, [op...]) หรือ ('snapshot', session, data)
+        self._pending = []
+        # op ที่เขียนไม่สำเร็จ (ตามลำดับ) — ลองใหม่ก่อนรายการในรอบถัดไป หรือทิ้งเมื่อ snapshot เขียนสำเร็จ
+        self._unwritten = []
+        self._first_pending_at = None
+        self._last_pending_at = None
+        self._busy = False
+        self._flush_now = False
+        self._stopped = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="vault-writer", daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, item):
+        with self._cond:
+            kind = item[0]
+            if kind == 'snapshot':
+                # snapshot รวมทุกอย่างก่อนหน้าแล้ว ทิ้ง snapshot ที่ค้าง (op ที่ค้างรวมเป็น record เดียวถ้าได้)
+                pending = []
+                for queued in self._pending:
+                    if queued[0] != 'ops':
+                        continue
+                    if pending and pending[-1][1] is queued[1]:
+                        pending[-1][2].extend(queued[2])
+                    else:
+                        pending.append(queued)
+                self._pending = pending + [item]
+            elif self._pending and self._pending[-1][0] == 'ops' and self._pending[-1][1] is item[1]:
+                self._pending[-1][2].extend(item[2])
+            else:
+                self._pending.append(('ops', item[1], list(item[2])))
+            now = time.monotonic()
+            if self._first_pending_at is None:
+                self._first_pending_at = now
+            self._last_pending_at = now
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def queue_ops(self, session, ops: list):
+        self._enqueue(('ops', session, ops))
+
+    def queue_snapshot(self, session, data: dict):
+        self._enqueue(('snapshot', session, data))
+
+    def has_pending_snapshot(self) -> bool:
+        with self._cond:
+            return any(item[0] == 'snapshot' for item in self._pending)
+
+    @property
+    def snapshot_required(self) -> bool:
+        """มี op ที่ยังเขียนไม่สำเร็จ — ข้อมูลบนดิสก์ตามหลังข้อมูลในหน่วยความจำจนกว่าจะเขียน snapshot ใหม่"""
+        with self._cond:
+            return bool(self._unwritten)
+
+    def _due_in(self) -> float:
+        """เวลาที่เหลือก่อนต้องเขียน (<= 0 คือถึงเวลาแล้ว)"""
+        if self._flush_now:
+            return 0
+        now = time.monotonic()
+        return min(self._last_pending_at + self.debounce, self._first_pending_at + self.max_delay) - now
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if not self._pending and self._stopped:
+                    return
+                wait = self._due_in()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                batch, self._pending = self._pending, []
+                unwritten, self._unwritten = self._unwritten, []
+                if not any(item[0] == 'snapshot' for item in batch):
+                    # op ที่ค้างจากรอบก่อนต้องถูกเขียนก่อนรายการใหม่
+                    # (ถ้ามี snapshot ในรอบนี้ ไม่ต้องลองใหม่ — snapshot รวม op เหล่านั้นไว้แล้ว)
+                    batch, unwritten = unwritten + batch, []
+                self._first_pending_at = self._last_pending_at = None
+                self._busy = True
+            try:
+                for item in batch:
+                    kind, session, payload = item
+                    if kind != 'snapshot' and unwritten:
+                        # op ก่อนหน้ายังไม่ถูกเขียน — ต่อท้ายตอนนี้ journal จะขาด record ตรงกลาง
+                        # (เก็บไว้จนกว่า snapshot ถัดไปจะรวมไว้ หรือถูกลองใหม่ตามลำดับ)
+                        unwritten.append(item)
+                        continue
+                    try:
+                        if kind == 'snapshot':
+                            self.storage.save_data(payload, session)
+                            # snapshot ถูกสร้างหลัง op ที่ค้างทั้งหมด จึงรวมไว้แล้ว
+                            unwritten = []
+                        else:
+                            self.storage.append_changes(payload, session)
+                    except Exception as e:
+                        # ไม่ทิ้งข้อผิดพลาดเงียบ ๆ — flush() จะคืนค่า False ให้ผู้เรียกแจ้งผู้ใช้
+                        self.last_error = e
+                        if kind != 'snapshot':
+                            unwritten.append(item)
+            finally:
+                with self._cond:
+                    self._unwritten = unwritten
+                    self._busy = False
+                    if not self._pending:
+                        self._flush_now = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """เขียนรายการค้างทั้งหมดทันทีแล้วรอจนเสร็จ คืนค่า False ถ้าการเขียนล้มเหลวหรือหมดเวลา"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._unwritten and not self._pending and not self._busy:
+                # ลองเขียน op ที่ค้างจากรอบก่อนอีกครั้ง
+                self._pending, self._unwritten = self._unwritten, []
+                now = time.monotonic()
+                self._first_pending_at = self._last_pending_at = now
+            if self._pending:
+                self._flush_now = True
+                self._ensure_thread()
+                self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            ok = self.last_error is None and not self._unwritten
+            self.last_error = None
+        return ok
+
+    def stop(self):
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
\ No newline at end of file